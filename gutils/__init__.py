@@ -1,16 +1,30 @@
 import os
 import csv
 from typing import List
-from .ckpt_tr import WeightTrans
 from .logger import get_logger
-from .utils import print_run_time
+from .utils import CSVWriter, print_run_time
 
 __all__ = ['WeightTrans', 'get_logger', 'print_run_time',
-           'csvwriter', 'path_builder']
+           'csvwriter', 'CSVWriter', 'path_builder']
+
+
+def __getattr__(name):
+    # WeightTrans 在第一次访问时才导入，只使用 get_logger、csvwriter 等工具时不会加载权重转换相关模块
+    if name == 'WeightTrans':
+        from .ckpt_tr import WeightTrans
+        globals()[name] = WeightTrans
+        return WeightTrans
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 def csvwriter(path_csv: str, content: List[str]) -> None:
     """
-    open a csv file, and add content at the end of file
+    open a csv file, and add content at the end of file. the file is closed after every call,
+    use gutils.CSVWriter to keep the file open and write rows in batches
     """
     with open(path_csv, "a", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
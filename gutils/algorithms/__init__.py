@@ -0,0 +1,28 @@
+import importlib
+
+__all__ = ['MultiTemplateTracker', 'TemplateTracker', 'track_video', 'track_videos', 'match_template',
+           'check_parity', 'MATCH_METHODS']
+
+# 子模块在第一次访问对应名字时才导入，cv2 / numpy 不会在 import gutils.algorithms 时被加载；
+# 交互式的 select_tracker 依赖 Tk，需要显式导入
+_LAZY_ATTRS = {
+    'MultiTemplateTracker': '.tracking',
+    'TemplateTracker': '.tracking',
+    'track_video': '.tracking',
+    'track_videos': '.tracking',
+    'match_template': '.template_match',
+    'check_parity': '.template_match',
+    'MATCH_METHODS': '.template_match',
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,13 +3,14 @@ import cv2
 import queue
 import numpy as np
 import tkinter as tk
-from skimage.metrics import structural_similarity as ssim
 
 from tkinter import Canvas
-from copy import deepcopy
 from typing import Any, List, Dict
 from PIL import Image, ImageTk, ImageGrab
 
+from .tracking import TemplateTracker
+from ..utils.profiler import Timer, get_profiler
+
 class VideoSelector:
     def __init__(self, video_path):
         self.video_path = video_path
@@ -59,78 +60,66 @@ class VideoSelector:
     def get_selected_region(self):
         return self.selected_region
 
-def distance(point1, point2):
-    x1, y1 = point1
-    x2, y2 = point2 
-    return np.sqrt((x1-x2)**2 + (y1-y2)**2)
-
-
-class Tracker(object):
-    def __init__(self, video_path: str) -> None:
+class Tracker(TemplateTracker):
+    """
+    Usage
+    --------
+        在视频第一帧中框选模板，之后逐帧进行模板匹配跟踪并显示结果，按 q 退出。
+        跟踪逻辑见 TemplateTracker，无界面的批量跟踪使用 tracking.track_video / tracking.track_videos。
+
+    Parameters
+    ----------
+        video_path: str 视频路径
+
+        其余参数见 TemplateTracker
+    """
+    def __init__(self,
+                 video_path: str,
+                 search_radius: int=64,
+                 research_threshold: float=0.85,
+                 match_method: str='direct',
+                 **kwargs) -> None:
+        super().__init__(search_radius, research_threshold, match_method, verbose=True, **kwargs)
         self.selector = VideoSelector(video_path)
         self.cap = cv2.VideoCapture(video_path)
         selected_region = self.selector.get_selected_region()
-        x1, y1, x2, y2 = selected_region
         print("Selected Region (after closing the window):", selected_region)
 
-        self.template = self.selector.frame[y1:y2, x1:x2]
-        cv2.imshow("Cropped Frame", self.template[:,:,::-1])
+        # VideoSelector 中的第一帧是 RGB，模板统一保存为 BGR，与之后读取的帧一致
+        self.init(np.ascontiguousarray(self.selector.frame[:, :, ::-1]), selected_region)
+        cv2.imshow("Cropped Frame", self.template)
         cv2.waitKey(0)
         cv2.destroyAllWindows()
 
-        self.trakers = []
-        self.max_distance = -1
-        self.last_pos = None
-        self.margin = 15
-        self.stop_replace = False
+        self._frame = None
 
     def __call__(self, *args: Any, **kwds: Any) -> Any:
+        read_timer, update_timer, display_timer = Timer('tracker.read'), Timer('tracker.update'), Timer('tracker.display')
         while True:
-            gray_template = cv2.cvtColor(self.template, cv2.COLOR_BGR2GRAY) 
-            ret, frame = self.cap.read()
-            ori_frame = deepcopy(frame)
+            # 解码到上一帧的缓冲区中，不再为每一帧分配内存
+            with read_timer:
+                ret, frame = self.cap.read(self._frame)
             if not ret: break
-            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            res = cv2.matchTemplate(gray_frame, gray_template, cv2.TM_CCORR_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-            h, w = self.template.shape[:2]
-            top_left = max_loc 
-            bottom_right = (top_left[0] + w, top_left[1] + h)
-
-            if self.last_pos is not None:
-                cur_dis = distance(self.last_pos[0], top_left)
-                if self.max_distance == -1:
-                    self.max_distance = cur_dis
-                else:
-                    if cur_dis < 10 * self.max_distance and not self.stop_replace:
-                        self.max_distance = max(cur_dis, self.max_distance)
-                        if max_val > 0.92:
-                            ssim_compare = ssim(cv2.cvtColor(self.template, cv2.COLOR_BGR2GRAY), cv2.cvtColor(ori_frame[top_left[1]: bottom_right[1], top_left[0]: bottom_right[0], :], cv2.COLOR_BGR2GRAY))
-                            print("ssim: ", ssim_compare)
-                            self.template = ori_frame[top_left[1]: bottom_right[1], top_left[0]: bottom_right[0], :]
-                            print("replace template: ", max_val)
-                    else:
-                        print(max_val)
-                        top_left, bottom_right = self.last_pos
-
-            self.last_pos = [top_left, bottom_right]
-            if top_left[0] > self.margin and top_left[1] > self.margin and\
-                bottom_right[0] < 960 - self.margin and bottom_right[1] < 576 - self.margin:
-                cv2.rectangle(frame, top_left, bottom_right, (0, 255, 0), 2)
-                self.stop_replace = False
-            else:
-                cv2.rectangle(frame, top_left, bottom_right, (0, 0, 255), 2)
-                self.stop_replace = True
-            cv2.imshow('Tracking', frame) 
-            cv2.imshow("Template", cv2.cvtColor(self.template, cv2.COLOR_BGR2RGB))
+            self._frame = frame
+            with update_timer:
+                top_left, bottom_right, _ = self.update(frame)
+            with display_timer:
+                color = (0, 0, 255) if self.stop_replace else (0, 255, 0)
+                cv2.rectangle(frame, top_left, bottom_right, color, 2)
+                cv2.imshow('Tracking', frame) 
+                cv2.imshow("Template", self.template)
             if cv2.waitKey(0) & 0xff == ord('q'):
                 break
         self.cap.release()
         cv2.destroyAllWindows()
+        print(get_profiler().report('tracker.'))
 
 if __name__ == '__main__':
-    video_path = "/tmp/24-12-09/YR-C01-42_20241204_111225.Heavy_Topic_Group.bag.mp4"
-    tracker = Tracker(video_path)
+    # python -m gutils.algorithms.select_tracker /path/to/video.mp4 [match_method]
+    import sys
+    video_path = sys.argv[1] if len(sys.argv) > 1 else \
+        "/tmp/24-12-09/YR-C01-42_20241204_111225.Heavy_Topic_Group.bag.mp4"
+    tracker = Tracker(video_path, match_method=sys.argv[2] if len(sys.argv) > 2 else 'direct')
     tracker()
 
 
@@ -0,0 +1,145 @@
+"""
+灰度模板匹配后端，得分与 `cv2.matchTemplate(..., cv2.TM_CCORR_NORMED)` 一致：
+
+    direct:  全分辨率直接匹配
+    pyramid: 在图像金字塔的顶层粗匹配出若干候选位置，再回到全分辨率在候选位置附近精细匹配
+    fft:     用 FFT 计算互相关、积分图计算窗口能量的归一化互相关，面向大模板。OpenCV 对大模板的 direct 匹配内部
+             同样使用 DFT，两者耗时接近，实际差异可以用 check_parity 在目标尺寸上测量
+
+`check_parity` 以 direct 为基准比较各方式的位置、得分和耗时。
+"""
+import time
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+__all__ = ['MATCH_METHODS', 'PARITY_METHODS', 'match_template', 'pyramid_levels', 'check_parity']
+
+# 跟踪器、match_template 和 check_parity 支持的匹配方式
+MATCH_METHODS = ('direct', 'pyramid', 'fft')
+PARITY_METHODS = MATCH_METHODS
+
+
+def _direct(image: np.ndarray, template: np.ndarray, result: np.ndarray=None) -> Tuple[float, Tuple[int, int]]:
+    res = cv2.matchTemplate(image, template, cv2.TM_CCORR_NORMED, result=result)
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return max_val, max_loc
+
+
+def pyramid_levels(template_shape: Tuple[int, int], min_size: int=16, max_levels: int=4) -> int:
+    """金字塔层数：每层边长减半，顶层模板的短边不小于 min_size。"""
+    levels, size = 0, min(template_shape[:2])
+    while levels < max_levels and size // 2 >= min_size:
+        size //= 2
+        levels += 1
+    return levels
+
+
+def _peaks(res: np.ndarray, number: int, radius: int) -> List[Tuple[int, int]]:
+    """依次取最大值并抑制其邻域，得到 number 个互不相邻的候选位置。"""
+    res = res.copy()
+    peaks = []
+    for _ in range(number):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(res)
+        if max_val <= 0 and peaks:
+            break
+        peaks.append((x, y))
+        res[max(y - radius, 0): y + radius + 1, max(x - radius, 0): x + radius + 1] = -1
+    return peaks
+
+
+def _pyramid(image: np.ndarray,
+             template: np.ndarray,
+             levels: int=None,
+             min_size: int=16,
+             candidates: int=3) -> Tuple[float, Tuple[int, int]]:
+    if levels is None:
+        levels = pyramid_levels(template.shape, min_size)
+    if levels <= 0:
+        return _direct(image, template)
+    small_image, small_template = image, template
+    for _ in range(levels):
+        small_image, small_template = cv2.pyrDown(small_image), cv2.pyrDown(small_template)
+    if small_image.shape[0] < small_template.shape[0] or small_image.shape[1] < small_template.shape[1]:
+        return _direct(image, template)
+    coarse = cv2.matchTemplate(small_image, small_template, cv2.TM_CCORR_NORMED)
+    scale = 1 << levels
+    # 粗匹配位置的误差约为一个顶层像素，精细匹配时在其周围多留出一层的余量
+    pad = scale + 2
+    h, w = template.shape[:2]
+    best_val, best_loc = -1., (0, 0)
+    for x, y in _peaks(coarse, candidates, max(min(small_template.shape[:2]) // 2, 1)):
+        x0, y0 = max(x * scale - pad, 0), max(y * scale - pad, 0)
+        x1, y1 = min(x * scale + pad + w, image.shape[1]), min(y * scale + pad + h, image.shape[0])
+        max_val, (dx, dy) = _direct(image[y0:y1, x0:x1], template)
+        if max_val > best_val:
+            best_val, best_loc = max_val, (x0 + dx, y0 + dy)
+    return best_val, best_loc
+
+
+def _fft(image: np.ndarray, template: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+    image = image.astype(np.float32)
+    template = template.astype(np.float32)
+    (H, W), (h, w) = image.shape[:2], template.shape[:2]
+    # 只取不发生循环回绕的有效区域，FFT 尺寸不小于图像本身即可
+    size = (cv2.getOptimalDFTSize(H), cv2.getOptimalDFTSize(W))
+    padded_image = cv2.copyMakeBorder(image, 0, size[0] - H, 0, size[1] - W, cv2.BORDER_CONSTANT)
+    padded_template = cv2.copyMakeBorder(template, 0, size[0] - h, 0, size[1] - w, cv2.BORDER_CONSTANT)
+    spectrum = cv2.mulSpectrums(cv2.dft(padded_image), cv2.dft(padded_template), 0, conjB=True)
+    corr = cv2.idft(spectrum, flags=cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT)[:H - h + 1, :W - w + 1]
+    _, sqsum = cv2.integral2(image, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    energy = sqsum[h:, w:] - sqsum[:-h, w:] - sqsum[h:, :-w] + sqsum[:-h, :-w]
+    denominator = np.sqrt(np.maximum(energy, 0) * float(np.square(template, dtype=np.float64).sum()))
+    res = corr / np.maximum(denominator, np.finfo(np.float32).eps)
+    y, x = np.unravel_index(int(np.argmax(res)), res.shape)
+    return float(res[y, x]), (int(x), int(y))
+
+
+def match_template(image: np.ndarray,
+                   template: np.ndarray,
+                   method: str='direct',
+                   result: np.ndarray=None,
+                   **kwargs) -> Tuple[float, Tuple[int, int]]:
+    """
+    在灰度图 image 中匹配灰度模板 template。
+
+    Args:
+        image (np.ndarray): 灰度图，可以是更大图像上的视图。
+        template (np.ndarray): 灰度模板。
+        method (str, optional): MATCH_METHODS 之一，默认为 'direct'。
+        result (np.ndarray, optional): direct 使用的预分配得分缓冲区。
+        **kwargs: pyramid 的 levels、min_size、candidates。
+
+    Returns:
+        Tuple[float, Tuple[int, int]]: 最高得分以及模板左上角坐标 (x, y)。
+    """
+    if method == 'direct':
+        return _direct(image, template, result)
+    if method == 'pyramid':
+        return _pyramid(image, template, **kwargs)
+    if method == 'fft':
+        return _fft(image, template)
+    raise ValueError(f"not support match method: {method}")
+
+
+def check_parity(image: np.ndarray,
+                 template: np.ndarray,
+                 methods: Tuple[str, ...]=('pyramid', 'fft'),
+                 repeat: int=3,
+                 **kwargs) -> Dict[str, Dict[str, float]]:
+    """
+    以 direct 为基准检查其他匹配方式的结果，返回每种方式的位置误差（像素）、得分误差以及耗时（毫秒）。
+    """
+    report = {}
+    for method in ('direct',) + tuple(m for m in methods if m != 'direct'):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            score, loc = match_template(image, template, method, **kwargs)
+        report[method] = {'x': loc[0], 'y': loc[1], 'score': score,
+                          'ms': (time.perf_counter() - start) * 1000. / repeat}
+    base = report['direct']
+    for item in report.values():
+        item['loc_error'] = max(abs(item['x'] - base['x']), abs(item['y'] - base['y']))
+        item['score_error'] = abs(item['score'] - base['score'])
+    return report
@@ -0,0 +1,483 @@
+"""
+不依赖 Tk / 窗口显示的模板跟踪核心，以及服务器上批量跟踪视频的流水线：
+解码在生产者线程中进行并放入有界队列，跟踪在消费者线程中进行，逐帧结果写入 CSV 或 numpy 数组；
+多个视频使用进程池并行处理。
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from ..utils.csv_writer import CSVWriter
+from ..utils.profiler import Timer
+from .template_match import MATCH_METHODS, match_template
+
+__all__ = ['MultiTemplateTracker', 'TemplateTracker', 'distance', 'iter_frames', 'track_video', 'track_videos',
+           'template_similarity', 'RESULT_COLUMNS', 'UPDATE_REASONS']
+
+# track_video 每帧每个目标输出一行
+RESULT_COLUMNS = ('frame', 'target', 'x1', 'y1', 'x2', 'y2', 'score', 'stop_replace')
+
+
+# 每帧每个目标的模板更新结果：updated 为已更新，其余为未更新的原因
+# low_score: 匹配得分不高于 replace_threshold；gate: 与当前模板的相似度低于 gate_threshold（遮挡或漂移）；
+# motion: 位移超过 10 倍 max_distance，位置回退；paused: 目标靠近画面边缘，暂停更新
+UPDATE_REASONS = ('updated', 'low_score', 'gate', 'motion', 'paused')
+
+
+def distance(point1, point2):
+    x1, y1 = point1
+    x2, y2 = point2
+    return np.sqrt((x1-x2)**2 + (y1-y2)**2)
+
+
+def template_similarity(template: np.ndarray, patch: np.ndarray, size: int=16) -> float:
+    """
+    缩小到 size x size 后的零均值归一化互相关，取值 [-1, 1]，代价与模板大小无关，用于替代 SSIM 判断模板是否漂移。
+    """
+    a = cv2.resize(template, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    b = cv2.resize(patch, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    a -= a.mean()
+    b -= b.mean()
+    return float((a * b).sum() / (np.sqrt((a * a).sum() * (b * b).sum()) + 1e-6))
+
+
+class MultiTemplateTracker(object):
+    """
+    Usage
+    --------
+        多目标模板跟踪：`init` 传入第一帧和 N 个目标框，之后每帧调用 `update`，一次解码和一次灰度转换由全部目标共用。
+        每个目标的状态（位置、位移、max_distance、是否暂停替换模板等）保存在长度为 N 的数组中；
+        匹配只在根据上一帧位移预测的搜索窗口内进行，窗口内得分过低时认为目标丢失，退回全图搜索。
+
+        模板更新：匹配得分高于 replace_threshold 且通过相似度检查（见 template_similarity）时，
+        灰度模板按 `template = (1 - update_rate) * template + update_rate * patch` 原地更新，
+        每个目标每帧最多更新一次，代价与模板面积成正比；每次的更新结果按 UPDATE_REASONS 计数，见 `update_stats`。
+
+    Parameters
+    ----------
+        search_radius: int 预测位置周围的搜索半径（像素），<= 0 时每帧都全图搜索
+
+        research_threshold: float 搜索窗口内的最高得分低于该值时退回全图搜索
+
+        match_method: str 模板匹配方式，'direct'、'pyramid'（金字塔粗匹配 + 全分辨率精细匹配）
+            或 'fft'（FFT 归一化互相关，面向大模板），见 template_match.match_template
+
+        margin: int 目标框距离画面边缘小于该值时暂停替换模板
+
+        replace_threshold: float 匹配得分高于该值时才考虑更新模板
+
+        update_rate: float 模板指数滑动平均的更新系数，1 表示直接替换为当前匹配到的图像块
+
+        gate_threshold: float 当前匹配图像块与模板的相似度低于该值时不更新模板
+
+        verbose: bool 为 True 时打印模板更新和位置回退的信息
+
+    Examples
+    --------
+>>>        tracker = MultiTemplateTracker(match_method='pyramid')
+>>>        tracker.init(first_frame, [(x1, y1, x2, y2), (x3, y3, x4, y4)])
+>>>        for frame in frames:
+>>>            boxes, scores = tracker.update(frame)
+    """
+    def __init__(self,
+                 search_radius: int=64,
+                 research_threshold: float=0.85,
+                 match_method: str='direct',
+                 margin: int=15,
+                 replace_threshold: float=0.92,
+                 update_rate: float=0.3,
+                 gate_threshold: float=0.7,
+                 verbose: bool=False) -> None:
+        if match_method not in MATCH_METHODS:
+            raise ValueError(f"not support match method: {match_method}, use one of {list(MATCH_METHODS)}")
+        self.search_radius = search_radius
+        self.research_threshold = research_threshold
+        self.match_method = match_method
+        self.margin = margin
+        self.replace_threshold = replace_threshold
+        self.update_rate = update_rate
+        self.gate_threshold = gate_threshold
+        self.verbose = verbose
+
+    def init(self, frame: np.ndarray, boxes: Sequence[Sequence[int]]) -> None:
+        """
+        以 frame 中的 boxes 作为模板，重置全部目标的跟踪状态。
+
+        Args:
+            frame (np.ndarray): BGR 帧，决定之后帧的尺寸。
+            boxes (Sequence[Sequence[int]]): N 个目标框 (x1, y1, x2, y2)。
+        """
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        boxes = np.concatenate([np.minimum(boxes[:, :2], boxes[:, 2:]), np.maximum(boxes[:, :2], boxes[:, 2:])], 1)
+        num = len(boxes)
+        self.frame_height, self.frame_width = frame.shape[:2]
+        self.templates = [None] * num
+        self.gray_templates = [None] * num
+        self._accumulators = [None] * num
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            self.set_template(i, frame[y1:y2, x1:x2])
+        self.sizes = boxes[:, 2:] - boxes[:, :2]
+        self.boxes = boxes
+        self.scores = np.zeros(num, dtype=np.float32)
+        self.velocities = np.zeros((num, 2), dtype=np.int32)
+        self.max_distances = np.full(num, -1, dtype=np.float64)
+        self.stop_replaces = np.zeros(num, dtype=bool)
+        self.full_search_counts = np.zeros(num, dtype=np.int64)
+        self.update_counts = np.zeros((num, len(UPDATE_REASONS)), dtype=np.int64)
+        self.frames = 0
+        self._gray_frame = np.empty((self.frame_height, self.frame_width), dtype=np.uint8)
+        self._results = {}
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def set_template(self, index: int, patch: np.ndarray, gray_patch: np.ndarray=None) -> None:
+        """替换第 index 个目标的模板并缓存其灰度图，patch 可能是复用缓冲区上的视图，因此总是拷贝。"""
+        self.templates[index] = patch.copy()
+        if gray_patch is not None:
+            self.gray_templates[index] = gray_patch.copy()
+        else:
+            self.gray_templates[index] = cv2.cvtColor(self.templates[index], cv2.COLOR_BGR2GRAY)
+        self._accumulators[index] = self.gray_templates[index].astype(np.float32)
+
+    def _search_window(self, index: int):
+        """以上一帧位置加上位移预测本帧位置，返回固定大小的搜索窗口 (x0, y0, x1, y1)，None 表示全图搜索。"""
+        if self.frames == 0 or self.search_radius <= 0:
+            return None
+        w, h = self.sizes[index]
+        radius = self.search_radius
+        window_w = min(w + 2 * radius, self.frame_width)
+        window_h = min(h + 2 * radius, self.frame_height)
+        px, py = self.boxes[index, :2] + self.velocities[index]
+        x0 = int(min(max(px - radius, 0), self.frame_width - window_w))
+        y0 = int(min(max(py - radius, 0), self.frame_height - window_h))
+        return x0, y0, x0 + window_w, y0 + window_h
+
+    def _match(self, gray_frame: np.ndarray, index: int, window=None):
+        """在 window 内匹配第 index 个目标，返回最高得分和模板左上角在整帧中的坐标。"""
+        x0, y0 = 0, 0
+        if window is not None:
+            x0, y0, x1, y1 = window
+            gray_frame = gray_frame[y0:y1, x0:x1]
+        template = self.gray_templates[index]
+        result = None
+        if self.match_method == 'direct':
+            h, w = template.shape
+            shape = (gray_frame.shape[0] - h + 1, gray_frame.shape[1] - w + 1)
+            if shape not in self._results:
+                self._results[shape] = np.empty(shape, dtype=np.float32)
+            result = self._results[shape]
+        max_val, max_loc = match_template(gray_frame, template, self.match_method, result)
+        return max_val, (max_loc[0] + x0, max_loc[1] + y0)
+
+    def update(self, frame: np.ndarray):
+        """
+        跟踪一帧，更新全部目标的模板和跟踪状态。
+
+        Args:
+            frame (np.ndarray): BGR 帧。
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: shape 为 (N, 4) 的目标框 (x1, y1, x2, y2) 以及 shape 为 (N,) 的匹配得分。
+        """
+        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray_frame)
+        top_left = np.empty((len(self), 2), dtype=np.int32)
+        for i in range(len(self)):
+            window = self._search_window(i)
+            max_val, loc = self._match(gray_frame, i, window)
+            if window is not None and max_val < self.research_threshold:
+                self.full_search_counts[i] += 1
+                full_val, full_loc = self._match(gray_frame, i)
+                if full_val > max_val:
+                    max_val, loc = full_val, full_loc
+            top_left[i] = loc
+            self.scores[i] = max_val
+
+        if self.frames > 0:
+            last = self.boxes[:, :2]
+            cur_dis = np.hypot(*(top_left - last).T.astype(np.float64))
+            first_move = self.max_distances == -1
+            self.max_distances[first_move] = cur_dis[first_move]
+            paused = ~first_move & self.stop_replaces
+            motion = ~first_move & ~paused & (cur_dis >= 10 * self.max_distances)
+            accept = ~first_move & ~paused & ~motion
+            self.max_distances[accept] = np.maximum(cur_dis[accept], self.max_distances[accept])
+            confident = accept & (self.scores > self.replace_threshold)
+            self.update_counts[:, UPDATE_REASONS.index('low_score')] += accept & ~confident
+            self.update_counts[:, UPDATE_REASONS.index('motion')] += motion
+            self.update_counts[:, UPDATE_REASONS.index('paused')] += paused
+            for i in np.flatnonzero(confident):
+                self._update_template(i, frame, gray_frame, top_left[i])
+            reject = paused | motion
+            if self.verbose:
+                for i in np.flatnonzero(reject):
+                    print(self.scores[i])
+            top_left[reject] = last[reject]
+            self.velocities = top_left - last
+
+        self.boxes = np.concatenate([top_left, top_left + self.sizes], 1)
+        self.stop_replaces = ~((self.boxes[:, 0] > self.margin) & (self.boxes[:, 1] > self.margin) &
+                               (self.boxes[:, 2] < self.frame_width - self.margin) &
+                               (self.boxes[:, 3] < self.frame_height - self.margin))
+        self.frames += 1
+        return self.boxes.copy(), self.scores.copy()
+
+    def _update_template(self, index: int, frame: np.ndarray, gray_frame: np.ndarray, top_left) -> None:
+        """相似度检查通过时以指数滑动平均原地更新灰度模板，彩色模板保存最近一次用于更新的图像块，仅用于显示。"""
+        (x1, y1), (w, h) = top_left, self.sizes[index]
+        gray_patch = gray_frame[y1: y1 + h, x1: x1 + w]
+        similarity = template_similarity(self.gray_templates[index], gray_patch)
+        if similarity < self.gate_threshold:
+            self.update_counts[index, UPDATE_REASONS.index('gate')] += 1
+            return
+        if self.update_rate >= 1:
+            self.set_template(index, frame[y1: y1 + h, x1: x1 + w, :], gray_patch)
+        else:
+            cv2.accumulateWeighted(gray_patch, self._accumulators[index], self.update_rate)
+            cv2.convertScaleAbs(self._accumulators[index], dst=self.gray_templates[index])
+            np.copyto(self.templates[index], frame[y1: y1 + h, x1: x1 + w, :])
+        self.update_counts[index, UPDATE_REASONS.index('updated')] += 1
+        if self.verbose:
+            print("update template: ", self.scores[index], "similarity: ", similarity)
+
+    def update_stats(self) -> Dict[str, Any]:
+        """
+        模板更新统计：每种结果的总次数、每个目标的次数以及全图搜索次数，可序列化为 json。
+        """
+        return {
+            'frames': self.frames,
+            'totals': dict(zip(UPDATE_REASONS, self.update_counts.sum(0).tolist())),
+            'per_target': [dict(zip(UPDATE_REASONS, counts)) for counts in self.update_counts.tolist()],
+            'full_searches': self.full_search_counts.tolist(),
+        }
+
+
+class TemplateTracker(MultiTemplateTracker):
+    """
+    Usage
+    --------
+        单目标模板跟踪：`init` 传入第一帧和目标框，之后每帧调用 `update`，参数与跟踪逻辑见 MultiTemplateTracker。
+
+    Examples
+    --------
+>>>        tracker = TemplateTracker(match_method='pyramid')
+>>>        tracker.init(first_frame, (x1, y1, x2, y2))
+>>>        for frame in frames:
+>>>            top_left, bottom_right, score = tracker.update(frame)
+    """
+    def init(self, frame: np.ndarray, box: Sequence[int]) -> None:
+        super().init(frame, [box])
+
+    def update(self, frame: np.ndarray):
+        """
+        跟踪一帧。
+
+        Returns:
+            Tuple[tuple, tuple, float]: 左上角、右下角以及匹配得分。
+        """
+        boxes, scores = super().update(frame)
+        x1, y1, x2, y2 = [int(v) for v in boxes[0]]
+        return (x1, y1), (x2, y2), float(scores[0])
+
+    @property
+    def last_pos(self):
+        if self.frames == 0:
+            return None
+        x1, y1, x2, y2 = [int(v) for v in self.boxes[0]]
+        return [(x1, y1), (x2, y2)]
+
+    @property
+    def template(self) -> np.ndarray:
+        return self.templates[0]
+
+    @property
+    def gray_template(self) -> np.ndarray:
+        return self.gray_templates[0]
+
+    @property
+    def stop_replace(self) -> bool:
+        return bool(self.stop_replaces[0])
+
+    @property
+    def max_distance(self) -> float:
+        return float(self.max_distances[0])
+
+    @property
+    def velocity(self) -> Tuple[int, int]:
+        return tuple(int(v) for v in self.velocities[0])
+
+    @property
+    def full_searches(self) -> int:
+        return int(self.full_search_counts[0])
+
+    @property
+    def template_updates(self) -> Dict[str, int]:
+        return dict(zip(UPDATE_REASONS, self.update_counts[0].tolist()))
+
+
+_END = object()
+
+
+def iter_frames(video_path: str, queue_size: int=32, max_frames: int=None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    在生产者线程中解码视频，按顺序产出 `(帧序号, BGR 帧)`。
+    解码缓冲区在 queue_size + 2 个预分配的数组之间循环使用，产出的帧只在下一次迭代之前有效。
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    frames = queue.Queue(maxsize=queue_size)
+    free = queue.Queue()
+    for _ in range(queue_size + 2):
+        free.put(None)
+    stop = threading.Event()
+
+    def produce():
+        decode_timer = Timer('tracker.decode')
+        try:
+            index = 0
+            while not stop.is_set() and (max_frames is None or index < max_frames):
+                buffer = free.get()
+                with decode_timer:
+                    ret, frame = cap.read(buffer)
+                if not ret:
+                    break
+                frames.put((index, frame))
+                index += 1
+            frames.put(_END)
+        except Exception as e:
+            frames.put(e)
+
+    producer = threading.Thread(target=produce, name='gutils-decode', daemon=True)
+    producer.start()
+    try:
+        previous = None
+        while True:
+            item = frames.get()
+            if previous is not None:
+                # 上一帧已经处理完，缓冲区交还给生产者
+                free.put(previous)
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            previous = item[1]
+            yield item
+    finally:
+        stop.set()
+        free.put(None)
+        while producer.is_alive():
+            try:
+                frames.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        cap.release()
+
+
+def track_video(video_path: str,
+                boxes: Sequence[Sequence[int]],
+                output: str=None,
+                queue_size: int=32,
+                max_frames: int=None,
+                **kwargs) -> np.ndarray:
+    """
+    无界面跟踪整个视频，第 0 帧中的 boxes 作为初始模板，全部目标在同一次解码中跟踪。
+
+    Args:
+        video_path (str): 视频路径。
+        boxes (Sequence[Sequence[int]]): 第 0 帧中的一个目标框 (x1, y1, x2, y2) 或多个目标框。
+        output (str, optional): 以 .csv 结尾时逐帧写入 CSV，以 .npy 结尾时结束后保存数组。
+        queue_size (int, optional): 解码队列长度。
+        max_frames (int, optional): 最多处理的帧数。
+        **kwargs: 传递给 MultiTemplateTracker。
+
+    解码、跟踪和写结果的耗时分别以 tracker.decode、tracker.update、tracker.write 记录到 `gutils.utils.get_profiler()`。
+
+    Returns:
+        np.ndarray: shape 为 (帧数 * 目标数, 8) 的 float64 数组，列见 RESULT_COLUMNS。
+    """
+    boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+    tracker = MultiTemplateTracker(**kwargs)
+    rows = []
+    writer = None
+    if output is not None and output.endswith('.csv'):
+        writer = CSVWriter(output, header=RESULT_COLUMNS, mode='w')
+    update_timer, write_timer = Timer('tracker.update'), Timer('tracker.write')
+    try:
+        for index, frame in iter_frames(video_path, queue_size, max_frames):
+            if index == 0:
+                tracker.init(frame, boxes)
+            with update_timer:
+                frame_boxes, scores = tracker.update(frame)
+            with write_timer:
+                frame_rows = [(index, i, x1, y1, x2, y2, float(score), int(stop)) for i, ((x1, y1, x2, y2), score, stop)
+                              in enumerate(zip(frame_boxes.tolist(), scores, tracker.stop_replaces))]
+                rows.extend(frame_rows)
+                if writer is not None:
+                    writer.writerows(frame_rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    result = np.array(rows, dtype=np.float64).reshape(-1, len(RESULT_COLUMNS))
+    if output is not None and output.endswith('.npy'):
+        np.save(output, result)
+    return result
+
+
+def _init_process() -> None:
+    # 每个进程处理一个视频，OpenCV 内部的线程池只会与其他进程争抢 CPU
+    cv2.setNumThreads(1)
+
+
+def _track_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.time()
+    kwargs = dict(job)
+    video_path, boxes, output = kwargs.pop('video'), kwargs.pop('boxes'), kwargs.pop('output', None)
+    result = track_video(video_path, boxes, output, **kwargs)
+    seconds = time.time() - start
+    frames = len(np.unique(result[:, 0]))
+    summary = {'video': video_path, 'output': output, 'frames': frames,
+               'seconds': seconds, 'fps': frames / max(seconds, 1e-9)}
+    if output is None:
+        summary['result'] = result
+    return summary
+
+
+def track_videos(jobs: List[Union[Dict[str, Any], Tuple[str, Sequence[int]]]],
+                 output_dir: str=None,
+                 output_format: str='csv',
+                 processes: int=None,
+                 **kwargs) -> List[Dict[str, Any]]:
+    """
+    使用进程池跟踪多个视频，每个进程处理一个视频。
+
+    Args:
+        jobs (List[Union[Dict[str, Any], Tuple[str, Sequence[int]]]]): `(视频路径, 目标框)`，
+            或包含 video、boxes 以及 track_video 其他参数的字典，一个视频中的多个目标在同一次解码中跟踪。
+        output_dir (str, optional): 结果保存为 `<output_dir>/<视频文件名>.<output_format>`；
+            为 None 时结果数组随 summary 返回。
+        output_format (str, optional): 'csv' 或 'npy'。
+        processes (int, optional): 进程数，默认为 CPU 个数。
+        **kwargs: 所有任务共用的 track_video / TemplateTracker 参数。
+
+    Returns:
+        List[Dict[str, Any]]: 与 jobs 顺序一致的 summary，包含帧数、耗时和 fps。
+    """
+    tasks = []
+    for job in jobs:
+        task = dict(kwargs)
+        task.update(job if isinstance(job, dict) else {'video': job[0], 'boxes': job[1]})
+        if output_dir is not None and 'output' not in task:
+            name = os.path.splitext(os.path.basename(task['video']))[0]
+            task['output'] = os.path.join(output_dir, f"{name}.{output_format}")
+        tasks.append(task)
+    if output_dir is not None and not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(processes, initializer=_init_process) as pool:
+        return list(pool.map(_track_job, tasks))
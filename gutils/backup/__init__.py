@@ -0,0 +1,10 @@
+"""
+代码目录备份：按 .packignore 过滤、基于 manifest 的增量备份和多线程压缩，命令行为 `gutils backup` / `gutils restore`；
+以及内容寻址的去重分块存储 ChunkStore，命令行为 `gutils backup --store` / `gutils store`。
+"""
+from .compress import ParallelGzipWriter
+from .engine import BackupEngine, restore
+from .ignore import PackIgnore, load_packignore, walk
+from .store import ChunkStore
+
+__all__ = ['BackupEngine', 'restore', 'ChunkStore', 'PackIgnore', 'load_packignore', 'walk', 'ParallelGzipWriter']
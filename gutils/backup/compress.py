@@ -0,0 +1,104 @@
+"""
+并行压缩输出流：
+
+    gz:  与 pigz 相同的思路，未压缩的数据按 chunk_size 切块，在线程池中各自压缩为独立的 gzip member，按顺序写出，
+         多个 member 首尾相接仍是合法的 gzip 文件，`tar xzf` 和 gzip 模块都可以直接解压
+    zst: 使用 zstandard 自带的多线程压缩，需要安装 zstandard
+"""
+import gzip
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO
+
+__all__ = ['ParallelGzipWriter', 'open_compressed', 'open_decompressed', 'COMPRESS_FORMATS']
+
+# 格式 -> 归档后缀
+COMPRESS_FORMATS = {'gz': '.tar.gz', 'zst': '.tar.zst'}
+
+
+def _import_zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zst format requires zstandard, please install it by `pip install zstandard`, "
+                          "or use the gz format.") from e
+    return zstandard
+
+
+class ParallelGzipWriter(object):
+    """
+    Parameters
+    ----------
+        fileobj: BinaryIO 输出文件，不会被关闭
+
+        workers: int 压缩线程数，默认为 CPU 核数，zlib 压缩时释放 GIL
+
+        level: int gzip 压缩等级
+
+        chunk_size: int 每个 gzip member 的未压缩大小，越小并行度越高，压缩率略有下降
+    """
+    def __init__(self, fileobj: BinaryIO, workers: int=None, level: int=6, chunk_size: int=4 << 20) -> None:
+        self.fileobj = fileobj
+        self.workers = workers or os.cpu_count() or 1
+        self.level = level
+        self.chunk_size = chunk_size
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='gutils-gzip')
+
+    def write(self, data: Any) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_size:
+            self._submit(bytes(self._buffer[:self.chunk_size]))
+            del self._buffer[:self.chunk_size]
+        return len(data)
+
+    def _submit(self, chunk: bytes) -> None:
+        self.bytes_in += len(chunk)
+        self._pending.append(self._executor.submit(gzip.compress, chunk, self.level, mtime=0))
+        # 最多保留 2 * workers 个压缩中的块，限制内存占用
+        while len(self._pending) > 2 * self.workers:
+            self._write_next()
+
+    def _write_next(self) -> None:
+        data = self._pending.popleft().result()
+        self.fileobj.write(data)
+        self.bytes_out += len(data)
+
+    def close(self) -> None:
+        if self._executor is None:
+            return
+        if self._buffer or not self.bytes_in:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        while self._pending:
+            self._write_next()
+        self._executor.shutdown()
+        self._executor = None
+        self.fileobj.flush()
+
+
+def open_compressed(fileobj: BinaryIO, format: str='gz', workers: int=None, level: int=None):
+    """
+    返回写入 fileobj 的压缩流，写完后调用其 close，fileobj 需要另外关闭。
+    """
+    if format == 'gz':
+        return ParallelGzipWriter(fileobj, workers, 6 if level is None else level)
+    if format == 'zst':
+        zstandard = _import_zstd()
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level, threads=workers or -1)
+        return compressor.stream_writer(fileobj, closefd=False)
+    raise ValueError(f"not support compress format: {format}, use one of {list(COMPRESS_FORMATS)}")
+
+
+def open_decompressed(path: str) -> BinaryIO:
+    """按后缀打开归档的解压流。"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        zstandard = _import_zstd()
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    raise ValueError(f"not support archive: {path}")
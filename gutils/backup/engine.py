@@ -0,0 +1,329 @@
+"""
+增量备份：每次备份后在 dest_dir 中保存 `<name>.manifest.json`，记录每个文件的大小、mtime 和 blake2b 哈希。
+下一次备份时大小和 mtime 都没有变化的文件直接跳过；只有 mtime 变化的文件重新计算哈希，内容相同也跳过；
+其余文件和新建的目录写入新的增量归档，被删除的文件和目录记录在 manifest 中。恢复时从最近一次全量归档开始依次解压之后的增量归档。
+"""
+import io
+import os
+import json
+import time
+import stat
+import hashlib
+import tarfile
+import warnings
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .compress import COMPRESS_FORMATS, open_compressed, open_decompressed
+from .ignore import load_packignore, walk
+
+__all__ = ['BackupEngine', 'restore', 'file_hash']
+
+MANIFEST_VERSION = 1
+
+
+def file_hash(path: str, block_size: int=1 << 20) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+
+class _HashingReader(io.RawIOBase):
+    """
+    tarfile 读取文件内容时顺便计算哈希，已修改的文件只读一遍。
+    文件在归档过程中变短或读取出错时用 0 补足 size 个字节，保证 tar 流完整，并将 short 置为 True。
+    """
+    def __init__(self, f, size: int) -> None:
+        self.f = f
+        self.remaining = size
+        self.short = False
+        self.digest = hashlib.blake2b(digest_size=16)
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int=-1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = b''
+        if not self.short:
+            try:
+                data = self.f.read(size)
+            except OSError:
+                data = b''
+            if len(data) < size:
+                self.short = True
+        if len(data) < size:
+            data += bytes(size - len(data))
+        self.remaining -= len(data)
+        self.digest.update(data)
+        return data
+
+
+def _manifest_path(dest_dir: str, name: str) -> str:
+    return os.path.join(dest_dir, f"{name}.manifest.json")
+
+
+def _load_manifest(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {'version': MANIFEST_VERSION, 'archives': [], 'files': {}, 'dirs': []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class BackupEngine(object):
+    """
+    Usage
+    --------
+        按 .packignore 过滤后备份 source，第一次（或 full=True 时）为全量归档，之后只归档发生变化的文件。
+        归档保存为 `<dest_dir>/<name>-<时间>-full.tar.gz`（或 -incr、.tar.zst），解压后得到 `<name>/...`，
+        与 `tar czf` 打包目录的结构相同。
+
+    Parameters
+    ----------
+        source: str 需要备份的目录
+
+        dest_dir: str 归档和 manifest 的保存目录，位于 source 内部时自动排除
+
+        packignore: str .packignore 路径，相对路径相对 source，为 None 时不使用；文件不存在时报错，避免误打包大文件
+
+        excludes: List[str] 额外排除的路径 glob，相对 source
+
+        format: str 'gz' 或 'zst'
+
+        workers: int 压缩线程数，默认为 CPU 核数
+
+        level: int 压缩等级，默认 gz 为 6，zst 为 3
+
+    Examples
+    --------
+>>>        engine = BackupEngine("/root/workdir", "/root/backups")
+>>>        summary = engine.run()
+>>>        restore("/root/backups", "/root/restored", name="workdir")
+    """
+    def __init__(self,
+                 source: str,
+                 dest_dir: str,
+                 packignore: str='.packignore',
+                 excludes: List[str]=None,
+                 format: str='gz',
+                 workers: int=None,
+                 level: int=None) -> None:
+        if format not in COMPRESS_FORMATS:
+            raise ValueError(f"not support compress format: {format}, use one of {list(COMPRESS_FORMATS)}")
+        self.source = os.path.abspath(source).rstrip(os.sep)
+        self.dest_dir = os.path.abspath(dest_dir)
+        self.name = os.path.basename(self.source)
+        self.format = format
+        self.workers = workers
+        self.level = level
+        self.manifest_path = _manifest_path(self.dest_dir, self.name)
+        self.ignore = load_packignore(self.source, packignore, excludes, self.dest_dir)
+
+    def scan(self,
+             files: Dict[str, list],
+             full: bool=False,
+             dirs: List[str]=None) -> Tuple[list, Dict[str, list], List[str], List[str]]:
+        """
+        遍历 source，与上一次的文件和目录记录比较。
+
+        Args:
+            files (Dict[str, list]): 上一次的文件记录。
+            full (bool, optional): 为 True 时所有文件和目录都需要归档。
+            dirs (List[str], optional): 上一次的目录列表，为 None（旧版本的 manifest）时所有目录都需要归档。
+
+        Returns:
+            Tuple[list, Dict[str, list], List[str], List[str]]: 需要归档的 `(相对路径, lstat)`、
+                未变化文件的新记录 `相对路径 -> [size, mtime_ns, hash]`、被删除的文件和目录以及当前的目录列表。
+        """
+        changed, unchanged, seen, seen_dirs = [], {}, set(), []
+        known_dirs = set(dirs) if dirs is not None and not full else set()
+        if full:
+            changed.append(('', os.lstat(self.source)))
+        for rel_path, st in walk(self.source, self.ignore):
+            if stat.S_ISDIR(st.st_mode):
+                seen_dirs.append(rel_path)
+                if rel_path not in known_dirs:
+                    changed.append((rel_path, st))
+                continue
+            seen.add(rel_path)
+            record = files.get(rel_path)
+            if full or record is None or record[0] != st.st_size:
+                changed.append((rel_path, st))
+            elif record[1] == st.st_mtime_ns:
+                unchanged[rel_path] = record
+            elif not stat.S_ISREG(st.st_mode):
+                changed.append((rel_path, st))
+            elif file_hash(os.path.join(self.source, rel_path)) == record[2]:
+                # 只是 touch 过，内容没有变化
+                unchanged[rel_path] = [st.st_size, st.st_mtime_ns, record[2]]
+            else:
+                changed.append((rel_path, st))
+        removed = sorted((set(files) - seen) | (known_dirs - set(seen_dirs)))
+        return changed, unchanged, removed, sorted(seen_dirs)
+
+    def _write_archive(self, path: str, entries: list) -> Tuple[Dict[str, list], List[str], int, int]:
+        records, skipped, bytes_in = {}, [], 0
+        with open(path + '.tmp', 'wb') as raw:
+            stream = open_compressed(raw, self.format, self.workers, self.level)
+            with tarfile.open(fileobj=stream, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+                for rel_path, st in entries:
+                    full_path = os.path.join(self.source, rel_path)
+                    try:
+                        tarinfo = tar.gettarinfo(full_path, arcname=os.path.join(self.name, rel_path))
+                        f = open(full_path, 'rb') if tarinfo.isreg() or tarinfo.islnk() else None
+                    except OSError as e:
+                        warnings.warn(f"skip {full_path}: {e}")
+                        continue
+                    if f is None:
+                        tar.addfile(tarinfo)
+                        if not tarinfo.isdir():
+                            records[rel_path] = [st.st_size, st.st_mtime_ns, None]
+                        continue
+                    if tarinfo.islnk():
+                        # 硬链接的另一端不一定在增量归档中，统一保存为普通文件
+                        tarinfo.type, tarinfo.linkname, tarinfo.size = tarfile.REGTYPE, '', st.st_size
+                    with f:
+                        reader = _HashingReader(f, tarinfo.size)
+                        tar.addfile(tarinfo, reader)
+                    if reader.short:
+                        # 头部已经写入 tar 流，内容用 0 补齐，恢复时跳过该成员
+                        warnings.warn(f"skip {full_path}: file changed while being archived")
+                        skipped.append(rel_path)
+                        continue
+                    records[rel_path] = [tarinfo.size, st.st_mtime_ns, reader.digest.hexdigest()]
+                    bytes_in += tarinfo.size
+            stream.close()
+            bytes_out = raw.tell()
+        os.replace(path + '.tmp', path)
+        return records, skipped, bytes_in, bytes_out
+
+    def run(self, full: bool=False) -> Dict[str, Any]:
+        """
+        执行一次备份，没有任何变化时不生成归档。
+
+        Args:
+            full (bool, optional): 为 True 时忽略 manifest 做全量备份，没有 manifest 时总是全量备份。
+
+        Returns:
+            Dict[str, Any]: 归档路径（没有变化时为 None）、类型、归档/未变化/删除的文件数、原始字节数、压缩后字节数和耗时。
+        """
+        start = time.perf_counter()
+        os.makedirs(self.dest_dir, exist_ok=True)
+        manifest = _load_manifest(self.manifest_path)
+        full = full or not any(archive['type'] == 'full' for archive in manifest['archives'])
+        changed, unchanged, removed, dirs = self.scan(manifest['files'], full, manifest.get('dirs'))
+        summary = OrderedDict([('archive', None), ('type', 'full' if full else 'incremental'),
+                               ('files', sum(not stat.S_ISDIR(st.st_mode) for _, st in changed)),
+                               ('unchanged', len(unchanged)), ('removed', 0 if full else len(removed)),
+                               ('bytes', 0), ('compressed_bytes', 0)])
+        if not full and not changed and not removed:
+            summary['seconds'] = time.perf_counter() - start
+            print(f"=> backup {self.source}: nothing changed, {len(unchanged)} files up to date.")
+            return summary
+
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        suffix = 'full' if full else 'incr'
+        path = os.path.join(self.dest_dir, f"{self.name}-{stamp}-{suffix}{COMPRESS_FORMATS[self.format]}")
+        index = 1
+        while os.path.exists(path):
+            index += 1
+            path = os.path.join(self.dest_dir, f"{self.name}-{stamp}-{index}-{suffix}{COMPRESS_FORMATS[self.format]}")
+        records, skipped, bytes_in, bytes_out = self._write_archive(path, changed)
+        summary['files'] -= len(skipped)
+
+        files = dict(unchanged)
+        files.update(records)
+        manifest['files'] = dict(sorted(files.items()))
+        manifest['dirs'] = dirs
+        manifest['archives'].append(OrderedDict([('name', os.path.basename(path)), ('type', summary['type']),
+                                                 ('time', stamp), ('files', summary['files']),
+                                                 ('removed', [] if full else removed), ('skipped', skipped)]))
+        with open(self.manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+
+        summary.update(archive=path, bytes=bytes_in, compressed_bytes=bytes_out,
+                       seconds=time.perf_counter() - start)
+        print(f"=> {summary['type']} backup of {self.source} saved at {path}: {summary['files']} files changed, "
+              f"{summary['unchanged']} unchanged, {summary['removed']} removed, "
+              f"{bytes_in / 2**20:.1f} MB -> {bytes_out / 2**20:.1f} MB in {summary['seconds']:.1f}s.")
+        return summary
+
+
+def _extract(tar: tarfile.TarFile, target: str, skip: Iterable[str]=()) -> None:
+    """
+    解压归档，符号链接按原样恢复（包括指向绝对路径或 source 之外的链接），只拒绝绝对路径或包含 `..` 的成员名。
+    skip 中的成员（归档过程中发生变化的文件）不解压。
+    """
+    skip = set(skip)
+
+    def members():
+        for member in tar:
+            if member.name in skip:
+                continue
+            names = [member.name, member.linkname] if member.islnk() else [member.name]
+            for name in names:
+                if os.path.isabs(name) or '..' in name.split('/'):
+                    raise ValueError(f"refuse to extract {member.name}: path outside of {target}")
+            yield member
+
+    if hasattr(tarfile, 'tar_filter'):
+        tar.extractall(target, members=members(), filter='tar')
+    else:
+        tar.extractall(target, members=members())
+
+
+def restore(dest_dir: str, target: str, name: str=None, until: str=None) -> List[str]:
+    """
+    从 dest_dir 中的归档恢复到 target，得到 `target/<name>/...`。
+
+    Args:
+        dest_dir (str): BackupEngine 的 dest_dir。
+        target (str): 恢复到的目录。
+        name (str, optional): 备份目录名，dest_dir 中只有一个 manifest 时可以省略。
+        until (str, optional): 只恢复到该归档（文件名）为止，默认为最新。
+
+    Returns:
+        List[str]: 依次解压的归档路径。
+    """
+    if name is None:
+        names = [f[:-len('.manifest.json')] for f in os.listdir(dest_dir) if f.endswith('.manifest.json')]
+        if len(names) != 1:
+            raise ValueError(f"found manifests of {names} in {dest_dir}, please specify name")
+        name = names[0]
+    archives = _load_manifest(_manifest_path(dest_dir, name))['archives']
+    if until is not None:
+        names = [archive['name'] for archive in archives]
+        if until not in names:
+            raise ValueError(f"archive {until} is not in the manifest of {name}")
+        archives = archives[:names.index(until) + 1]
+    fulls = [i for i, archive in enumerate(archives) if archive['type'] == 'full']
+    if not fulls:
+        raise ValueError(f"no full backup of {name} in {dest_dir}")
+    restored = []
+    for archive in archives[fulls[-1]:]:
+        path = os.path.join(dest_dir, archive['name'])
+        skip = [f"{name}/{rel_path}" for rel_path in archive.get('skipped', [])]
+        with open_decompressed(path) as stream, tarfile.open(fileobj=stream, mode='r|') as tar:
+            _extract(tar, target, skip)
+        # 逆序删除，目录中被删除的文件先于目录本身
+        for rel_path in sorted(archive['removed'], reverse=True):
+            removed_path = os.path.join(target, name, rel_path)
+            if os.path.isdir(removed_path) and not os.path.islink(removed_path):
+                try:
+                    os.rmdir(removed_path)
+                except OSError as e:
+                    warnings.warn(f"could not remove directory {removed_path}: {e}")
+            elif os.path.lexists(removed_path):
+                os.remove(removed_path)
+            else:
+                warnings.warn(f"{removed_path} recorded as removed does not exist")
+        restored.append(path)
+        print(f"=> restored {path}")
+    return restored
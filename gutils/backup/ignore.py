@@ -0,0 +1,115 @@
+"""
+.packignore 规则，与 scripts/backup/backup.sh 一致：
+
+    以 / 结尾的行匹配任意层级的目录名，如 log*/、__pycache__/，匹配到的目录整体跳过
+    其余行匹配任意层级的文件名，如 *.pth、*remote*
+    空行和 # 开头的行忽略
+
+另外支持 excludes：相对备份根目录（或绝对路径）的 glob，匹配到的文件或目录跳过。
+全部规则编译为正则后在一次目录遍历中判断，不再为每条规则遍历一次目录树。
+"""
+import os
+import re
+import stat
+import fnmatch
+from typing import Iterable, Iterator, List, Tuple
+
+__all__ = ['PackIgnore', 'load_packignore', 'walk']
+
+
+def _compile(patterns: List[str]):
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{fnmatch.translate(pattern)})' for pattern in patterns))
+
+
+class PackIgnore(object):
+    """
+    Parameters
+    ----------
+        patterns: Iterable[str] .packignore 中的行
+
+        excludes: Iterable[str] 额外排除的路径 glob，相对备份根目录
+    """
+    def __init__(self, patterns: Iterable[str]=(), excludes: Iterable[str]=()) -> None:
+        dir_patterns, file_patterns = [], []
+        for line in patterns:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.endswith('/'):
+                dir_patterns.append(line.rstrip('/'))
+            else:
+                file_patterns.append(line)
+        self.dir_patterns = dir_patterns
+        self.file_patterns = file_patterns
+        self.excludes = [os.path.normpath(pattern).lstrip(os.sep) for pattern in excludes]
+        self._dir_re = _compile(dir_patterns)
+        self._file_re = _compile(file_patterns)
+        self._exclude_re = _compile(self.excludes)
+
+    @classmethod
+    def from_file(cls, path: str, excludes: Iterable[str]=()) -> 'PackIgnore':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.read().splitlines(), excludes)
+
+    def ignore_dir(self, name: str, rel_path: str) -> bool:
+        return (self._dir_re is not None and self._dir_re.match(name) is not None) or \
+            (self._exclude_re is not None and self._exclude_re.match(rel_path) is not None)
+
+    def ignore_file(self, name: str, rel_path: str) -> bool:
+        return (self._file_re is not None and self._file_re.match(name) is not None) or \
+            (self._exclude_re is not None and self._exclude_re.match(rel_path) is not None)
+
+
+def load_packignore(source: str,
+                    packignore: str='.packignore',
+                    excludes: Iterable[str]=None,
+                    dest_dir: str=None) -> PackIgnore:
+    """
+    读取 source 的过滤规则。
+
+    Args:
+        source (str): 备份的目录。
+        packignore (str, optional): .packignore 路径，相对路径相对 source，为 None 时不使用；
+            文件不存在时报错，避免误打包大文件。
+        excludes (Iterable[str], optional): 额外排除的路径 glob，相对 source。
+        dest_dir (str, optional): 备份保存的目录，位于 source 内部时自动排除。
+    """
+    source = os.path.abspath(source)
+    excludes = list(excludes or [])
+    if dest_dir is not None:
+        dest_dir = os.path.abspath(dest_dir)
+        if dest_dir != source and os.path.commonpath([source, dest_dir]) == source:
+            excludes.append(os.path.relpath(dest_dir, source))
+    if packignore is None:
+        return PackIgnore((), excludes)
+    path = packignore if os.path.isabs(packignore) else os.path.join(source, packignore)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No {path} found! pass packignore=None (--no-packignore) to back up everything.")
+    return PackIgnore.from_file(path, excludes)
+
+
+def walk(root: str, ignore: PackIgnore=None) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    遍历 root 下未被忽略的目录、文件和符号链接（不跟随），按路径排序产出 `(相对路径, lstat 结果)`，
+    被忽略的目录不会进入。
+    """
+    ignore = ignore or PackIgnore()
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(os.path.join(root, rel_dir)) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        sub_dirs = []
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name)
+            st = entry.stat(follow_symlinks=False)
+            if stat.S_ISDIR(st.st_mode):
+                if not ignore.ignore_dir(entry.name, rel_path):
+                    yield rel_path, st
+                    sub_dirs.append(rel_path)
+            elif not ignore.ignore_file(entry.name, rel_path):
+                yield rel_path, st
+        # 栈是后进先出，逆序压入以保持按名称的深度优先顺序
+        stack.extend(reversed(sub_dirs))
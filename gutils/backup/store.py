@@ -0,0 +1,428 @@
+"""
+内容寻址的去重分块存储：文件按内容切块（content-defined chunking），每块以 blake2b 哈希为名只保存一次，
+快照只记录每个文件由哪些块组成。相邻两天的备份或同一训练的相邻 checkpoint 大部分内容相同，
+新增的存储和拷贝量只与发生变化的数据成正比。
+
+    <root>/config.json                  分块参数，同一个 store 固定不变，保证相同内容切出相同的块
+    <root>/lock                         snapshot / restore / verify 持有共享锁，prune / gc 持有排他锁
+    <root>/chunks/<hash[:2]>/<hash>     数据块，第一个字节为 Z（zlib 压缩）或 R（原始数据）
+    <root>/snapshots/<name>/<id>.json   快照
+
+切块：对每个字节查随机表后在 window 字节的滑动窗口内求和（numpy cumsum 向量化计算），
+窗口和的低位全为 0 的位置作为候选切点，块长限制在 [min_chunk, max_chunk]。
+插入或删除数据只影响附近的块，之后的切点与原来对齐。
+"""
+import os
+import json
+import time
+import stat
+import zlib
+import hashlib
+import warnings
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple, Union
+
+from .ignore import PackIgnore, walk
+
+__all__ = ['ChunkStore']
+
+STORE_VERSION = 1
+
+
+def _restore_path(root: str, rel_path: str) -> str:
+    """
+    快照中的相对路径在 root 下对应的路径。与 BackupEngine 解压时相同，拒绝绝对路径和包含 `..` 的路径；
+    链接按原样恢复，因此也拒绝经过已有链接落到 root 之外的路径。
+    """
+    parts = rel_path.replace(os.sep, '/').split('/')
+    if os.path.isabs(rel_path) or '..' in parts:
+        raise ValueError(f"refuse to restore {rel_path}: path outside of {root}")
+    path = os.path.join(root, rel_path)
+    real_root, parent = os.path.realpath(root), os.path.realpath(os.path.dirname(path))
+    if parent != real_root and not parent.startswith(real_root + os.sep):
+        raise ValueError(f"refuse to restore {rel_path}: path outside of {root}")
+    return path
+
+
+class ChunkStore(object):
+    """
+    Parameters
+    ----------
+        root: str store 目录，不存在时创建
+
+        avg_chunk: int 平均块大小，只在创建 store 时生效，之后从 config.json 读取
+
+        level: int zlib 压缩等级，0 表示不压缩
+
+        workers: int 计算哈希和压缩的线程数，默认为 CPU 核数
+
+    Examples
+    --------
+>>>        store = ChunkStore("/root/store")
+>>>        snapshot = store.snapshot("/root/workdir", ignore=PackIgnore.from_file("/root/workdir/.packignore"))
+>>>        store.restore(snapshot['id'], "/root/restored")
+>>>        store.prune("workdir", keep=7)
+>>>        store.gc()
+    """
+    def __init__(self, root: str, avg_chunk: int=1 << 20, level: int=3, workers: int=None) -> None:
+        self.root = os.path.abspath(root)
+        self.level = level
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_dir = os.path.join(self.root, 'chunks')
+        self.snapshot_dir = os.path.join(self.root, 'snapshots')
+        config_path = os.path.join(self.root, 'config.json')
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                self.config = json.load(f)
+        else:
+            os.makedirs(self.chunk_dir, exist_ok=True)
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            self.config = OrderedDict([('version', STORE_VERSION), ('avg_chunk', avg_chunk),
+                                       ('min_chunk', avg_chunk // 4), ('max_chunk', avg_chunk * 4),
+                                       ('window', 64), ('seed', 0)])
+            with open(config_path, 'w', encoding='utf-8') as f:
+                json.dump(self.config, f, indent=2)
+        self._table = None
+
+    @contextmanager
+    def _lock(self, exclusive: bool=False):
+        """
+        store 级别的文件锁：写快照时 gc 不会删除已写入但还没有被快照引用的块。
+        没有 fcntl 的平台上不加锁，此时不要在 snapshot 进行中执行 gc。
+        """
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        with open(os.path.join(self.root, 'lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @classmethod
+    def create(cls, store: Union[str, 'ChunkStore'], **kwargs) -> 'ChunkStore':
+        return store if isinstance(store, ChunkStore) else cls(store, **kwargs)
+
+    # ------------------------------------------------------------------ 切块
+    def _cut_points(self, buf: bytes, eof: bool) -> List[int]:
+        """buf 中的切点（块的结束位置），buf 末尾不足一块且未到文件结尾的数据留给下一次。"""
+        import numpy as np
+        if self._table is None:
+            rng = np.random.default_rng(self.config['seed'])
+            self._table = rng.integers(0, 1 << 32, 256, dtype=np.uint64).astype(np.uint32)
+        window, min_chunk, max_chunk = self.config['window'], self.config['min_chunk'], self.config['max_chunk']
+        mask = (1 << max(int(self.config['avg_chunk'] - min_chunk).bit_length() - 1, 1)) - 1
+        n = len(buf)
+        if n > window:
+            # uint32 累加按 2**32 取模回绕，相减后仍是窗口内的和
+            sums = np.zeros(n + 1, dtype=np.uint32)
+            np.cumsum(self._table[np.frombuffer(buf, dtype=np.uint8)], dtype=np.uint32, out=sums[1:])
+            candidates = np.flatnonzero(((sums[window:] - sums[:-window]) & mask) == 0) + window
+        else:
+            candidates = np.zeros(0, dtype=np.int64)
+        cuts, last = [], 0
+        while last + min_chunk < n or (eof and last < n):
+            index = np.searchsorted(candidates, last + min_chunk)
+            if index < len(candidates) and candidates[index] <= last + max_chunk:
+                cut = int(candidates[index])
+            elif last + max_chunk <= n:
+                cut = last + max_chunk
+            elif eof:
+                cut = n
+            else:
+                break
+            cuts.append(cut)
+            last = cut
+        return cuts
+
+    def iter_chunks(self, f: BinaryIO, block_size: int=16 << 20) -> Iterator[bytes]:
+        """按内容切块读取 f。"""
+        buf = b''
+        while True:
+            data = f.read(block_size)
+            eof = not data
+            buf = buf + data if buf else data
+            start = 0
+            for cut in self._cut_points(buf, eof):
+                yield buf[start:cut]
+                start = cut
+            buf = buf[start:]
+            if eof:
+                return
+
+    # ------------------------------------------------------------------ 数据块
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def put_chunk(self, data: bytes) -> Tuple[str, int]:
+        """保存一个块，返回哈希和新写入的字节数，已存在时为 0。"""
+        digest = hashlib.blake2b(data, digest_size=32).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        payload = b'Z' + zlib.compress(data, self.level) if self.level else b'R' + data
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{id(data)}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return digest, len(payload)
+
+    def get_chunk(self, digest: str, verify: bool=True) -> bytes:
+        with open(self._chunk_path(digest), 'rb') as f:
+            payload = f.read()
+        data = zlib.decompress(payload[1:]) if payload[:1] == b'Z' else payload[1:]
+        if verify and hashlib.blake2b(data, digest_size=32).hexdigest() != digest:
+            raise ValueError(f"chunk {digest} is corrupted")
+        return data
+
+    def put_file(self, path: str, executor: ThreadPoolExecutor=None) -> Tuple[List[str], int, int]:
+        """
+        切块保存一个文件，哈希和压缩在线程池中进行。
+
+        Returns:
+            Tuple[List[str], int, int]: 块哈希列表、文件大小和新写入的字节数。
+        """
+        digests, size, written = [], 0, 0
+        pending = deque()
+
+        def collect():
+            digest, nbytes = pending.popleft().result()
+            digests.append(digest)
+            return nbytes
+
+        with open(path, 'rb') as f:
+            for chunk in self.iter_chunks(f):
+                size += len(chunk)
+                if executor is None:
+                    digest, nbytes = self.put_chunk(chunk)
+                    digests.append(digest)
+                    written += nbytes
+                    continue
+                pending.append(executor.submit(self.put_chunk, chunk))
+                # 限制排队中的块数，大文件不会整个读入内存
+                while len(pending) > 2 * self.workers:
+                    written += collect()
+        while pending:
+            written += collect()
+        return digests, size, written
+
+    # ------------------------------------------------------------------ 快照
+    def _snapshot_path(self, snapshot_id: str) -> str:
+        name = snapshot_id.rsplit('-', 2)[0]
+        return os.path.join(self.snapshot_dir, name, snapshot_id + '.json')
+
+    def snapshots(self, name: str=None) -> List[str]:
+        """按时间排序的快照 id。"""
+        if name is not None:
+            names = [name]
+        else:
+            names = sorted(os.listdir(self.snapshot_dir)) if os.path.isdir(self.snapshot_dir) else []
+        ids = []
+        for key in names:
+            directory = os.path.join(self.snapshot_dir, key)
+            if os.path.isdir(directory):
+                ids.extend(sorted(f[:-len('.json')] for f in os.listdir(directory) if f.endswith('.json')))
+        return ids
+
+    def load_snapshot(self, snapshot_id: str) -> Dict[str, Any]:
+        with open(self._snapshot_path(snapshot_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def snapshot(self,
+                 source: str,
+                 name: str=None,
+                 ignore: PackIgnore=None,
+                 files: Iterable[str]=None) -> Dict[str, Any]:
+        """
+        为 source 目录建立快照，大小和 mtime 与同名上一个快照相同的文件直接沿用其块列表，不再读取。
+
+        Args:
+            source (str): 目录。
+            name (str, optional): 快照名，默认为目录名。
+            ignore (PackIgnore, optional): 过滤规则。
+            files (Iterable[str], optional): 只保存这些文件（相对 source 的路径），不遍历目录，如转换后的 checkpoint。
+
+        Returns:
+            Dict[str, Any]: 快照 id、文件数、总字节数、新写入的字节数和耗时。
+        """
+        with self._lock():
+            return self._snapshot(source, name, ignore, files)
+
+    def _snapshot(self, source: str, name: str, ignore: PackIgnore, files: Iterable[str]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        source = os.path.abspath(source).rstrip(os.sep)
+        name = name or os.path.basename(source)
+        previous = self.snapshots(name)
+        previous = self.load_snapshot(previous[-1])['files'] if previous else {}
+        if files is None:
+            entries = walk(source, ignore)
+        else:
+            entries = ((rel_path, os.lstat(os.path.join(source, rel_path))) for rel_path in files)
+
+        manifest_files, links, dirs = OrderedDict(), OrderedDict(), OrderedDict()
+        total, written, reused = 0, 0, 0
+        with ThreadPoolExecutor(self.workers, thread_name_prefix='gutils-store') as executor:
+            for rel_path, st in entries:
+                if stat.S_ISDIR(st.st_mode):
+                    dirs[rel_path] = stat.S_IMODE(st.st_mode)
+                    continue
+                if stat.S_ISLNK(st.st_mode):
+                    links[rel_path] = os.readlink(os.path.join(source, rel_path))
+                    continue
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                record = previous.get(rel_path)
+                if record is not None and record['size'] == st.st_size and record['mtime_ns'] == st.st_mtime_ns:
+                    manifest_files[rel_path] = record
+                    total += st.st_size
+                    reused += 1
+                    continue
+                try:
+                    digests, size, nbytes = self.put_file(os.path.join(source, rel_path), executor)
+                except OSError as e:
+                    warnings.warn(f"skip {rel_path}: {e}")
+                    continue
+                manifest_files[rel_path] = OrderedDict([('size', size), ('mtime_ns', st.st_mtime_ns),
+                                                        ('mode', stat.S_IMODE(st.st_mode)), ('chunks', digests)])
+                total += size
+                written += nbytes
+
+        # id 为 `<name>-<日期>-<时间>`，同一秒内的多个快照加上序号
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        snapshot_id, index = f"{name}-{stamp}", 1
+        while os.path.exists(self._snapshot_path(snapshot_id)):
+            index += 1
+            snapshot_id = f"{name}-{stamp}_{index}"
+        manifest = OrderedDict([('id', snapshot_id), ('name', name), ('source', source), ('time', stamp),
+                                ('files', manifest_files), ('links', links), ('dirs', dirs)])
+        path = self._snapshot_path(snapshot_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(path + '.tmp', path)
+
+        summary = OrderedDict([('id', snapshot_id), ('files', len(manifest_files)), ('reused_files', reused),
+                               ('bytes', total), ('written_bytes', written),
+                               ('seconds', time.perf_counter() - start)])
+        print(f"=> snapshot {snapshot_id}: {len(manifest_files)} files ({reused} unchanged), "
+              f"{total / 2**20:.1f} MB, {written / 2**20:.1f} MB new data written in {summary['seconds']:.1f}s.")
+        return summary
+
+    def restore(self, snapshot_id: str, target: str, verify: bool=True) -> str:
+        """
+        将快照恢复到 `target/<name>`，返回恢复后的目录。
+        """
+        with self._lock():
+            return self._restore(snapshot_id, target, verify)
+
+    def _restore(self, snapshot_id: str, target: str, verify: bool) -> str:
+        manifest = self.load_snapshot(snapshot_id)
+        root = _restore_path(target, manifest['name'])
+        os.makedirs(root, exist_ok=True)
+        # 目录按路径排序，父目录先于子目录；恢复过程中保持可写，最后再设置记录的权限
+        for rel_path in sorted(manifest['dirs']):
+            path = _restore_path(root, rel_path)
+            os.makedirs(path, exist_ok=True)
+            os.chmod(path, stat.S_IRWXU)
+        for rel_path, record in manifest['files'].items():
+            path = _restore_path(root, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 已有的文件（可能是只读的或链接）先删除再写入，再次恢复到同一目录时不会失败
+            if os.path.lexists(path):
+                os.remove(path)
+            with open(path, 'xb') as f:
+                for digest in record['chunks']:
+                    f.write(self.get_chunk(digest, verify))
+            os.chmod(path, record['mode'])
+            os.utime(path, ns=(record['mtime_ns'], record['mtime_ns']))
+        for rel_path, link in manifest['links'].items():
+            path = _restore_path(root, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.lexists(path):
+                os.remove(path)
+            os.symlink(link, path)
+        for rel_path, mode in manifest['dirs'].items():
+            os.chmod(_restore_path(root, rel_path), mode)
+        print(f"=> restored {snapshot_id} to {root}")
+        return root
+
+    def forget(self, snapshot_id: str) -> None:
+        """删除快照，数据块在 gc 时才删除。"""
+        os.remove(self._snapshot_path(snapshot_id))
+
+    def prune(self, name: str, keep: int) -> List[str]:
+        """只保留 name 最近的 keep 个快照，返回被删除的快照 id。"""
+        with self._lock(exclusive=True):
+            removed = self.snapshots(name)[:-keep] if keep > 0 else self.snapshots(name)
+            for snapshot_id in removed:
+                self.forget(snapshot_id)
+        return removed
+
+    def gc(self) -> Dict[str, int]:
+        """
+        删除不被任何快照引用的数据块。持有排他锁，会等待进行中的 snapshot 结束；
+        临时文件和 gc 开始之后写入的块总是保留。
+        """
+        with self._lock(exclusive=True):
+            return self._gc(time.time())
+
+    def _gc(self, start: float) -> Dict[str, int]:
+        referenced = set()
+        for snapshot_id in self.snapshots():
+            for record in self.load_snapshot(snapshot_id)['files'].values():
+                referenced.update(record['chunks'])
+        removed, freed, kept = 0, 0, 0
+        for prefix in os.listdir(self.chunk_dir):
+            directory = os.path.join(self.chunk_dir, prefix)
+            for entry in os.scandir(directory):
+                if entry.name in referenced:
+                    kept += 1
+                    continue
+                if entry.name.endswith('.tmp'):
+                    continue
+                st = entry.stat()
+                if st.st_mtime >= start:
+                    continue
+                os.remove(entry.path)
+                freed += st.st_size
+                removed += 1
+        print(f"=> gc: removed {removed} chunks ({freed / 2**20:.1f} MB), {kept} chunks referenced.")
+        return {'removed_chunks': removed, 'freed_bytes': freed, 'chunks': kept}
+
+    def verify(self, snapshot_id: str=None) -> Dict[str, List[str]]:
+        """
+        检查快照（默认为全部快照）引用的数据块是否存在且哈希正确。
+
+        Returns:
+            Dict[str, List[str]]: 缺失的块 `missing` 和损坏的块 `corrupted`。
+        """
+        with self._lock():
+            digests = OrderedDict()
+            for key in ([snapshot_id] if snapshot_id is not None else self.snapshots()):
+                for record in self.load_snapshot(key)['files'].values():
+                    digests.update((digest, None) for digest in record['chunks'])
+            missing, corrupted = [], []
+            for digest in digests:
+                try:
+                    self.get_chunk(digest, verify=True)
+                except FileNotFoundError:
+                    missing.append(digest)
+                except (ValueError, zlib.error):
+                    corrupted.append(digest)
+        print(f"=> verify: {len(digests)} chunks, {len(missing)} missing, {len(corrupted)} corrupted.")
+        return {'missing': missing, 'corrupted': corrupted}
+
+    def stats(self) -> Dict[str, int]:
+        """数据块个数和占用的字节数。"""
+        count, nbytes = 0, 0
+        for prefix in os.listdir(self.chunk_dir):
+            for entry in os.scandir(os.path.join(self.chunk_dir, prefix)):
+                count += 1
+                nbytes += entry.stat().st_size
+        return {'chunks': count, 'bytes': nbytes, 'snapshots': len(self.snapshots())}
@@ -0,0 +1,3 @@
+"""
+性能基准脚本，使用 `python -m gutils.benchmarks.<name>` 运行。
+"""
@@ -0,0 +1,98 @@
+"""
+`import gutils` 的启动耗时基准：在干净的子进程中多次导入，统计耗时并检查没有提前导入重量级框架。
+
+    python -m gutils.benchmarks.import_time --budget-ms 200
+    python -m gutils.benchmarks.import_time --module gutils.ckpt_tr --importtime
+
+超出 --budget-ms 或导入了 --forbid 中的模块时以非零状态码退出，可以直接放进 CI。
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List
+
+__all__ = ['measure_import', 'main']
+
+HEAVY_MODULES = ['torch', 'paddle', 'numpy', 'cv2', 'skimage']
+
+_SNIPPET = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str='gutils', repeat: int=5, heavy: List[str]=None) -> Dict[str, Any]:
+    """
+    在新的解释器中导入 module repeat 次。
+
+    Args:
+        module (str): 被测模块。
+        repeat (int): 重复次数，每次都是新的子进程，不受 sys.modules 缓存影响。
+        heavy (List[str], optional): 需要检查是否被导入的模块，默认为 HEAVY_MODULES。
+
+    Returns:
+        Dict[str, Any]: 各次耗时（毫秒）、中位数、最小值以及被导入的重量级模块。
+    """
+    heavy = HEAVY_MODULES if heavy is None else heavy
+    code = _SNIPPET.format(module=module, heavy=heavy)
+    times, loaded = [], set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result['seconds'] * 1000.)
+        loaded.update(result['loaded'])
+    return {'module': module, 'times_ms': times, 'median_ms': statistics.median(times),
+            'min_ms': min(times), 'loaded': sorted(loaded)}
+
+
+def _print_importtime(module: str, top: int=15) -> None:
+    """打印 `python -X importtime` 中累计耗时最长的模块。"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], check=True,
+                            stderr=subprocess.PIPE, universal_newlines=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.rstrip()))
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"    {cumulative / 1000.:9.2f} ms  {name}")
+
+
+def main(argv: List[str]=None) -> int:
+    parser = argparse.ArgumentParser(description="measure import time of gutils")
+    parser.add_argument('--module', default='gutils')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=None, help="fail if median import time exceeds it")
+    parser.add_argument('--forbid', nargs='*', default=HEAVY_MODULES, help="modules that must not be imported")
+    parser.add_argument('--importtime', action='store_true', help="show the slowest modules from -X importtime")
+    parser.add_argument('--json', action='store_true', help="print result as json")
+    args = parser.parse_args(argv)
+
+    result = measure_import(args.module, args.repeat, args.forbid)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"=> import {args.module}: median {result['median_ms']:.2f} ms, min {result['min_ms']:.2f} ms "
+              f"({args.repeat} runs)")
+    if args.importtime:
+        _print_importtime(args.module)
+
+    status = 0
+    if result['loaded']:
+        print(f"=> heavy modules imported: {', '.join(result['loaded'])}")
+        status = 1
+    if args.budget_ms is not None and result['median_ms'] > args.budget_ms:
+        print(f"=> import time {result['median_ms']:.2f} ms exceeds budget {args.budget_ms:.2f} ms")
+        status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,382 @@
+"""
+性能基准套件：在合成数据上测量关键字分析耗时、权重转换吞吐（GB/s）、峰值内存、跟踪帧率和导入耗时，
+结果可以保存为基线，之后的运行与基线比较，变差超过 --tolerance 时以非零状态码退出，可以直接放进 CI。
+
+    python -m gutils.benchmarks.suite --save baseline.json
+    python -m gutils.benchmarks.suite --compare baseline.json --tolerance 0.15
+    python -m gutils.benchmarks.suite --cases conversion tracker --backends numpy torch --quick
+
+合成数据保存在 --workdir（默认为临时目录），指定 --workdir 时再次运行会复用已生成的数据。
+除导入耗时外每个用例在单独的子进程中运行，峰值内存（ru_maxrss）只包含该用例本身。
+"""
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import warnings
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+__all__ = ['CASES', 'DEFAULT_CONFIG', 'QUICK_CONFIG', 'prepare', 'run_case', 'run_suite',
+           'save_baseline', 'compare', 'format_report', 'main']
+
+CASES = ('import', 'analysis', 'conversion', 'tracker')
+
+DEFAULT_CONFIG = {
+    'backends': ['numpy', 'safetensors', 'torch', 'paddle'],
+    'analysis_keys': 20000,
+    'analysis_numel': 64,
+    'conversion_keys': 96,
+    'conversion_numel': 1 << 20,
+    'workers': 1,
+    'video_frames': 300,
+    'video_size': [640, 480],
+    'match_methods': ['direct', 'pyramid', 'fft'],
+    'repeat': 3,
+}
+
+# --quick 时覆盖的配置，用于快速检查，结果不要与完整配置的基线比较
+QUICK_CONFIG = {
+    'analysis_keys': 2000,
+    'conversion_keys': 24,
+    'conversion_numel': 1 << 18,
+    'video_frames': 60,
+    'repeat': 1,
+}
+
+# 越大越好的指标，其余指标（耗时、内存、误差）越小越好
+HIGHER_IS_BETTER = ('gb_per_s', 'fps')
+
+BASELINE_VERSION = 1
+
+_RULES = {'rules': [{'type': 'prefix', 'pattern': 'model', 'replace': 'backbone'}]}
+_TRANSPOSE_PATTERN = r'\.(qkv|proj|fc1|fc2)\.weight$'
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss 在 Linux 上会从父进程继承，优先使用 exec 后重新计数的 VmHWM
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def _median_time(fn, repeat: int) -> Tuple[float, Any]:
+    times, result = [], None
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def _backends(config: Dict[str, Any], verbose: bool=False) -> List[str]:
+    from .synthetic import backend_available
+    backends = []
+    for backend in config['backends']:
+        if backend_available(backend):
+            backends.append(backend)
+        elif verbose:
+            print(f"=> skip {backend} checkpoints: {backend} is not installed.")
+    return backends
+
+
+def _analysis_paths(workdir: str, config: Dict[str, Any]) -> Tuple[str, str]:
+    name = f"analysis-{config['analysis_keys']}x{config['analysis_numel']}"
+    return os.path.join(workdir, f"{name}-source"), os.path.join(workdir, f"{name}-target")
+
+
+def _conversion_path(workdir: str, config: Dict[str, Any]) -> str:
+    return os.path.join(workdir, f"conversion-{config['conversion_keys']}x{config['conversion_numel']}")
+
+
+def _video_path(workdir: str, config: Dict[str, Any]) -> str:
+    width, height = config['video_size']
+    return os.path.join(workdir, f"video-{config['video_frames']}-{width}x{height}.avi")
+
+
+def prepare(workdir: str, cases: List[str], config: Dict[str, Any]) -> None:
+    """生成 cases 需要的合成数据，已存在的文件直接复用。"""
+    from .synthetic import make_checkpoint, make_video
+    os.makedirs(workdir, exist_ok=True)
+    backends = _backends(config, verbose=True) if 'analysis' in cases or 'conversion' in cases else []
+    for backend in backends:
+        if 'analysis' in cases:
+            source, target = _analysis_paths(workdir, config)
+            make_checkpoint(source, backend, config['analysis_keys'], config['analysis_numel'], prefix='model')
+            make_checkpoint(target, backend, config['analysis_keys'], config['analysis_numel'], prefix='backbone')
+        if 'conversion' in cases:
+            make_checkpoint(_conversion_path(workdir, config), backend, config['conversion_keys'],
+                            config['conversion_numel'], prefix='model')
+    if 'tracker' in cases:
+        path = _video_path(workdir, config)
+        if not os.path.exists(path + '.npy'):
+            video = make_video(path, config['video_frames'], tuple(config['video_size']))
+            import numpy as np
+            np.save(path + '.npy', video['boxes'])
+
+
+def _bench_import(workdir: str, module: str, config: Dict[str, Any]) -> Dict[str, float]:
+    from .import_time import measure_import
+    result = measure_import(module, max(config['repeat'], 5))
+    return {'median_ms': result['median_ms'], 'min_ms': result['min_ms']}
+
+
+def _bench_analysis(workdir: str, backend: str, config: Dict[str, Any]) -> Dict[str, float]:
+    from ..ckpt_tr import KeyMatcher, WeightTrans
+    from ..ckpt_tr.writers import EXTENSIONS
+    source, target = (path + EXTENSIONS[backend] for path in _analysis_paths(workdir, config))
+    load_s, wt = _median_time(lambda: WeightTrans(source, target, verbose=False), config['repeat'])
+    report_s, _ = _median_time(lambda: str(wt), config['repeat'])
+    match_s, _ = _median_time(lambda: KeyMatcher(wt.source_state_dict, wt.target_state_dict).match(),
+                              config['repeat'])
+    return {'load_s': load_s, 'report_s': report_s, 'match_s': match_s}
+
+
+def _bench_conversion(workdir: str, backend: str, config: Dict[str, Any]) -> Dict[str, float]:
+    from ..ckpt_tr import TransformTable, Transpose, WeightTrans
+    from ..ckpt_tr.loaders import tensor_nbytes
+    from ..ckpt_tr.writers import EXTENSIONS
+    from .synthetic import synthetic_meta
+    source = _conversion_path(workdir, config) + EXTENSIONS[backend]
+    target = synthetic_meta(config['conversion_keys'], config['conversion_numel'], prefix='backbone', transpose=True)
+    save_dir = os.path.join(workdir, 'converted', backend)
+
+    def convert():
+        wt = WeightTrans(source, target, verbose=False)
+        wt.set_rules(_RULES)
+        wt.set_transforms(TransformTable([(_TRANSPOSE_PATTERN, [Transpose()])]))
+        wt.source2target(save_dir, backend, workers=config['workers'])
+        return sum(tensor_nbytes(wt.source_state_dict[key]) for key in wt.source_keys)
+
+    os.makedirs(os.path.dirname(save_dir), exist_ok=True)
+    try:
+        seconds, nbytes = _median_time(convert, config['repeat'])
+    finally:
+        if os.path.exists(save_dir + EXTENSIONS[backend]):
+            os.remove(save_dir + EXTENSIONS[backend])
+    return {'seconds': seconds, 'gb_per_s': nbytes / 2**30 / seconds}
+
+
+def _bench_tracker(workdir: str, method: str, config: Dict[str, Any]) -> Dict[str, float]:
+    import numpy as np
+    from ..algorithms.tracking import track_video
+    from ..utils.profiler import get_profiler
+    path = _video_path(workdir, config)
+    truth = np.load(path + '.npy')
+    seconds, rows = _median_time(lambda: track_video(path, truth[0], match_method=method), config['repeat'])
+    centers = (rows[:, 2:4] + rows[:, 4:6]) / 2.
+    truth_centers = (truth[:, :2] + truth[:, 2:]) / 2.
+    error = np.linalg.norm(centers - truth_centers[rows[:, 0].astype(int)], axis=1)
+    stats = get_profiler().stats('tracker.update')['tracker.update']
+    return {'fps': len(rows) / seconds, 'update_p95_ms': stats['p95_ms'], 'center_error_px': float(error.mean())}
+
+
+_BENCHMARKS = {'import': _bench_import, 'analysis': _bench_analysis,
+               'conversion': _bench_conversion, 'tracker': _bench_tracker}
+
+
+def _variants(case: str, config: Dict[str, Any]) -> List[str]:
+    if case == 'import':
+        return ['gutils', 'gutils.ckpt_tr']
+    if case == 'tracker':
+        return list(config['match_methods'])
+    return _backends(config)
+
+
+def run_case(case: str, variant: str, workdir: str, config: Dict[str, Any]) -> Dict[str, float]:
+    """
+    在当前进程中运行一个用例。
+
+    Args:
+        case (str): CASES 之一。
+        variant (str): import 为模块名，analysis 和 conversion 为 backend，tracker 为匹配方式。
+        workdir (str): prepare 生成数据的目录。
+        config (Dict[str, Any]): DEFAULT_CONFIG 格式的配置。
+
+    Returns:
+        Dict[str, float]: 指标名 -> 值。
+    """
+    return _BENCHMARKS[case](workdir, variant, config)
+
+
+def _run_child(case: str, variant: str, workdir: str, config: Dict[str, Any]) -> Dict[str, float]:
+    """在新的解释器中运行用例，附加该进程的峰值内存。"""
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root, env.get('PYTHONPATH')]))
+    cmd = [sys.executable, '-m', 'gutils.benchmarks.suite', '--child', case, variant, '--workdir', workdir,
+           '--config', json.dumps(config)]
+    process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                             universal_newlines=True, env=env)
+    if process.returncode != 0:
+        raise RuntimeError(f"benchmark {case}.{variant} failed:\n{process.stdout}")
+    # 用例本身打印的信息（转换进度等）丢弃，最后一行为结果
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def run_suite(cases: List[str], workdir: str, config: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """生成数据并依次运行 cases，除 import 外每个用例的每个 backend / 匹配方式使用单独的子进程。"""
+    prepare(workdir, cases, config)
+    results = OrderedDict()
+    for case in cases:
+        print(f"=> running {case} benchmark ...")
+        for variant in _variants(case, config):
+            # 导入耗时本身在子进程中测量
+            results[f"{case}.{variant}"] = run_case(case, variant, workdir, config) if case == 'import' else \
+                _run_child(case, variant, workdir, config)
+    return results
+
+
+def _environment() -> Dict[str, Any]:
+    import numpy
+    environment = OrderedDict([('python', platform.python_version()), ('platform', platform.platform()),
+                               ('machine', platform.machine()), ('cpu_count', os.cpu_count()),
+                               ('numpy', numpy.__version__)])
+    try:
+        import cv2
+        environment['cv2'] = cv2.__version__
+    except ImportError:
+        pass
+    return environment
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]], config: Dict[str, Any]) -> None:
+    """将结果连同运行环境和配置保存为基线 json。"""
+    baseline = OrderedDict([('version', BASELINE_VERSION), ('created', time.strftime('%Y-%m-%d %H:%M:%S')),
+                            ('environment', _environment()), ('config', config), ('results', results)])
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2)
+    print(f"=> baseline saved at {path}")
+
+
+def compare(baseline: Dict[str, Any],
+            results: Dict[str, Dict[str, float]],
+            tolerance: float=0.1) -> List[Dict[str, Any]]:
+    """
+    逐项比较结果与基线。
+
+    Args:
+        baseline (Dict[str, Any]): save_baseline 保存的 json。
+        results (Dict[str, Dict[str, float]]): run_suite 的结果。
+        tolerance (float, optional): 指标变差超过该比例时记为回退。
+
+    Returns:
+        List[Dict[str, Any]]: 本次运行的每项的用例、指标、基线值、当前值、变化比例（正数表示变好）以及是否回退，
+            只在一边存在的项 baseline 或 current 为 None。
+    """
+    rows = []
+    for case, metrics in results.items():
+        base_metrics = baseline['results'].get(case, {})
+        for metric in list(metrics) + [metric for metric in base_metrics if metric not in metrics]:
+            base, current = base_metrics.get(metric), metrics.get(metric)
+            change = None
+            if base is not None and current is not None:
+                diff = current - base if metric in HIGHER_IS_BETTER else base - current
+                # 基线为 0 的指标（如跟踪误差）只要变化就记为无穷
+                change = diff / base if base > 0 else (0. if diff == 0 else math.copysign(math.inf, diff))
+            rows.append({'case': case, 'metric': metric, 'baseline': base, 'current': current, 'change': change,
+                         'regression': change is not None and change < -tolerance})
+    return rows
+
+
+def format_report(rows: List[Dict[str, Any]]) -> str:
+    """比较结果的文本报告，变化为正表示变好。"""
+    fmt = lambda value: '-' if value is None else f"{value:.4g}"
+    lines = [f"    {'case':<24}{'metric':<18}{'baseline':>12}{'current':>12}{'change':>10}"]
+    for row in rows:
+        change = '-' if row['change'] is None else f"{row['change'] * 100:+.1f}%"
+        flag = '  REGRESSION' if row['regression'] else ''
+        lines.append(f"    {row['case']:<24}{row['metric']:<18}{fmt(row['baseline']):>12}"
+                     f"{fmt(row['current']):>12}{change:>10}{flag}")
+    return '\n'.join(lines)
+
+
+def _format_results(results: Dict[str, Dict[str, float]]) -> str:
+    lines = []
+    for case, metrics in results.items():
+        values = ', '.join(f"{metric} {value:.4g}" for metric, value in metrics.items())
+        lines.append(f"    {case:<24}{values}")
+    return '\n'.join(lines)
+
+
+def main(argv: List[str]=None) -> int:
+    parser = argparse.ArgumentParser(description="benchmark gutils on synthetic checkpoints and videos")
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--backends', nargs='+', default=None, help="checkpoint backends, skipped if not installed")
+    parser.add_argument('--workdir', default=None, help="keep synthetic data here and reuse it in later runs")
+    parser.add_argument('--quick', action='store_true', help="smaller data for a fast check")
+    parser.add_argument('--repeat', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None, help="conversion workers")
+    parser.add_argument('--save', default=None, help="save results as a baseline json")
+    parser.add_argument('--compare', default=None, help="compare results with a baseline json")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="relative slowdown reported as regression")
+    parser.add_argument('--json', action='store_true', help="print results as json")
+    parser.add_argument('--child', nargs=2, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--config', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        metrics = run_case(*args.child, args.workdir, json.loads(args.config))
+        metrics['peak_rss_mb'] = _peak_rss_mb()
+        print(json.dumps(metrics))
+        return 0
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    config = dict(DEFAULT_CONFIG)
+    if args.quick:
+        config.update(QUICK_CONFIG)
+    for name in ('backends', 'repeat', 'workers'):
+        if getattr(args, name) is not None:
+            config[name] = getattr(args, name)
+    if baseline is not None:
+        differs = [name for name in config if baseline['config'].get(name) != config[name]]
+        if differs:
+            warnings.warn(f"config {differs} differs from the baseline, the comparison may be meaningless")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='gutils-bench-')
+    try:
+        results = run_suite(args.cases, workdir, config)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(_format_results(results))
+    if args.save is not None:
+        save_baseline(args.save, results, config)
+
+    status = 0
+    if baseline is not None:
+        rows = compare(baseline, results, args.tolerance)
+        print(f"=> compare with {args.compare} (created {baseline['created']}, "
+              f"python {baseline['environment']['python']}, {baseline['environment']['cpu_count']} cpus):")
+        print(format_report(rows))
+        regressions = [row for row in rows if row['regression']]
+        if regressions:
+            print(f"=> {len(regressions)} metrics regressed by more than {args.tolerance * 100:.0f}%")
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
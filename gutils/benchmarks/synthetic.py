@@ -0,0 +1,178 @@
+"""
+基准测试用的合成数据：结构可配置的 checkpoint（numpy / safetensors / torch / paddle）以及移动图像块的视频。
+同样的参数和 seed 总是生成相同的数据，不同机器、不同版本的测量结果可以直接比较。
+"""
+import os
+import importlib.util
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from ..ckpt_tr.loaders import TensorMeta, import_backend
+from ..ckpt_tr.writers import EXTENSIONS, save_state_dict
+
+__all__ = ['CHECKPOINT_BACKENDS', 'backend_available', 'checkpoint_layout', 'synthetic_state_dict',
+           'synthetic_meta', 'save_checkpoint', 'make_checkpoint', 'make_video']
+
+CHECKPOINT_BACKENDS = ('numpy', 'safetensors', 'torch', 'paddle')
+
+# 每层参数的名字，与 transformer 的 checkpoint 类似
+_LAYER_PARAMS = ('attn.qkv.weight', 'attn.proj.weight', 'mlp.fc1.weight', 'mlp.fc2.weight',
+                 'norm1.weight', 'norm2.weight')
+
+
+def backend_available(backend: str) -> bool:
+    """backend 对应的框架是否已安装，只查找不导入。"""
+    if backend in ('numpy', 'safetensors'):
+        return True
+    return importlib.util.find_spec(backend) is not None
+
+
+def checkpoint_layout(num_keys: int,
+                      numel: int,
+                      prefix: str='model',
+                      transpose: bool=False) -> List[Tuple[str, Tuple[int, ...]]]:
+    """
+    合成 checkpoint 的 `(key, shape)` 列表，key 为 `<prefix>.layers.<i>.<param>`。
+
+    Args:
+        num_keys (int): 参数个数。
+        numel (int): 每个 2 维权重的元素个数，norm 的 1 维权重为其平方根。
+        prefix (str, optional): key 的前缀。
+        transpose (bool, optional): 为 True 时 2 维权重的 shape 交换两维，用于生成转换目标。
+    """
+    rows = max(int(numel ** 0.5), 1)
+    cols = max(numel // rows, 1)
+    layout = []
+    for index in range(num_keys):
+        layer, param = divmod(index, len(_LAYER_PARAMS))
+        name = _LAYER_PARAMS[param]
+        if name.startswith('norm'):
+            shape = (cols, )
+        else:
+            shape = (cols, rows) if transpose else (rows, cols)
+        layout.append((f"{prefix}.layers.{layer}.{name}", shape))
+    return layout
+
+
+def synthetic_state_dict(num_keys: int,
+                         numel: int,
+                         dtype: str='float32',
+                         prefix: str='model',
+                         seed: int=0) -> Dict[str, np.ndarray]:
+    """生成 checkpoint_layout 对应的随机 numpy state dict。"""
+    rng = np.random.default_rng(seed)
+    state_dict = OrderedDict()
+    for key, shape in checkpoint_layout(num_keys, numel, prefix):
+        state_dict[key] = rng.standard_normal(shape, dtype=np.float32).astype(dtype, copy=False)
+    return state_dict
+
+
+def synthetic_meta(num_keys: int,
+                   numel: int,
+                   dtype: str='float32',
+                   prefix: str='model',
+                   transpose: bool=False) -> Dict[str, TensorMeta]:
+    """只有 shape 和 dtype 的目标元信息，可以直接作为 WeightTrans 的 target_weight，不需要生成目标文件。"""
+    return OrderedDict((key, TensorMeta(shape, dtype))
+                       for key, shape in checkpoint_layout(num_keys, numel, prefix, transpose))
+
+
+def save_checkpoint(state_dict: Dict[str, np.ndarray], path: str, backend: str) -> str:
+    """
+    按 backend 保存 numpy state dict，torch / paddle 先转换为对应的张量。
+
+    Args:
+        state_dict (Dict[str, np.ndarray]): synthetic_state_dict 的结果。
+        path (str): 保存路径，不包括后缀。
+        backend (str): CHECKPOINT_BACKENDS 之一。
+
+    Returns:
+        str: 带后缀的文件路径。
+    """
+    if backend not in CHECKPOINT_BACKENDS:
+        raise ValueError(f"not support backend: {backend}, use one of {list(CHECKPOINT_BACKENDS)}")
+    if backend == 'torch':
+        torch = import_backend('torch')
+        state_dict = OrderedDict((key, torch.from_numpy(value)) for key, value in state_dict.items())
+    elif backend == 'paddle':
+        paddle = import_backend('paddle')
+        state_dict = OrderedDict((key, paddle.to_tensor(value)) for key, value in state_dict.items())
+    path = path + EXTENSIONS[backend]
+    save_state_dict(state_dict, path, backend)
+    return path
+
+
+def make_checkpoint(path: str,
+                    backend: str='numpy',
+                    num_keys: int=256,
+                    numel: int=1 << 18,
+                    dtype: str='float32',
+                    prefix: str='model',
+                    seed: int=0) -> str:
+    """生成并保存合成 checkpoint，文件已存在时直接返回，返回带后缀的文件路径。"""
+    full_path = path + EXTENSIONS[backend]
+    if not os.path.exists(full_path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        save_checkpoint(synthetic_state_dict(num_keys, numel, dtype, prefix, seed), path, backend)
+    return full_path
+
+
+def make_video(path: str,
+               num_frames: int=300,
+               size: Tuple[int, int]=(640, 480),
+               patch_size: int=48,
+               speed: float=4.,
+               margin: int=32,
+               fps: float=30.,
+               seed: int=0) -> Dict[str, Any]:
+    """
+    生成纹理背景上一个纹理图像块在画面内反弹移动的视频（MJPG 编码的 .avi）。
+
+    Args:
+        path (str): 视频路径。
+        num_frames (int, optional): 帧数。
+        size (Tuple[int, int], optional): 画面 (宽, 高)。
+        patch_size (int, optional): 图像块边长。
+        speed (float, optional): 每帧移动的像素数。
+        margin (int, optional): 图像块与画面边缘的最小距离，应大于跟踪器的 margin，否则跟踪器在边缘暂停。
+        fps (float, optional): 视频帧率。
+        seed (int, optional): 随机种子。
+
+    Returns:
+        Dict[str, Any]: 第 0 帧中的目标框 `box` (x1, y1, x2, y2) 和每帧真实目标框 `boxes`，shape 为 (num_frames, 4)。
+    """
+    import cv2
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    patch = cv2.GaussianBlur(rng.integers(0, 256, (patch_size, patch_size, 3), dtype=np.uint8), (0, 0), 1)
+    angle = rng.uniform(0.2, 1.3)
+    velocity = np.array([np.cos(angle), np.sin(angle)]) * speed
+    low = np.array([margin, margin], dtype=np.float64)
+    high = np.array([width - patch_size - margin, height - patch_size - margin], dtype=np.float64)
+    if np.any(high <= low):
+        raise ValueError(f"patch_size {patch_size} with margin {margin} does not fit in frame size {size}")
+    position = low + (high - low) / 3.
+
+    boxes = np.zeros((num_frames, 4), dtype=np.int32)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    if not writer.isOpened():
+        raise ValueError(f"Could not open video writer: {path}")
+    try:
+        for index in range(num_frames):
+            x, y = np.round(position).astype(int)
+            frame = background.copy()
+            frame[y: y + patch_size, x: x + patch_size] = patch
+            writer.write(frame)
+            boxes[index] = (x, y, x + patch_size, y + patch_size)
+            position += velocity
+            for axis in range(2):
+                if not low[axis] <= position[axis] <= high[axis]:
+                    velocity[axis] = -velocity[axis]
+                    position[axis] = np.clip(position[axis], low[axis], high[axis])
+    finally:
+        writer.release()
+    return {'box': boxes[0].tolist(), 'boxes': boxes}
@@ -1,3 +1,35 @@
-from .ckpt_transfer import WeightTrans
+import importlib
 
-__all__ = ['WeightTrans']
\ No newline at end of file
+__all__ = ['WeightTrans', 'CheckpointInspector', 'inspect_checkpoints', 'KeyMatcher', 'RuleTable', 'TransformTable', 'Transpose', 'Permute',
+           'ConvLayout', 'Cast', 'Reshape', 'Chunk', 'JobQueue', 'load_manifest', 'run_manifest']
+
+# 子模块在第一次访问对应名字时才导入，transforms 依赖的 numpy 不会在 import gutils 时被加载
+_LAZY_ATTRS = {
+    'WeightTrans': '.ckpt_transfer',
+    'CheckpointInspector': '.inspector',
+    'inspect_checkpoints': '.inspector',
+    'KeyMatcher': '.matcher',
+    'RuleTable': '.rules',
+    'TransformTable': '.transforms',
+    'Transpose': '.transforms',
+    'Permute': '.transforms',
+    'ConvLayout': '.transforms',
+    'Cast': '.transforms',
+    'Reshape': '.transforms',
+    'Chunk': '.transforms',
+    'JobQueue': '.jobs',
+    'load_manifest': '.jobs',
+    'run_manifest': '.jobs',
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,103 @@
+"""
+checkpoint 关键字分析：前缀分析、缺失关键字分析以及打印报告，WeightTrans 和 CheckpointInspector 共用。
+"""
+from functools import reduce
+from typing import List
+
+
+class KeyAnalysisMixin(object):
+    """
+    需要子类提供 `self.source_keys` 和 `self.target_keys` 两个 KeyIndex。
+    """
+    def _prefix_analyse(self, level: int=1, top: int=3):
+        """
+        对源数据和目标数据的key进行前缀分析，并返回前三个最流行的prefix。
+        
+        Args:
+            level (int, optional): 前缀层级，1 表示 `key.split('.')[0]`，默认值为1.
+            top (int, optional): 返回最流行前缀的个数，默认值为3.
+        
+        Returns:
+            Tuple[Dict[str, float], Dict[str, float]]: 返回一个元组，包含两个字典。
+                第一个字典source_result包含前三个最流行的源数据prefix及其对应的频率；
+                第二个字典target_result包含前三个最流行目标数据prefix及其对应的频率。
+        """
+        source_result = self.source_keys.prefix_frequency(level, top)
+        target_result = self.target_keys.prefix_frequency(level, top)
+        return source_result, target_result
+    
+    def _missing_analyse(self, 
+                         source_top3_prefix: List[str], 
+                         target_top3_prefix: List[str], 
+                         show_number: int=10):
+        """
+        分析 source_top3_prefix 和 target_top3_prefix 中缺失的键，将缺失的键添加到对应的字典中。
+        
+        Args:
+            source_top3_prefix (List[str]): 源语言前缀列表
+            target_top3_prefix (List[str]): 目标语言前缀列表
+            show_number (int, optional): 展示的缺失键的最大数量, 默认值为10.
+        
+        Returns:
+            Tuple[Dict[str, List[str]], Dict[str, List[str]], source_missing_rate: float, target_missing_rate: float]: 两个字典分别表示源语言和目标语言中缺失的键及其对应的前缀, 
+            字典的键为前缀，值为该前缀下缺失的键的列表。
+        
+        """
+        source_missing, source_missing_num = self.source_keys.group_missing(
+            self.target_keys, source_top3_prefix, show_number)
+        target_missing, target_missing_num = self.target_keys.group_missing(
+            self.source_keys, target_top3_prefix, show_number)
+        source_missing_rate = source_missing_num / max(len(self.source_keys), 1)
+        target_missing_rate = target_missing_num / max(len(self.target_keys), 1)
+        return source_missing, target_missing, source_missing_rate, target_missing_rate
+    
+    def beauty_str(self, str1='', str2='', tab=1):
+        """
+        将两个字符串进行美化组合，并返回结果字符串。
+        
+        Args:
+            str1: 第一个要美化的字符串，默认为空字符串。
+            str2: 第二个要美化的字符串，默认为空字符串。
+            tab: 第二个字符串相对第一个字符串缩进的空格数，默认为1个空格。
+        
+        Returns:
+            被美化后的字符串，第一个字符串加上一个换行符、一个制表符*tab空格和第二个字符串。
+        
+        """
+        return str1 + '\n' + '\t' * tab + str2
+    
+    def __str__(self):
+        """
+        返回一个字符串，用于展示checkpoint 的关键字以供确定策略。
+        
+        Returns:
+            str: 包含源语言和目标语言前缀分析结果以及关键词缺失分析结果的字符串。
+        
+        """
+        source_top3, target_top3 = self._prefix_analyse()
+        source2target, target2source, s2t_rate, t2s_rate = self._missing_analyse(source_top3, target_top3)
+        if len(source2target.values()):
+            s2t = reduce(self.beauty_str, [reduce(self.beauty_str, value) for value in source2target.values()])
+        else:
+            s2t = 'all in'
+        
+        if len(target2source.values()):
+            t2s = reduce(self.beauty_str, [reduce(self.beauty_str, value) for value in target2source.values()])
+        else:
+            t2s = 'all in'
+        
+        strings = f"""{'-' * 100}
+PREFIX ANALYSE:
+    source_most_like_prefix: {source_top3}
+    target_most_like_prefix: {target_top3}
+Key word \'{list(source_top3.keys())[0]}\' most like to be a prefix of the source. 
+Key word \'{list(target_top3.keys())[0]}\' most like to be a prefix of the target.
+{'-' * 100}
+KEY_WORD MISSING ANALYSE:
+    Source targe in {(1 - s2t_rate) * 100 :.2f} %, Target target in {(1 - t2s_rate) * 100:.2f} %:
+    IN SOURCE NOT IN TARGET: 
+        {s2t}
+    IN TARGET NOT IN SOURCE: 
+        {t2s}
+"""
+        return strings
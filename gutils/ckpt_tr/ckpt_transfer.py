@@ -1,15 +1,41 @@
-try:
-    import torch
-    import paddle
-except Exception as e:
-    print(e)
-    print('if you want to use WeightTrans, you have to install pytorch and paddle')
+import os
+import json
+import time
+import inspect
+import hashlib
 import warnings
-from typing import List, Any
-from functools import reduce
-from collections import defaultdict, OrderedDict
+from typing import Dict, List, Any, Tuple, Union
+from collections.abc import Mapping
+from .analysis import KeyAnalysisMixin
+from .key_index import KeyIndex
+from .engine import ConversionEngine
+from .journal import ConversionJournal, tensor_hash
+from .matcher import KeyMatch, KeyMatcher
+from .rules import RuleTable
+from .loaders import detect_backend, load_meta, load_state_dict, tensor_nbytes, to_numpy
+from .writers import open_writer
+from ..utils.profiler import Timer, get_profiler
 
-class WeightTrans(object):
+_WORKER = None
+
+
+def _shape_error(key: str, transfer_weight: Any, target_shape) -> str:
+    if (source_shape := list(transfer_weight.shape)) != (target_shape := list(target_shape)):
+        return f"Source shape of {key} {source_shape} != target shape {target_shape} , \
+if you want to repaire it ,please reimplement self.transfer_weight method!"
+    return None
+
+
+def _init_worker(weight_trans: 'WeightTrans') -> None:
+    global _WORKER
+    _WORKER = weight_trans
+
+
+def _process_convert(key: str, new_key: str, source_weight: Any, target_shape):
+    transfer_weight = _WORKER.transfer_weight(new_key, source_weight)
+    return transfer_weight, _shape_error(new_key, transfer_weight, target_shape)
+
+class WeightTrans(KeyAnalysisMixin):
     """
     Usage
     --------
@@ -21,14 +47,21 @@ class WeightTrans(object):
 
     Parameters
     ----------
-        source_weight: str 需要转换的源权重文件
+        source_weight: str 需要转换的源权重文件，支持 .pdparams、.pth、.safetensors、.npz 以及分片保存生成的 *.index.json
 
-        targe_weight: str 一个用于对齐的权重文件，一般直接由目标模型生成，仅用于对齐key 和权重的shape
+        targe_weight: Union[str, Mapping] 一个用于对齐的权重文件，一般直接由目标模型生成，仅用于对齐key 和权重的shape；
+            也可以直接传入已加载的 state dict 或 `load_meta` 的结果，批量转换时多个任务可以共用同一份目标元信息
         
         source_keys_prefix: List[str] 列表，用于指定源权重文件中的key，如权重文件为字典，参数保存在key为 'state_dict' 的值中，则对应的 prefix为 ['state_dict']
         
         target_keys_prefix: List[str] 同上
 
+        lazy: bool 默认为 True，源权重以内存映射方式按需读取，目标权重只读取 key、shape 和 dtype，不加载张量数据
+
+        verbose: bool 默认为 True，初始化时打印关键字分析报告，并逐个打印无法对应到目标的key
+
+        target_type: str target_weight 为 Mapping 时目标权重的 backend，默认与源权重相同
+
     Examples
     --------
 >>>        class WeightTrans(WeightTrans):
@@ -60,16 +93,28 @@ class WeightTrans(object):
     """
     def __init__(self, 
                  source_weight: str, 
-                 target_weight: str,
+                 target_weight: Union[str, Mapping],
                  source_keys_prefix: List[str]=None,
-                 target_keys_prefix: List[str]=None) -> None:
-        self.source_weight, self.source_type = (paddle.load(source_weight), "paddle") if \
-            source_weight.endswith('.pdparams') else (torch.load(source_weight), "torch")
-            
-        self.target_weight, self.target_type = (paddle.load(target_weight), "paddle") if \
-            target_weight.endswith('.pdparams') else (torch.load(target_weight), "torch")
+                 target_keys_prefix: List[str]=None,
+                 lazy: bool=True,
+                 verbose: bool=True,
+                 target_type: str=None) -> None:
+        self.verbose = verbose
+        self.source_type = detect_backend(source_weight)
+        if isinstance(target_weight, Mapping):
+            self.target_type = target_type or self.source_type
+            self.target_weight = target_weight
+        else:
+            self.target_type = target_type or detect_backend(target_weight)
+            self.target_weight = load_meta(target_weight, self.target_type) if lazy else \
+                load_state_dict(target_weight, self.target_type, lazy=False)
+        self.source_weight = load_state_dict(source_weight, self.source_type, lazy=lazy)
         self.source_keys, self.target_keys = self._get_params(source_keys_prefix, target_keys_prefix)  
-        print(self)
+        self.key_mapping = {}
+        self.transforms = None
+        self.unresolved_keys = []
+        if verbose:
+            print(self)
         
     def _get_params(self, 
                     source_keys_prefix: List[str]=None,
@@ -83,199 +128,297 @@ class WeightTrans(object):
         if target_keys_prefix is not None:
             for key in target_keys_prefix:
                 target_weight = target_weight[key]
-                
-        source_keys = [key for key in source_weight.keys()]
-        target_keys = [key for key in target_weight.keys()]
+
+        self.source_state_dict = source_weight
+        self.target_state_dict = target_weight
+        source_keys = KeyIndex(source_weight.keys())
+        target_keys = KeyIndex(target_weight.keys())
         return source_keys, target_keys
 
-    def _prefix_analyse(self):
+    def _resolve_tasks(self) -> List[Tuple[str, str]]:
+        """
+        按源权重的顺序确定每个参数写入的目标key，返回 `(source_key, target_key)` 列表，
+        无法对应到目标的源key记录在 `self.unresolved_keys` 中。
+        """
+        tasks = []
+        self.unresolved_keys = []
+        for key in self.source_keys:
+            # 显式映射（override 与 auto_match 的结果）优先于同名key
+            if key in self.key_mapping:
+                tasks.append((key, self.key_mapping[key]))
+                continue
+            if key in self.target_keys:
+                tasks.append((key, key))
+                continue
+            try:
+                new_key = self.source2target_rule(key)
+                if new_key not in self.target_keys:
+                    self.unresolved_keys.append(key)
+                    if self.verbose:
+                        print("new key {} not in target".format(new_key))
+                else:
+                    tasks.append((key, new_key))
+            except Exception as e:
+                self.unresolved_keys.append(key)
+                if self.verbose:
+                    print(key, e)
+        return tasks
+
+    def auto_match(self, min_confidence: float=0.5, save_path: str=None, show_number: int=10) -> List[KeyMatch]:
         """
-        对源数据和目标数据的key进行前缀分析，并返回前三个最流行的prefix。
+        根据 shape 签名、参数顺序和 token 级编辑距离自动推断源key到目标key的映射，
+        confidence 不低于 min_confidence 的映射会在 source2target 中优先于 source2target_rule 使用。
         
         Args:
-            无
+            min_confidence (float, optional): 采用映射的最低可信度，默认值为0.5.
+            save_path (str, optional): 不为None时将规则表保存为json文件，可在下次转换时复用。
+            show_number (int, optional): 打印可信度最低的映射个数，默认值为10.
         
         Returns:
-            Tuple[Dict[str, float], Dict[str, float]]: 返回一个元组，包含两个字典。
-                第一个字典source_result包含前三个最流行的源数据prefix及其对应的频率；
-                第二个字典target_result包含前三个最流行目标数据prefix及其对应的频率。
+            List[KeyMatch]: 全部匹配结果，包含每一对的可信度。
         """
-        source_prefix_dict = defaultdict(lambda: 0)
-        taget_prefix_dict = defaultdict(lambda: 0)
-        for key in self.source_keys:
-            source_prefix_dict[key.split('.')[0]] += 1. / len(self.source_keys)
-        for key in self.target_keys:
-            taget_prefix_dict[key.split('.')[0]] += 1. / len(self.target_keys)
-        source_prefix_dict = dict(sorted(source_prefix_dict.items(), key=lambda x:x[1], reverse=True))
-        taget_prefix_dict = dict(sorted(taget_prefix_dict.items(), key=lambda x:x[1], reverse=True))
-        top3_source_key = [key for key in source_prefix_dict.keys()][:3]
-        top3_target_key = [key for key in taget_prefix_dict.keys()][:3]
-        source_result = dict([(key, source_prefix_dict[key]) for key in top3_source_key])
-        target_result = dict([(key, taget_prefix_dict[key]) for key in top3_target_key])
-        return source_result, target_result
-    
-    def _missing_analyse(self, 
-                         source_top3_prefix: List[str], 
-                         target_top3_prefix: List[str], 
-                         show_number: int=10):
+        matches = KeyMatcher(self.source_state_dict, self.target_state_dict).match()
+        self.key_mapping = dict((m.source, m.target) for m in matches
+                                if m.confidence >= min_confidence and m.source != m.target)
+        if save_path is not None:
+            KeyMatcher.save(matches, save_path, min_confidence)
+        renamed = sorted((m for m in matches if m.source != m.target), key=lambda m: m.confidence)
+        print(f"=> auto match: {len(matches)} / {len(self.source_keys)} source keys matched, "
+              f"{len(self.key_mapping)} renamed with confidence >= {min_confidence}.")
+        for m in renamed[:show_number]:
+            print(f"\t{m.confidence:.3f}  {m.source} -> {m.target}")
+        return matches
+
+    def set_rules(self, rules: Union[str, dict, RuleTable], cache_dir: str=None) -> Dict[str, str]:
         """
-        分析 source_top3_prefix 和 target_top3_prefix 中缺失的键，将缺失的键添加到对应的字典中。
+        使用声明式规则表为源key改名，解析结果会在 source2target 中优先于 source2target_rule 使用。
         
         Args:
-            source_top3_prefix (List[str]): 源语言前缀列表
-            target_top3_prefix (List[str]): 目标语言前缀列表
-            show_number (int, optional): 展示的缺失键的最大数量, 默认值为10.
+            rules (Union[str, dict, RuleTable]): 规则表对象、规则字典或 json 文件路径，格式见 RuleTable。
+            cache_dir (str, optional): 不为None时缓存解析结果，同一结构的 checkpoint 再次转换时跳过规则执行。
         
         Returns:
-            Tuple[Dict[str, List[str]], Dict[str, List[str]], source_missing_rate: float, target_missing_rate: float]: 两个字典分别表示源语言和目标语言中缺失的键及其对应的前缀, 
-            字典的键为前缀，值为该前缀下缺失的键的列表。
-        
+            Dict[str, str]: 被改名的源key到目标key的映射。
         """
-        source_missing = defaultdict(lambda: [])
-        target_missing = defaultdict(lambda: [])
-        for key in self.source_keys:
-            if key not in self.target_keys:
-                for prefix in source_top3_prefix:
-                    if key.startswith(prefix) and len(source_missing[prefix]) < show_number:
-                        source_missing[prefix].append(key)
-            else:
+        self.rule_table = RuleTable.create(rules)
+        mapping = self.rule_table.resolve(self.source_keys, cache_dir)
+        self.key_mapping.update(mapping)
+        print(f"=> rules: {len(mapping)} / {len(self.source_keys)} source keys renamed.")
+        return mapping
+
+    def set_transforms(self, transforms: 'TransformTable') -> None:
+        """
+        挂载声明式的布局转换表，未重写 transfer_weight 时按key模式执行其中的转换，未命中任何模式的权重保持原样。
+        """
+        self.transforms = transforms
+
+    def _convert_one(self, key: str, new_key: str):
+        transfer_weight = self.transfer_weight(new_key, to_numpy(self.source_state_dict[key]))
+        return transfer_weight, _shape_error(new_key, transfer_weight, self.target_state_dict[new_key].shape)
+
+    def _chunk_tasks(self, tasks: List[Tuple[str, str]], batch_size: int) -> List[List[Tuple[str, str]]]:
+        """将相邻的小张量合并为一批，大张量单独成批。"""
+        chunks, chunk = [], []
+        for task in tasks:
+            if tensor_nbytes(self.source_state_dict[task[0]]) > self.transforms.batch_bytes:
+                if chunk:
+                    chunks.append(chunk)
+                    chunk = []
+                chunks.append([task])
                 continue
-        for key in self.target_keys:
-            if key not in self.source_keys:
-                for prefix in target_top3_prefix:
-                    if key.startswith(prefix) and len(target_missing[prefix]) < show_number:
-                        target_missing[prefix].append(key)
-            else:
+            chunk.append(task)
+            if len(chunk) >= batch_size:
+                chunks.append(chunk)
+                chunk = []
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _convert_batch(self, chunk: List[Tuple[str, str]]) -> list:
+        if len(chunk) > 1:
+            try:
+                weights = self.transforms.apply_batch([new_key for _, new_key in chunk],
+                                                      [to_numpy(self.source_state_dict[key]) for key, _ in chunk])
+                return [(key, new_key, (weight, _shape_error(new_key, weight, self.target_state_dict[new_key].shape)),
+                         None) for (key, new_key), weight in zip(chunk, weights)]
+            except Exception:
+                # 退回逐个转换，以便按key报告错误
+                pass
+        results = []
+        for key, new_key in chunk:
+            try:
+                results.append((key, new_key, self._convert_one(key, new_key), None))
+            except Exception as e:
+                results.append((key, new_key, None, e))
+        return results
+
+    def _conversion_version(self, save_type: str, version: str=None) -> str:
+        """
+        转换版本：由保存类型、转换表以及 transfer_weight 的源码决定，修改其中任何一项后日志中的旧记录全部失效。
+        关键字改名不计入版本，日志按张量记录源key，改名只影响被改名的张量。
+        """
+        method = type(self).transfer_weight
+        try:
+            code = inspect.getsource(method)
+        except (OSError, TypeError):
+            code = method.__qualname__
+        spec = {'save_type': save_type, 'version': version, 'transfer_weight': code,
+                'transforms': repr(self.transforms.spec()) if self.transforms is not None else None}
+        return hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def _open_journal(self,
+                      writer: Any,
+                      tasks: List[Tuple[str, str]],
+                      version: str,
+                      workers: int,
+                      max_inflight_bytes: int) -> Tuple[ConversionJournal, List[Tuple[str, str]]]:
+        """
+        计算每个源张量的哈希，日志中仍然有效的张量直接写入 index，返回日志以及需要转换的任务。
+        """
+        journal = ConversionJournal(writer.save_dir, writer.ext, self._conversion_version(writer.save_type, version))
+        # hashlib 计算大块数据的哈希时会释放 GIL，使用线程池并行读取和计算
+        hasher = ConversionEngine(workers, 'thread', max_inflight_bytes)
+        nbytes = lambda item: tensor_nbytes(self.source_state_dict[item[0]])
+        digest_of = lambda key, new_key: tensor_hash(to_numpy(self.source_state_dict[key]))
+        sources, pending = {}, []
+        for (key, new_key), digest, _ in hasher.map(digest_of, tasks, nbytes):
+            record = journal.lookup(new_key, key, digest)
+            if record is not None:
+                writer.keep(new_key, record['shard'], record['nbytes'])
                 continue
-        source_missing_rate = len(source_missing) / len(self.source_keys)
-        target_missing_rate = len(target_missing) / len(self.target_keys)
-        return source_missing, target_missing, source_missing_rate, target_missing_rate
-    
+            sources[new_key] = (key, digest)
+            pending.append((key, new_key))
+        writer.first_shard = journal.next_shard_index()
+        writer.on_flush = lambda shard, sizes: journal.record_shard(
+            shard, [(key,) + sources[key] + (nbytes,) for key, nbytes in sizes.items()])
+        print(f"=> journal: {len(tasks) - len(pending)} / {len(tasks)} tensors up to date, "
+              f"{len(pending)} to convert.")
+        return journal, pending
+
     def source2target(self, 
                       save_dir,
-                      save_type: str=None, *args, **kwargs):
+                      save_type: str=None, *args,
+                      max_shard_size: Union[int, str]=None,
+                      workers: int=1,
+                      executor: str='thread',
+                      max_inflight_bytes: int=None,
+                      batch_size: int=64,
+                      resume: bool=False,
+                      version: str=None,
+                      profile: bool=False,
+                      store: Any=None, **kwargs):
         """
         将source模型中的参数按照source2target_rule转换后，保存到target模型中。
         
         Args:
             save_dir (str): 保存转换后的参数路径，不包括后缀。
-            save_type (str, optional): 保存参数的文件类型，支持'paddle'或'torch'，默认为None时，保持源checkout的backend。
+            save_type (str, optional): 保存参数的文件类型，支持'paddle'、'torch'、'safetensors'或'numpy'(.npz)，默认为None时，保持源checkout的backend。
             *args (tuple, optional): 未被使用的附加参数将被传递给函数self.source2target_rule。 
+            max_shard_size (Union[int, str], optional): 不为None时开启流式分片保存，如'5GB'，每个shard写满后立即保存并释放，
+                shard 保存为 `<save_dir>-00001<ext>`，并生成 `<save_dir><ext>.index.json`。
+            workers (int, optional): 并行转换的worker数，默认为1，即逐个转换。使用多线程时 transfer_weight 需要是线程安全的。
+            executor (str, optional): 'thread' 或 'process'，默认为'thread'。
+                'process' 时源张量在主进程中读取后发送给子进程，子进程中的 WeightTrans 不包含源权重。
+            max_inflight_bytes (int, optional): 正在转换中的张量字节数上限（按源张量大小的两倍估算），默认只限制任务个数。
+            batch_size (int, optional): 挂载了转换表且未重写 transfer_weight 时，每批最多合并转换的小张量个数，默认值为64.
+            resume (bool, optional): 为 True 时记录转换日志 `<save_dir><ext>.journal.jsonl`，需要同时设置 max_shard_size。
+                再次执行时源数据和转换版本都没有变化的张量直接沿用已有 shard，中断的转换从最后一个写完的 shard 之后继续，
+                结束时删除不再被引用的 shard。同一训练的新快照保存到同一 save_dir 时只转换发生变化的张量。
+            version (str, optional): 附加的转换版本，修改了 transfer_weight 以外的转换逻辑时可以手动更新，使旧记录失效。
+            profile (bool, optional): 为 True 时在结束后打印各阶段的耗时统计。各阶段总是以 `source2target.` 为前缀
+                记录到 `gutils.utils.get_profiler()`，多次转换的统计会累计。
+            store (Union[str, ChunkStore], optional): 不为None时将保存的文件以 save_dir 的文件名为快照名存入去重分块存储
+                （gutils.backup.ChunkStore），相邻 checkpoint 中没有变化的张量只保存一次。
             **kwargs (dict, optional): 未被使用的附加参数将被传递给函数self.source2target_rule。
         
         Returns:
-            Union[None, dict]: 若save_type不为空，并且不为“paddle", "torch"关键字，则返回转换后的参数字典，否则为None。
+            Union[None, dict]: 若save_type不为空，并且不是支持的保存类型，则返回转换后的参数字典，否则为None。
         
         """
-        new_state_dict = {}
         if self.source_type != self.target_type:
             warnings.warn("Alert target type is not equal to source type, \
                 if it is nesserary, please reimplement self.transfer_weight method!")
-        for key in self.source_keys:
-            if key in self.target_keys:
-                new_state_dict[key] = self.transfer_weight(key, self.source_weight[key].numpy())
-                if (source_shape := list(new_state_dict[key].shape)) != \
-                        (target_shape := list(self.target_weight[key].shape)):
-                    error = f"Source shape of {key} {source_shape} != target shape {target_shape} , \
-if you want to repaire it ,please reimplement self.transfer_weight method!"
-                    warnings.warn(error)
-                continue
-            try:
-                new_key = self.source2target_rule(key)
-                if new_key not in self.target_keys:
-                    print("new key {} not in target".format(new_key))
-                else:
-                    transfer_weight = self.transfer_weight(new_key, self.source_weight[key].numpy())
-                    if (source_shape := list(transfer_weight.shape)) != \
-                            (target_shape := list(self.target_weight[new_key].shape)):
-                            
-                        error = f"Source shape of {new_key} {source_shape} != target shape {target_shape} , \
-if you want to repaire it ,please reimplement self.transfer_weight method!"
-                        warnings.warn(error)
-                    new_state_dict[new_key] = transfer_weight
-            except Exception as e:
-                print(key, e)
-        print("=> Transfer Done!")
-        if save_type:
-            if save_type == 'paddle':
-                save_dir = save_dir+'.pdparams'
-                paddle.save(new_state_dict, save_dir)
-                print(f"=> saved at {save_dir} .")
-                return
-            if save_type == 'torch':
-                save_dir = save_dir +'.pth'
-                torch.save(new_state_dict, save_dir)
-                print(f"=> saved at {save_dir} .")
-                return 
-            print(f"not support save type: {save_type}, please recieve state_dict and save later ...")
-            return new_state_dict
+        if resume and max_shard_size is None:
+            raise ValueError("resume requires max_shard_size, the journal records converted tensors per shard")
+        start = time.perf_counter_ns()
+        writer = open_writer(save_dir, save_type or self.source_type, max_shard_size)
+        with Timer('source2target.resolve'):
+            tasks = self._resolve_tasks()
+        journal = None
+        if resume:
+            with Timer('source2target.journal'):
+                journal, tasks = self._open_journal(writer, tasks, version, workers, max_inflight_bytes)
+        engine = ConversionEngine(workers, executor, max_inflight_bytes,
+                                  initializer=_init_worker, initargs=(self,))
+        batched = self.transforms is not None and batch_size > 1 and \
+            type(self).transfer_weight is WeightTrans.transfer_weight
+        nbytes = lambda item: 2 * tensor_nbytes(self.source_state_dict[item[0]])
+        if engine.executor == 'process' and engine.workers > 1:
+            batched = False
+            fn = _process_convert
+            items = ((key, new_key, to_numpy(self.source_state_dict[key]),
+                      self.target_state_dict[new_key].shape) for key, new_key in tasks)
+        elif batched:
+            fn = self._convert_batch
+            items = [(chunk,) for chunk in self._chunk_tasks(tasks, batch_size)]
+            nbytes = lambda item: sum(2 * tensor_nbytes(self.source_state_dict[key]) for key, _ in item[0])
         else:
-            if self.source_type == 'paddle':
-                save_dir = save_dir+'.pdparams'
-                paddle.save(new_state_dict, save_dir)
-                print(f"=> saved at {save_dir} .")
-                return
-            if self.source_type == 'torch':
-                save_dir = save_dir +'.pth'
-                torch.save(new_state_dict, save_dir)
-                print(f"=> saved at {save_dir} .")
-                return 
-        
+            fn = self._convert_one
+            items = tasks
+        if fn is not _process_convert:
+            # 进程池中的函数需要能被 pickle，不计时
+            fn = Timer('source2target.convert')(fn)
+        write_timer = Timer('source2target.write')
+        for item, result, error in engine.map(fn, items, nbytes):
+            if batched:
+                results = result if error is None else [(key, new_key, None, error) for key, new_key in item[0]]
+            else:
+                results = [(item[0], item[1], result, error)]
+            for key, new_key, result, error in results:
+                if error is not None:
+                    if key == new_key:
+                        raise error
+                    print(key, error)
+                    continue
+                transfer_weight, shape_error = result
+                if shape_error:
+                    warnings.warn(shape_error)
+                with write_timer:
+                    writer.add(new_key, transfer_weight)
+        print("=> Transfer Done!")
+        with Timer('source2target.close'):
+            result = writer.close()
+            if journal is not None:
+                removed = journal.compact(writer.weight_map)
+                if removed:
+                    print(f"=> removed {len(removed)} unreferenced shards.")
+        if store is not None and writer.output_files():
+            with Timer('source2target.store'):
+                self._store_outputs(store, save_dir, writer.output_files())
+        get_profiler().record('source2target.total', time.perf_counter_ns() - start)
+        if profile:
+            print(get_profiler().report('source2target.'))
+        return result
+
+    @staticmethod
+    def _store_outputs(store: Any, save_dir: str, files: List[str]) -> None:
+        from ..backup.store import ChunkStore
+        base_dir = os.path.dirname(os.path.abspath(save_dir))
+        ChunkStore.create(store).snapshot(base_dir, os.path.basename(save_dir),
+                                          files=[os.path.relpath(os.path.abspath(f), base_dir) for f in files])
+
+    def __getstate__(self):
+        # 进程池的子进程只需要 transfer_weight，源权重在主进程中读取
+        state = self.__dict__.copy()
+        state['source_weight'] = None
+        state['source_state_dict'] = None
+        return state
                     
-    def source2target_rule(source_key: str, *args, **kwargs) -> str:
+    def source2target_rule(self, source_key: str, *args, **kwargs) -> str:
         raise NotImplementedError()
     
     def transfer_weight(self, key:str, source_weight: Any) -> Any:
-        """ 输入是一个ndarray，输出也是一个ndarray。"""
+        """ 输入是一个ndarray，输出也是一个ndarray。挂载了转换表时按转换表转换。"""
+        if self.transforms is not None:
+            return self.transforms.apply(key, source_weight)
         return source_weight.astype('float32')
-    
-    def beauty_str(self, str1='', str2='', tab=1):
-        """
-        将两个字符串进行美化组合，并返回结果字符串。
-        
-        Args:
-            str1: 第一个要美化的字符串，默认为空字符串。
-            str2: 第二个要美化的字符串，默认为空字符串。
-            tab: 第二个字符串相对第一个字符串缩进的空格数，默认为1个空格。
-        
-        Returns:
-            被美化后的字符串，第一个字符串加上一个换行符、一个制表符*tab空格和第二个字符串。
-        
-        """
-        return str1 + '\n' + '\t' * tab + str2
-    
-    def __str__(self):
-        """
-        返回一个字符串，用于展示checkpoint 的关键字以供确定策略。
-        
-        Returns:
-            str: 包含源语言和目标语言前缀分析结果以及关键词缺失分析结果的字符串。
-        
-        """
-        source_top3, target_top3 = self._prefix_analyse()
-        source2target, target2source, s2t_rate, t2s_rate = self._missing_analyse(source_top3, target_top3)
-        if len(source2target.values()):
-            s2t = reduce(self.beauty_str, [reduce(self.beauty_str, value) for value in source2target.values()])
-        else:
-            s2t = 'all in'
-        
-        if len(target2source.values()):
-            t2s = reduce(self.beauty_str, [reduce(self.beauty_str, value) for value in target2source.values()])
-        else:
-            t2s = 'all in'
-        
-        strings = f"""{'-' * 100}
-PREFIX ANALYSE:
-    source_most_like_prefix: {source_top3}
-    target_most_like_prefix: {target_top3}
-Key word \'{list(source_top3.keys())[0]}\' most like to be a prefix of the source. 
-Key word \'{list(target_top3.keys())[0]}\' most like to be a prefix of the target.
-{'-' * 100}
-KEY_WORD MISSING ANALYSE:
-    Source targe in {(1 - s2t_rate) * 100 :.2f} %, Target target in {(1 - t2s_rate) * 100:.2f} %:
-    IN SOURCE NOT IN TARGET: 
-        {s2t}
-    IN TARGET NOT IN SOURCE: 
-        {t2s}
-"""
-        return strings
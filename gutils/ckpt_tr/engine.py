@@ -0,0 +1,89 @@
+"""
+权重转换执行引擎：线程池 / 进程池并行执行逐个张量的转换，按提交顺序返回结果，并限制在途的内存占用。
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Tuple
+
+__all__ = ['ConversionEngine']
+
+
+class ConversionEngine(object):
+    """
+    Parameters
+    ----------
+        workers: int 并行度，<= 1 时在当前线程中顺序执行
+
+        executor: str 'thread' 或 'process'。numpy 的 transpose / astype 会释放 GIL，一般使用线程池即可；
+            进程池要求 fn 和参数可以被 pickle
+
+        max_inflight_bytes: int 已提交但尚未被消费的任务所占字节数上限，None 表示只按任务个数限制
+
+        initializer / initargs: 传递给进程池，用于在子进程中初始化只读状态
+    """
+    def __init__(self,
+                 workers: int=1,
+                 executor: str='thread',
+                 max_inflight_bytes: int=None,
+                 initializer: Callable=None,
+                 initargs: tuple=()) -> None:
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"not support executor: {executor}")
+        self.workers = max(int(workers or 1), 1)
+        self.executor = executor
+        self.max_inflight_bytes = max_inflight_bytes
+        self.initializer = initializer
+        self.initargs = initargs
+
+    def _make_pool(self):
+        if self.executor == 'process':
+            return ProcessPoolExecutor(self.workers, initializer=self.initializer, initargs=self.initargs)
+        return ThreadPoolExecutor(self.workers)
+
+    def map(self,
+            fn: Callable,
+            items: Iterable[tuple],
+            nbytes: Callable[[tuple], int]=None) -> Iterator[Tuple[tuple, Any, Exception]]:
+        """
+        对每个 item 执行 `fn(*item)`，按 items 的顺序产出 `(item, result, error)`。
+
+        Args:
+            fn (Callable): 转换函数。
+            items (Iterable[tuple]): 参数元组。
+            nbytes (Callable[[tuple], int], optional): 估算单个任务占用的字节数，用于 max_inflight_bytes 限制。
+
+        Returns:
+            Iterator[Tuple[tuple, Any, Exception]]: 执行成功时 error 为 None，失败时 result 为 None。
+        """
+        if self.workers <= 1:
+            for item in items:
+                try:
+                    yield item, fn(*item), None
+                except Exception as e:
+                    yield item, None, e
+            return
+
+        max_pending = self.workers * 2
+        pending = deque()
+        inflight = 0
+        with self._make_pool() as pool:
+            for item in items:
+                size = nbytes(item) if nbytes is not None else 0
+                while pending and (len(pending) >= max_pending or
+                                   (self.max_inflight_bytes is not None and
+                                    inflight + size > self.max_inflight_bytes)):
+                    done_item, done_size, future = pending.popleft()
+                    inflight -= done_size
+                    yield self._result(done_item, future)
+                pending.append((item, size, pool.submit(fn, *item)))
+                inflight += size
+            while pending:
+                done_item, _, future = pending.popleft()
+                yield self._result(done_item, future)
+
+    @staticmethod
+    def _result(item: tuple, future) -> Tuple[tuple, Any, Exception]:
+        try:
+            return item, future.result(), None
+        except Exception as e:
+            return item, None, e
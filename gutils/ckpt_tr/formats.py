@@ -0,0 +1,219 @@
+"""
+与框架无关的 checkpoint 格式：safetensors 以及 numpy 的 .npz。
+读取元信息时只解析文件头，不导入 numpy；读取张量时使用内存映射，不经过 pickle。
+numpy 没有 bf16 类型，bf16 张量以 uint16 保存原始位，dtype 带有 bfloat16 标记（见 bfloat16_dtype），保存时按 bf16 写回。
+"""
+import os
+import ast
+import json
+import struct
+import zipfile
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+__all__ = ['LazyStateDict', 'read_safetensors_meta', 'load_safetensors', 'save_safetensors',
+           'read_npz_meta', 'load_npz', 'save_npz', 'bfloat16_dtype', 'is_bfloat16']
+
+_SAFETENSORS_DTYPES = {
+    'F64': 'float64', 'F32': 'float32', 'F16': 'float16', 'BF16': 'bfloat16',
+    'I64': 'int64', 'I32': 'int32', 'I16': 'int16', 'I8': 'int8',
+    'U64': 'uint64', 'U32': 'uint32', 'U16': 'uint16', 'U8': 'uint8', 'BOOL': 'bool',
+}
+_SAFETENSORS_CODES = dict((name, code) for code, name in _SAFETENSORS_DTYPES.items())
+
+_NPY_DTYPES = {
+    'f2': 'float16', 'f4': 'float32', 'f8': 'float64', 'i1': 'int8', 'i2': 'int16',
+    'i4': 'int32', 'i8': 'int64', 'u1': 'uint8', 'u2': 'uint16', 'u4': 'uint32',
+    'u8': 'uint64', 'b1': 'bool', 'c8': 'complex64', 'c16': 'complex128',
+}
+
+# npz 中记录 bf16 张量关键字的成员
+_NPZ_BFLOAT16_KEY = '__bfloat16__'
+
+_BFLOAT16 = None
+
+
+def bfloat16_dtype() -> Any:
+    """bf16 张量使用的 dtype：与 uint16 相同，metadata 为 `{'dtype': 'bfloat16'}`，视图、拷贝和切片都会保留该标记。"""
+    global _BFLOAT16
+    if _BFLOAT16 is None:
+        import numpy as np
+        _BFLOAT16 = np.dtype(np.uint16, metadata={'dtype': 'bfloat16'})
+    return _BFLOAT16
+
+
+def is_bfloat16(dtype: Any) -> bool:
+    """dtype 是否带有 bfloat16 标记。"""
+    metadata = getattr(dtype, 'metadata', None)
+    return bool(metadata) and metadata.get('dtype') == 'bfloat16'
+
+
+class LazyStateDict(Mapping):
+    """
+    按需取值的 state dict，只有在 `__getitem__` 时才取出张量（通常是内存映射上的视图）。
+
+    Parameters
+    ----------
+        keys: Iterable[str] 关键字，保持原有顺序
+
+        getter: Callable[[str], Any] 根据关键字取出张量的函数
+    """
+    def __init__(self, keys: Iterable[str], getter: Callable[[str], Any]) -> None:
+        self._keys = list(keys)
+        self._key_set = set(self._keys)
+        self._getter = getter
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._key_set:
+            raise KeyError(key)
+        return self._getter(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._key_set
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+# ---------------------------------------------------------------------------
+# safetensors: 8 字节小端 header 长度 + json header + 连续的张量数据
+# ---------------------------------------------------------------------------
+def _read_safetensors_header(path: str) -> Tuple[Dict[str, Any], int]:
+    with open(path, 'rb') as f:
+        header_size = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(header_size), object_pairs_hook=OrderedDict)
+    header.pop('__metadata__', None)
+    return header, 8 + header_size
+
+
+def read_safetensors_meta(path: str) -> Dict[str, Tuple[Tuple[int, ...], str]]:
+    """只读取 safetensors 文件头，返回 `key -> (shape, dtype)`。"""
+    header, _ = _read_safetensors_header(path)
+    return OrderedDict((key, (tuple(info['shape']), _SAFETENSORS_DTYPES.get(info['dtype'], info['dtype'])))
+                       for key, info in header.items())
+
+
+def load_safetensors(path: str) -> LazyStateDict:
+    """
+    以内存映射方式打开 safetensors 文件，取值时返回映射上的只读 ndarray 视图，不发生拷贝。
+    BF16 张量以带有 bfloat16 标记的 uint16 返回。
+    """
+    import numpy as np
+    header, offset = _read_safetensors_header(path)
+    buffer = np.memmap(path, dtype=np.uint8, mode='r', offset=offset) if os.path.getsize(path) > offset \
+        else np.empty(0, dtype=np.uint8)
+
+    def getter(key: str) -> Any:
+        info = header[key]
+        start, end = info['data_offsets']
+        dtype = _SAFETENSORS_DTYPES[info['dtype']]
+        dtype = bfloat16_dtype() if dtype == 'bfloat16' else dtype
+        return buffer[start:end].view(dtype).reshape(info['shape'])
+    return LazyStateDict(header.keys(), getter)
+
+
+def save_safetensors(state_dict: Dict[str, Any], path: str, metadata: Dict[str, str]=None) -> None:
+    """
+    将 ndarray 字典保存为 safetensors 文件，张量按顺序直接写入，不经过 pickle。带有 bfloat16 标记的张量保存为 BF16。
+
+    Args:
+        state_dict (Dict[str, Any]): ndarray 字典。
+        path (str): 保存路径。
+        metadata (Dict[str, str], optional): 写入 `__metadata__` 的字符串字典。
+    """
+    import numpy as np
+    header = OrderedDict()
+    if metadata:
+        header['__metadata__'] = dict((str(k), str(v)) for k, v in metadata.items())
+    arrays, offset = [], 0
+    for key, value in state_dict.items():
+        array = np.ascontiguousarray(value)
+        name = 'bfloat16' if is_bfloat16(array.dtype) else array.dtype.name
+        if name not in _SAFETENSORS_CODES:
+            raise ValueError(f"safetensors not support dtype {name} of {key}")
+        header[key] = {'dtype': _SAFETENSORS_CODES[name], 'shape': list(array.shape),
+                       'data_offsets': [offset, offset + array.nbytes]}
+        offset += array.nbytes
+        arrays.append(array)
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    # 数据区按 8 字节对齐
+    header_bytes += b' ' * (-len(header_bytes) % 8)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for array in arrays:
+            f.write(array.data if array.ndim else array.tobytes())
+
+
+# ---------------------------------------------------------------------------
+# npz: zip 中的每个成员是一个 .npy 文件
+# ---------------------------------------------------------------------------
+def _read_npy_header(f) -> Tuple[Tuple[int, ...], str]:
+    magic = f.read(8)
+    if magic[:6] != b'\x93NUMPY':
+        raise ValueError("not a npy file")
+    size_bytes = 2 if magic[6] == 1 else 4
+    header_size = int.from_bytes(f.read(size_bytes), 'little')
+    header = ast.literal_eval(f.read(header_size).decode('latin1'))
+    descr = header['descr'].lstrip('<>|=') if isinstance(header['descr'], str) else str(header['descr'])
+    return tuple(header['shape']), _NPY_DTYPES.get(descr, descr)
+
+
+def _read_npy_strings(f) -> List[str]:
+    """读取 1 维 unicode 数组（`<U<n>`）的 .npy 成员，不导入 numpy。"""
+    magic = f.read(8)
+    size_bytes = 2 if magic[6] == 1 else 4
+    header = ast.literal_eval(f.read(int.from_bytes(f.read(size_bytes), 'little')).decode('latin1'))
+    width = int(header['descr'].lstrip('<>|=')[1:]) * 4
+    data = f.read()
+    return [data[i: i + width].decode('utf-32-le').rstrip('\x00') for i in range(0, len(data), width)]
+
+
+def read_npz_meta(path: str) -> Dict[str, Tuple[Tuple[int, ...], str]]:
+    """只读取 npz 中每个 .npy 成员的文件头，返回 `key -> (shape, dtype)`。"""
+    result, bfloat16_keys = OrderedDict(), []
+    with zipfile.ZipFile(path) as archive:
+        for name in archive.namelist():
+            if not name.endswith('.npy'):
+                continue
+            with archive.open(name) as f:
+                if name[:-len('.npy')] == _NPZ_BFLOAT16_KEY:
+                    bfloat16_keys = _read_npy_strings(f)
+                else:
+                    result[name[:-len('.npy')]] = _read_npy_header(f)
+    for key in bfloat16_keys:
+        result[key] = (result[key][0], 'bfloat16')
+    return result
+
+
+def load_npz(path: str) -> Mapping:
+    """打开 npz 文件，张量在取值时才从 zip 中解压读取，bf16 张量带有 bfloat16 标记。"""
+    import numpy as np
+    npz = np.load(path, allow_pickle=False)
+    keys = [key for key in npz.files if key != _NPZ_BFLOAT16_KEY]
+    bfloat16_keys = set(npz[_NPZ_BFLOAT16_KEY].tolist()) if len(keys) < len(npz.files) else set()
+
+    def getter(key: str) -> Any:
+        array = npz[key]
+        return array.view(bfloat16_dtype()) if key in bfloat16_keys else array
+    return LazyStateDict(keys, getter)
+
+
+def save_npz(state_dict: Dict[str, Any], path: str) -> None:
+    """
+    保存为未压缩的 npz，可以不依赖任何深度学习框架读取。
+    .npy 没有 bf16 类型，bf16 张量保存为 uint16，其关键字记录在 `__bfloat16__` 成员中。
+    """
+    import numpy as np
+    bfloat16_keys = [key for key, value in state_dict.items() if is_bfloat16(getattr(value, 'dtype', None))]
+    if bfloat16_keys:
+        state_dict = OrderedDict(state_dict)
+        for key in bfloat16_keys:
+            state_dict[key] = np.asarray(state_dict[key]).view(np.uint16)
+        state_dict[_NPZ_BFLOAT16_KEY] = np.array(bfloat16_keys)
+    with open(path, 'wb') as f:
+        np.savez(f, **state_dict)
@@ -0,0 +1,127 @@
+"""
+只读取文件头 / pickle 元信息的 checkpoint 检查工具，不加载张量数据，也不导入 torch / paddle。
+"""
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, List
+
+from .analysis import KeyAnalysisMixin
+from .key_index import KeyIndex
+from .loaders import TensorMeta, load_meta
+
+__all__ = ['CheckpointInspector', 'inspect_checkpoints']
+
+
+def _human(number: float, units: List[str], base: float) -> str:
+    for unit in units[:-1]:
+        if abs(number) < base:
+            return f"{number:.2f} {unit}".replace('.00 ', ' ')
+        number /= base
+    return f"{number:.2f} {units[-1]}"
+
+
+def human_count(number: int) -> str:
+    return _human(number, ['', 'K', 'M', 'B', 'T'], 1000.).strip()
+
+
+def human_bytes(number: int) -> str:
+    return _human(number, ['B', 'KB', 'MB', 'GB', 'TB'], 1024.)
+
+
+class CheckpointInspector(KeyAnalysisMixin):
+    """
+    Usage
+    --------
+        与 WeightTrans 初始化时打印的报告相同（前缀分析、缺失关键字分析），另外给出每个前缀的参数量和字节数。
+        只解析 checkpoint 的 key、shape 和 dtype，可以在没有安装 torch / paddle 的机器上快速检查大模型。
+
+    Parameters
+    ----------
+        source_weight: str 源权重文件，支持 .pdparams、.pth、.safetensors、.npz 以及 *.index.json
+
+        target_weight: str 可选，目标权重文件，为 None 时只统计源权重
+
+        source_keys_prefix: List[str] 同 WeightTrans
+
+        target_keys_prefix: List[str] 同 WeightTrans
+
+        level: int 参数统计使用的前缀层级，默认为 1
+
+    Examples
+    --------
+>>>        print(CheckpointInspector(r"/path/to/source/weight.pth", r"/path/to/target.pdparams", level=2))
+    """
+    def __init__(self,
+                 source_weight: str,
+                 target_weight: str=None,
+                 source_keys_prefix: List[str]=None,
+                 target_keys_prefix: List[str]=None,
+                 level: int=1) -> None:
+        self.source_path = source_weight
+        self.target_path = target_weight
+        self.level = level
+        self.source_meta = self._load(source_weight, source_keys_prefix)
+        self.source_keys = self._index(self.source_meta)
+        self.target_meta, self.target_keys = None, None
+        if target_weight is not None:
+            self.target_meta = self._load(target_weight, target_keys_prefix)
+            self.target_keys = self._index(self.target_meta)
+
+    @staticmethod
+    def _load(path: str, keys_prefix: List[str]=None) -> Dict[str, TensorMeta]:
+        meta = load_meta(path)
+        for key in keys_prefix or []:
+            meta = meta[key]
+        if not isinstance(meta, Mapping):
+            raise ValueError(f"{path}: state dict not found, please check keys_prefix")
+        # 只保留张量，跳过 epoch 之类的非张量条目
+        return OrderedDict((key, value) for key, value in meta.items() if isinstance(value, TensorMeta))
+
+    @staticmethod
+    def _index(meta: Dict[str, TensorMeta]) -> KeyIndex:
+        return KeyIndex(meta.keys(), sizes=dict((key, (value.numel, value.nbytes)) for key, value in meta.items()))
+
+    def summary(self, index: KeyIndex=None, level: int=None, top: int=None) -> Dict[str, Any]:
+        """
+        返回可序列化为 json 的统计结果：关键字数量、参数量、字节数以及每个前缀的统计。
+        """
+        index = index or self.source_keys
+        stats = index.prefix_stats(level or self.level)
+        items = list(stats.items())[:top] if top else stats.items()
+        return {
+            'num_keys': len(index),
+            'numel': index.numel,
+            'nbytes': index.nbytes,
+            'prefixes': OrderedDict((prefix, {'num_keys': count, 'numel': numel, 'nbytes': nbytes})
+                                    for prefix, (count, numel, nbytes) in items),
+        }
+
+    def _stats_str(self, name: str, index: KeyIndex, top: int=20) -> str:
+        summary = self.summary(index, top=top)
+        width = max([len(prefix) for prefix in summary['prefixes']] + [6])
+        lines = [f"    {name}: {summary['num_keys']} keys, {human_count(summary['numel'])} params, "
+                 f"{human_bytes(summary['nbytes'])}"]
+        for prefix, stats in summary['prefixes'].items():
+            lines.append(f"        {prefix:<{width}}  keys {stats['num_keys']:>8}  "
+                         f"params {human_count(stats['numel']):>10}  size {human_bytes(stats['nbytes']):>12}")
+        return '\n'.join(lines)
+
+    def __str__(self) -> str:
+        strings = super().__str__() if self.target_keys is not None else ''
+        strings += f"""{'-' * 100}
+PARAMETER ANALYSE (prefix level {self.level}):
+{self._stats_str('source', self.source_keys)}
+"""
+        if self.target_keys is not None:
+            strings += self._stats_str('target', self.target_keys) + '\n'
+        return strings
+
+
+def inspect_checkpoints(paths: List[str], keys_prefix: List[str]=None, level: int=1) -> Dict[str, Any]:
+    """
+    批量检查多个 checkpoint，返回 `路径 -> 统计结果`，适合在 CI 中输出为 json。
+    """
+    result = OrderedDict()
+    for path in paths:
+        result[path] = CheckpointInspector(path, source_keys_prefix=keys_prefix, level=level).summary()
+    return result
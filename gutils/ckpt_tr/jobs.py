@@ -0,0 +1,391 @@
+"""
+批量权重转换：按 manifest 描述的多个 checkpoint 组成任务队列，
+共享同一目标结构的任务复用已读取的目标元信息和关键字映射，并在全局内存预算下并发执行。
+"""
+import os
+import glob
+import json
+import time
+import importlib
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple, Union
+
+from .loaders import detect_backend, load_meta
+from .rules import RuleTable, key_fingerprint
+from .writers import EXTENSIONS, parse_size
+
+__all__ = ['ConversionJob', 'TargetCache', 'MemoryBudget', 'JobQueue', 'load_manifest', 'run_manifest']
+
+# 可以写在 manifest 的 defaults 或单个 job 中的字段
+_JOB_FIELDS = ('source', 'target', 'save_dir', 'save_type', 'rules', 'transforms', 'auto_match',
+               'source_keys_prefix', 'target_keys_prefix', 'max_shard_size', 'workers', 'executor',
+               'max_inflight_bytes', 'batch_size', 'memory', 'resume', 'store')
+_PATH_FIELDS = ('source', 'target', 'save_dir', 'rules', 'store')
+
+
+def _load_object(spec: str) -> Any:
+    """由 `package.module:attr` 形式的字符串取出对象，用于在 manifest 中引用 TransformTable。"""
+    module, _, attr = spec.partition(':')
+    obj = importlib.import_module(module)
+    for name in attr.split('.') if attr else []:
+        obj = getattr(obj, name)
+    return obj
+
+
+def _source_size(path: str) -> int:
+    """源 checkpoint 的文件大小，分片保存的 `*.index.json` 累加全部 shard。"""
+    if not path.endswith('.index.json'):
+        return os.path.getsize(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        shards = set(json.load(f)['weight_map'].values())
+    base_dir = os.path.dirname(path)
+    return sum(os.path.getsize(os.path.join(base_dir, shard)) for shard in shards)
+
+
+class ConversionJob(object):
+    """
+    单个转换任务，字段与 WeightTrans / source2target 的参数对应。
+
+    Parameters
+    ----------
+        source: str 源权重文件
+
+        target: str 用于对齐的目标权重文件
+
+        save_dir: str 保存路径，不包括后缀
+
+        rules: Union[str, dict, RuleTable] 规则表，见 RuleTable
+
+        transforms: Union[str, TransformTable] 转换表，字符串时为 `package.module:attr`
+
+        auto_match: Union[bool, float] 为 True 或可信度阈值时先执行 WeightTrans.auto_match
+
+        memory: Union[int, str] 该任务占用的内存预算，默认按源文件大小估算
+
+        resume: bool 记录转换日志，重新执行时跳过没有变化的张量，需要设置 max_shard_size
+
+        store: str 转换完成后将输出存入该目录的去重分块存储，见 gutils.backup.ChunkStore
+
+        其余字段同 WeightTrans 和 WeightTrans.source2target
+    """
+    def __init__(self,
+                 source: str,
+                 target: str,
+                 save_dir: str,
+                 save_type: str=None,
+                 rules: Union[str, dict, RuleTable]=None,
+                 transforms: Any=None,
+                 auto_match: Union[bool, float]=False,
+                 source_keys_prefix: List[str]=None,
+                 target_keys_prefix: List[str]=None,
+                 max_shard_size: Union[int, str]=None,
+                 workers: int=1,
+                 executor: str='thread',
+                 max_inflight_bytes: Union[int, str]=None,
+                 batch_size: int=64,
+                 memory: Union[int, str]=None,
+                 resume: bool=False,
+                 store: str=None) -> None:
+        self.source = source
+        self.target = target
+        self.save_dir = save_dir
+        self.save_type = save_type or detect_backend(source)
+        self.rules = rules
+        self.transforms = transforms
+        self.auto_match = auto_match
+        self.source_keys_prefix = source_keys_prefix
+        self.target_keys_prefix = target_keys_prefix
+        self.max_shard_size = max_shard_size
+        self.workers = workers
+        self.executor = executor
+        self.max_inflight_bytes = parse_size(max_inflight_bytes) if max_inflight_bytes is not None else None
+        self.batch_size = batch_size
+        self.memory = parse_size(memory) if memory is not None else None
+        self.resume = resume
+        self.store = store
+
+    @property
+    def output_path(self) -> str:
+        """转换完成后生成的文件，分片保存时为 index json。"""
+        ext = EXTENSIONS.get(self.save_type, '')
+        return self.save_dir + ext + ('.index.json' if self.max_shard_size is not None else '')
+
+    def estimate_memory(self) -> int:
+        """
+        估算任务运行时常驻内存的字节数：源权重为内存映射，主要开销是尚未写出的转换结果。
+        整文件保存时结果全部驻留（按 float32 估算为源文件的两倍），分片保存时约为一个 shard 加在途张量。
+        """
+        if self.memory is not None:
+            return self.memory
+        size = 2 * _source_size(self.source)
+        if self.max_shard_size is None:
+            return size
+        return min(size, parse_size(self.max_shard_size) + (self.max_inflight_bytes or 0))
+
+    def __repr__(self) -> str:
+        return f"ConversionJob({self.source} -> {self.save_dir})"
+
+
+class TargetCache(object):
+    """
+    按 `(目标文件, target_keys_prefix)` 缓存目标权重的元信息，多个任务并发请求同一目标时只读取一次。
+    """
+    def __init__(self) -> None:
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, keys_prefix: List[str]=None) -> Tuple[Mapping, str]:
+        """返回 `(state dict 元信息, backend)`，keys_prefix 已经被应用。"""
+        key = (os.path.abspath(path), tuple(keys_prefix or ()))
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            backend = detect_backend(path)
+            meta = load_meta(path, backend)
+            for prefix in keys_prefix or []:
+                meta = meta[prefix]
+            self._entries[key] = (meta, backend)
+            self.misses += 1
+            return self._entries[key]
+
+
+class MemoryBudget(object):
+    """
+    全局内存预算：任务开始前申请估算的字节数，结束后释放。
+    超过预算的单个任务在没有其他任务运行时仍然可以执行，避免永远等待。
+    """
+    def __init__(self, total: Union[int, str]=None) -> None:
+        self.total = parse_size(total) if total is not None else None
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes: int) -> int:
+        if self.total is None:
+            return 0
+        nbytes = min(nbytes, self.total)
+        with self._cond:
+            while self.used and self.used + nbytes > self.total:
+                self._cond.wait()
+            self.used += nbytes
+        return nbytes
+
+    def release(self, nbytes: int) -> None:
+        if self.total is None:
+            return
+        with self._cond:
+            self.used -= nbytes
+            self._cond.notify_all()
+
+
+class JobQueue(object):
+    """
+    转换任务队列。
+
+    Parameters
+    ----------
+        jobs: List[ConversionJob] 任务列表，按顺序开始执行
+
+        concurrency: int 同时执行的任务数，每个任务内部的并行度由 job.workers 决定
+
+        memory_budget: Union[int, str] 全部任务的内存预算，如 '32GB'，None 表示不限制
+
+        cache_dir: str 规则表解析结果的缓存目录，见 RuleTable.resolve
+
+        skip_existing: bool 为 True 时跳过输出文件已经存在的任务，用于中断后重新执行
+
+    Examples
+    --------
+>>>        queue = JobQueue(load_manifest(r"/path/to/manifest.json"), concurrency=4, memory_budget='32GB')
+>>>        results = queue.run()
+    """
+    def __init__(self,
+                 jobs: List[ConversionJob],
+                 concurrency: int=1,
+                 memory_budget: Union[int, str]=None,
+                 cache_dir: str=None,
+                 skip_existing: bool=False) -> None:
+        self.jobs = list(jobs)
+        self.concurrency = max(int(concurrency or 1), 1)
+        self.budget = MemoryBudget(memory_budget)
+        self.cache_dir = cache_dir
+        self.skip_existing = skip_existing
+        self.targets = TargetCache()
+        self._rule_tables = {}
+        self._mappings = {}
+        self._lock = threading.Lock()
+
+    def _rule_table(self, rules: Union[str, dict, RuleTable]) -> RuleTable:
+        if not isinstance(rules, str):
+            return RuleTable.create(rules)
+        with self._lock:
+            if rules not in self._rule_tables:
+                self._rule_tables[rules] = RuleTable.load(rules)
+            return self._rule_tables[rules]
+
+    def _auto_match(self, job: ConversionJob, weight_trans: Any) -> None:
+        """相同目标、相同源关键字集合的任务只执行一次自动匹配。"""
+        min_confidence = 0.5 if job.auto_match is True else float(job.auto_match)
+        key = (os.path.abspath(job.target), tuple(job.target_keys_prefix or ()),
+               key_fingerprint(weight_trans.source_keys), min_confidence)
+        with self._lock:
+            mapping = self._mappings.get(key)
+        if mapping is None:
+            weight_trans.auto_match(min_confidence)
+            mapping = dict(weight_trans.key_mapping)
+            with self._lock:
+                self._mappings[key] = mapping
+        weight_trans.key_mapping.update(mapping)
+
+    def run_job(self, job: ConversionJob) -> Dict[str, Any]:
+        """执行单个任务，返回可序列化为 json 的结果，失败时记录错误而不抛出。"""
+        from .ckpt_transfer import WeightTrans
+        result = OrderedDict([('source', job.source), ('save_dir', job.save_dir), ('output', job.output_path)])
+        if self.skip_existing and os.path.exists(job.output_path):
+            result['status'] = 'skipped'
+            return result
+        start = time.time()
+        reserved = self.budget.acquire(job.estimate_memory())
+        try:
+            target_meta, target_type = self.targets.get(job.target, job.target_keys_prefix)
+            weight_trans = WeightTrans(job.source, target_meta, job.source_keys_prefix,
+                                       verbose=False, target_type=target_type)
+            if job.rules is not None:
+                weight_trans.set_rules(self._rule_table(job.rules), self.cache_dir)
+            if job.auto_match:
+                self._auto_match(job, weight_trans)
+            if job.transforms is not None:
+                transforms = _load_object(job.transforms) if isinstance(job.transforms, str) else job.transforms
+                weight_trans.set_transforms(transforms)
+            save_dir = os.path.dirname(job.save_dir)
+            if save_dir and not os.path.exists(save_dir):
+                os.makedirs(save_dir, exist_ok=True)
+            weight_trans.source2target(job.save_dir, job.save_type,
+                                       max_shard_size=job.max_shard_size,
+                                       workers=job.workers,
+                                       executor=job.executor,
+                                       max_inflight_bytes=job.max_inflight_bytes,
+                                       batch_size=job.batch_size,
+                                       resume=job.resume,
+                                       store=job.store)
+            result['status'] = 'done'
+            result['num_keys'] = len(weight_trans.source_keys)
+            result['unresolved_keys'] = weight_trans.unresolved_keys
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = f"{type(e).__name__}: {e}"
+        finally:
+            self.budget.release(reserved)
+        result['seconds'] = round(time.time() - start, 3)
+        print(f"=> [{result['status']}] {job.source} -> {job.output_path} ({result['seconds']:.1f}s)")
+        return result
+
+    def run(self) -> List[Dict[str, Any]]:
+        """按顺序执行全部任务，返回与 jobs 顺序一致的结果列表。"""
+        if self.concurrency <= 1:
+            results = [self.run_job(job) for job in self.jobs]
+        else:
+            with ThreadPoolExecutor(self.concurrency) as pool:
+                results = list(pool.map(self.run_job, self.jobs))
+        counts = OrderedDict()
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        print(f"=> {len(results)} jobs: " + ', '.join(f"{status} {num}" for status, num in counts.items()) +
+              f", target metadata loaded {self.targets.misses} times, reused {self.targets.hits} times.")
+        return results
+
+
+def _resolve_path(value: Any, base_dir: str) -> Any:
+    if isinstance(value, str) and not os.path.isabs(value):
+        return os.path.join(base_dir, value)
+    return value
+
+
+def load_manifest(path: Union[str, dict], overrides: Dict[str, Any]=None) -> List[ConversionJob]:
+    """
+    读取 manifest，json 格式如下，job 中的字段覆盖 defaults，相对路径以 manifest 所在目录为基准：
+
+        {
+            "defaults": {"target": "target.pdparams", "rules": "rules.json", "save_type": "paddle",
+                         "output_dir": "converted", "max_shard_size": "5GB"},
+            "jobs": [
+                {"source": "snapshots/*.pth"},
+                {"source": "final.pth", "save_dir": "release/final"}
+            ]
+        }
+
+    source 可以是通配符，展开为多个任务；没有 save_dir 时保存为 `<output_dir>/<源文件名去掉后缀>`。
+
+    Args:
+        path (Union[str, dict]): manifest 文件路径或已读取的字典。
+        overrides (Dict[str, Any], optional): 覆盖全部任务的字段，如命令行参数，值为 None 的字段被忽略。
+
+    Returns:
+        List[ConversionJob]: 展开后的任务列表。
+    """
+    if isinstance(path, Mapping):
+        manifest, base_dir = path, os.getcwd()
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f, object_pairs_hook=OrderedDict)
+        base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = dict(manifest.get('defaults', {}))
+    overrides = dict((key, value) for key, value in (overrides or {}).items() if value is not None)
+    jobs = []
+    for idx, entry in enumerate(manifest.get('jobs', [])):
+        if isinstance(entry, str):
+            entry = {'source': entry}
+        config = dict(defaults)
+        config.update(entry)
+        config.update(overrides)
+        unknown = set(config) - set(_JOB_FIELDS) - {'output_dir'}
+        if unknown:
+            raise ValueError(f"job {idx}: unknown fields {sorted(unknown)}")
+        for field in _PATH_FIELDS + ('output_dir',):
+            config[field] = _resolve_path(config.get(field), base_dir)
+        output_dir = config.pop('output_dir', None)
+        sources = sorted(glob.glob(config['source'])) if glob.has_magic(config['source']) else [config['source']]
+        if not sources:
+            raise ValueError(f"job {idx}: no checkpoint matches {config['source']}")
+        for source in sources:
+            job_config = dict(config, source=source)
+            if job_config.get('save_dir') is None or len(sources) > 1:
+                if output_dir is None:
+                    raise ValueError(f"job {idx}: save_dir or output_dir is required")
+                name = os.path.basename(source)
+                for suffix in ('.index.json',) + tuple(EXTENSIONS.values()) + ('.pt', '.bin', '.ckpt'):
+                    if name.endswith(suffix):
+                        name = name[:-len(suffix)]
+                        break
+                job_config['save_dir'] = os.path.join(output_dir, name)
+            if job_config.get('target') is None:
+                raise ValueError(f"job {idx}: target is required")
+            jobs.append(ConversionJob(**job_config))
+    return jobs
+
+
+def run_manifest(path: Union[str, dict],
+                 concurrency: int=1,
+                 memory_budget: Union[int, str]=None,
+                 cache_dir: str=None,
+                 skip_existing: bool=False,
+                 report: str=None,
+                 **overrides) -> List[Dict[str, Any]]:
+    """
+    读取 manifest 并执行全部任务，report 不为 None 时将结果保存为 json。
+    """
+    queue = JobQueue(load_manifest(path, overrides), concurrency, memory_budget, cache_dir, skip_existing)
+    results = queue.run()
+    if report is not None:
+        with open(report, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"=> report saved at {report} .")
+    return results
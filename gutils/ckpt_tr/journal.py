@@ -0,0 +1,130 @@
+"""
+转换日志：分片保存时每写完一个 shard，就把其中每个张量的源数据哈希、转换版本和所在 shard 追加到 jsonl 日志。
+再次转换时源数据与转换版本都没有变化、且 shard 仍然存在的张量直接沿用，不再转换；
+中断的转换从最后一个写完的 shard 之后继续，不再被引用的 shard 在结束时被删除。
+"""
+import os
+import re
+import glob
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+__all__ = ['ConversionJournal', 'tensor_hash']
+
+
+def tensor_hash(array: Any) -> str:
+    """张量内容的 blake2b 哈希，包含 dtype 和 shape，数据按 C 顺序参与计算。"""
+    import numpy as np
+    array = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{array.dtype.str}{array.shape}".encode('utf-8'))
+    digest.update(array.reshape(-1).view(np.uint8))
+    return digest.hexdigest()
+
+
+class ConversionJournal(object):
+    """
+    Parameters
+    ----------
+        save_dir: str 与 ShardedWriter 相同的保存路径，不包括后缀
+
+        ext: str shard 的后缀，日志保存为 `<save_dir><ext>.journal.jsonl`
+
+        version: str 转换版本，transfer_weight 或转换表变化时版本随之变化，旧版本的记录全部失效
+    """
+    def __init__(self, save_dir: str, ext: str, version: str) -> None:
+        self.save_dir = save_dir
+        self.ext = ext
+        self.version = version
+        self.path = save_dir + ext + '.journal.jsonl'
+        self.base_dir = os.path.dirname(save_dir)
+        self.records = OrderedDict()
+        self._file = None
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 写到一半时中断的最后一行
+                    break
+                self.records[record['key']] = record
+
+    def _shard_path(self, shard: str) -> str:
+        return os.path.join(self.base_dir, shard)
+
+    def lookup(self, key: str, source_key: str, digest: str) -> Union[None, Dict[str, Any]]:
+        """目标key的转换结果仍然有效时返回对应记录，否则返回 None。"""
+        record = self.records.get(key)
+        if record is None or digest is None:
+            return None
+        if record['version'] != self.version or record['source'] != source_key or record['hash'] != digest:
+            return None
+        if not os.path.exists(self._shard_path(record['shard'])):
+            return None
+        return record
+
+    def next_shard_index(self) -> int:
+        """新 shard 的编号接在日志中已有的 shard 之后，不会覆盖仍被引用的 shard。"""
+        pattern = re.compile(r'-(\d+)' + re.escape(self.ext) + '$')
+        indices = [int(match.group(1)) for match in (pattern.search(record['shard'])
+                                                      for record in self.records.values()) if match]
+        return max(indices, default=0) + 1
+
+    def record_shard(self, shard: str, entries: Iterable[Tuple[str, str, str, int]]) -> None:
+        """
+        在 shard 保存完成后追加其中全部张量的记录并落盘。
+
+        Args:
+            shard (str): shard 文件名。
+            entries (Iterable[Tuple[str, str, str, int]]): `(目标key, 源key, 源数据哈希, 字节数)`。
+        """
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        for key, source_key, digest, nbytes in entries:
+            record = OrderedDict([('key', key), ('source', source_key), ('hash', digest),
+                                  ('version', self.version), ('shard', shard), ('nbytes', nbytes)])
+            self.records[key] = record
+            self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def compact(self, weight_map: Dict[str, str]) -> List[str]:
+        """
+        转换完成后只保留最终 index 中引用的记录，并删除不再被引用的 shard。
+
+        Args:
+            weight_map (Dict[str, str]): 最终 index 中 `目标key -> shard 文件名` 的映射。
+
+        Returns:
+            List[str]: 被删除的 shard 路径。
+        """
+        self.close()
+        self.records = OrderedDict((key, record) for key, record in self.records.items()
+                                   if weight_map.get(key) == record['shard'])
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in self.records.values():
+                f.write(json.dumps(record) + '\n')
+        os.replace(tmp_path, self.path)
+
+        referenced = set(weight_map.values())
+        shard_name = re.compile(re.escape(os.path.basename(self.save_dir)) + r'-\d+' + re.escape(self.ext))
+        removed = []
+        for path in glob.glob(glob.escape(self.save_dir) + '-*' + glob.escape(self.ext)):
+            name = os.path.basename(path)
+            if shard_name.fullmatch(name) and name not in referenced:
+                os.remove(path)
+                removed.append(path)
+        return removed
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
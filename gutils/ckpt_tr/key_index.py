@@ -0,0 +1,187 @@
+"""
+checkpoint 关键字索引：哈希集合 + 按 '.' 分级的前缀树，供关键字分析与权重转换使用。
+"""
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class _TrieNode(object):
+    """
+    前缀树节点，count 为该前缀下的关键字数量，numel / nbytes 为该前缀下的参数量和字节数，
+    is_key 表示该路径本身是一个完整关键字。
+    """
+    __slots__ = ('children', 'count', 'numel', 'nbytes', 'is_key')
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.count = 0
+        self.numel = 0
+        self.nbytes = 0
+        self.is_key = False
+
+
+class KeyIndex(object):
+    """
+    对 checkpoint 关键字建立一次索引，之后的成员查询、前缀统计和前缀检索都不再遍历列表。
+
+    Parameters
+    ----------
+        keys: Iterable[str] 关键字，保持原有顺序
+
+        sep: str 层级分隔符，默认为 '.'
+
+        sizes: Dict[str, Tuple[int, int]] 可选，每个关键字的 (参数量, 字节数)，用于按前缀统计参数量
+    """
+    def __init__(self,
+                 keys: Iterable[str],
+                 sep: str='.',
+                 sizes: Dict[str, Tuple[int, int]]=None) -> None:
+        self.sep = sep
+        self.keys = list(keys)
+        self.key_set = set(self.keys)
+        self.sizes = sizes or {}
+        self.root = _TrieNode()
+        for key in self.keys:
+            self._insert(key, *self.sizes.get(key, (0, 0)))
+
+    def _insert(self, key: str, numel: int=0, nbytes: int=0) -> None:
+        node = self.root
+        node.count += 1
+        node.numel += numel
+        node.nbytes += nbytes
+        for token in key.split(self.sep):
+            child = node.children.get(token)
+            if child is None:
+                child = node.children[token] = _TrieNode()
+            child.count += 1
+            child.numel += numel
+            child.nbytes += nbytes
+            node = child
+        node.is_key = True
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.key_set
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __getitem__(self, idx):
+        return self.keys[idx]
+
+    def _find(self, prefix: str):
+        node = self.root
+        if not prefix:
+            return node
+        for token in prefix.split(self.sep):
+            node = node.children.get(token)
+            if node is None:
+                return None
+        return node
+
+    def prefix_counts(self, level: int=1) -> Dict[str, int]:
+        """
+        统计第 level 级前缀（前 level 个 token）下的关键字数量。
+
+        Args:
+            level (int): 前缀层级，1 表示 `key.split('.')[0]`。
+
+        Returns:
+            Dict[str, int]: 前缀到关键字数量的映射，按数量降序排列。
+        """
+        counts = dict((prefix, stats[0]) for prefix, stats in self._collect(level).items())
+        return dict(sorted(counts.items(), key=lambda x: x[1], reverse=True))
+
+    def prefix_stats(self, level: int=1) -> Dict[str, Tuple[int, int, int]]:
+        """
+        统计第 level 级前缀下的 (关键字数量, 参数量, 字节数)，按字节数降序排列。
+        """
+        stats = dict((prefix, tuple(value)) for prefix, value in self._collect(level).items())
+        return dict(sorted(stats.items(), key=lambda x: (x[1][2], x[1][0]), reverse=True))
+
+    def _collect(self, level: int) -> Dict[str, List[int]]:
+        result = {}
+        stack = [(self.root, '', 0)]
+        while stack:
+            node, prefix, depth = stack.pop()
+            if depth == level or (not node.children and depth > 0):
+                stats = result.setdefault(prefix, [0, 0, 0])
+                stats[0] += node.count
+                stats[1] += node.numel
+                stats[2] += node.nbytes
+                continue
+            if node.is_key and depth > 0:
+                # 比 level 更短的完整关键字，自身也算作一个前缀
+                numel, nbytes = self.sizes.get(prefix, (0, 0))
+                stats = result.setdefault(prefix, [0, 0, 0])
+                stats[0] += 1
+                stats[1] += numel
+                stats[2] += nbytes
+            for token in reversed(list(node.children)):
+                child = node.children[token]
+                stack.append((child, prefix + self.sep + token if prefix else token, depth + 1))
+        return result
+
+    @property
+    def numel(self) -> int:
+        return self.root.numel
+
+    @property
+    def nbytes(self) -> int:
+        return self.root.nbytes
+
+    def prefix_frequency(self, level: int=1, top: int=None) -> Dict[str, float]:
+        """
+        返回第 level 级前缀出现的频率（占全部关键字的比例），可只保留前 top 个。
+        """
+        counts = self.prefix_counts(level)
+        total = float(len(self.keys)) or 1.
+        items = list(counts.items())
+        if top is not None:
+            items = items[:top]
+        return dict((prefix, count / total) for prefix, count in items)
+
+    def keys_with_prefix(self, prefix: str) -> Iterator[str]:
+        """按 token 前缀检索关键字，只遍历前缀所在的子树。"""
+        node = self._find(prefix)
+        if node is None:
+            return
+        stack = [(node, prefix)]
+        while stack:
+            node, path = stack.pop()
+            if node.is_key:
+                yield path
+            for token in reversed(list(node.children)):
+                child = node.children[token]
+                stack.append((child, path + self.sep + token if path else token))
+
+    def difference(self, other: 'KeyIndex') -> List[str]:
+        """返回在本索引中但不在 other 中的关键字，保持原有顺序。"""
+        return [key for key in self.keys if key not in other.key_set]
+
+    def group_missing(self,
+                      other: 'KeyIndex',
+                      prefixes: Iterable[str],
+                      show_number: int=10) -> Tuple[Dict[str, List[str]], int]:
+        """
+        找出不在 other 中的关键字，并按给定前缀分组，每组最多保留 show_number 个。
+
+        Returns:
+            Tuple[Dict[str, List[str]], int]: 分组结果以及缺失关键字的总数。
+        """
+        missing = self.difference(other)
+        groups = {}
+        for prefix in prefixes:
+            node = self._find(prefix)
+            if node is None:
+                continue
+            shown = []
+            for key in self.keys_with_prefix(prefix):
+                if key not in other.key_set:
+                    shown.append(key)
+                    if len(shown) >= show_number:
+                        break
+            if shown:
+                groups[prefix] = shown
+        return groups, len(missing)
@@ -0,0 +1,371 @@
+"""
+checkpoint 加载层：源权重按需/内存映射加载，目标权重只读取 pickle 中的 key、shape 和 dtype。
+"""
+import os
+import json
+import pickle
+import importlib
+import zipfile
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, Tuple
+
+from .formats import LazyStateDict, is_bfloat16, load_npz, load_safetensors, read_npz_meta, read_safetensors_meta
+
+__all__ = ['TensorMeta', 'DTYPE_SIZES', 'detect_backend', 'load_state_dict', 'load_meta',
+           'to_numpy', 'tensor_nbytes', 'dtype_name', 'import_backend']
+
+_INDEX_SUFFIX = '.index.json'
+
+DTYPE_SIZES = {
+    'float64': 8, 'float32': 4, 'float16': 2, 'bfloat16': 2, 'int64': 8, 'int32': 4,
+    'int16': 2, 'int8': 1, 'uint64': 8, 'uint32': 4, 'uint16': 2, 'uint8': 1, 'bool': 1,
+    'complex64': 8, 'complex128': 16,
+}
+
+_BACKEND_PACKAGES = {'torch': 'pytorch', 'paddle': 'paddlepaddle'}
+
+
+def import_backend(name: str) -> Any:
+    """
+    第一次使用某个 backend 时才导入对应的框架，`import gutils` 不会导入 torch / paddle。
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise ImportError(f"if you want to use {name} checkpoints, you have to install "
+                          f"{_BACKEND_PACKAGES.get(name, name)}: {e}") from e
+
+
+class TensorMeta(object):
+    """只包含 shape 和 dtype 的张量描述，用于替代目标 checkpoint 中真实的张量。"""
+    __slots__ = ('shape', 'dtype')
+
+    def __init__(self, shape: Tuple[int, ...], dtype: str) -> None:
+        self.shape = tuple(int(dim) for dim in shape)
+        self.dtype = dtype
+
+    @property
+    def numel(self) -> int:
+        numel = 1
+        for dim in self.shape:
+            numel *= dim
+        return numel
+
+    @property
+    def nbytes(self) -> int:
+        return self.numel * DTYPE_SIZES.get(self.dtype, 0)
+
+    def __repr__(self) -> str:
+        return f"TensorMeta(shape={list(self.shape)}, dtype={self.dtype})"
+
+
+def dtype_name(dtype: Any) -> str:
+    """将 torch / paddle / numpy 的 dtype 统一为 numpy 风格的字符串，如 'float32'。"""
+    if is_bfloat16(dtype):
+        return 'bfloat16'
+    name = str(dtype)
+    for prefix in ('torch.', 'paddle.', 'VarType.'):
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    return name.lower().replace('fp32', 'float32').replace('fp16', 'float16').replace('bf16', 'bfloat16')
+
+
+_SUFFIXES = (('.pdparams', 'paddle'), ('.safetensors', 'safetensors'), ('.npz', 'numpy'))
+
+
+def detect_backend(path: str) -> str:
+    """
+    根据文件后缀判断 checkpoint 的 backend：`.pdparams` 为 paddle，`.safetensors` 为 safetensors，
+    `.npz` 为 numpy，其余按 torch 处理。分片保存的 `*.index.json` 按其中 shard 的后缀判断。
+    """
+    if path.endswith(_INDEX_SUFFIX):
+        path = path[:-len(_INDEX_SUFFIX)]
+    for suffix, backend in _SUFFIXES:
+        if path.endswith(suffix):
+            return backend
+    return 'torch'
+
+
+def to_numpy(tensor: Any) -> Any:
+    """将 torch / paddle 张量转换为 ndarray，已经是 ndarray 时直接返回。"""
+    if hasattr(tensor, 'numpy'):
+        return tensor.numpy()
+    return tensor
+
+
+def tensor_nbytes(tensor: Any) -> int:
+    """返回张量数据所占的字节数，不会触发数据读取。"""
+    nbytes = getattr(tensor, 'nbytes', None)
+    if nbytes is not None:
+        return int(nbytes)
+    if hasattr(tensor, 'element_size'):
+        return int(tensor.element_size() * tensor.numel())
+    return 0
+
+
+def _read_index(path: str) -> Dict[str, str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        weight_map = json.load(f, object_pairs_hook=OrderedDict)['weight_map']
+    base_dir = os.path.dirname(path)
+    return OrderedDict((key, os.path.join(base_dir, shard)) for key, shard in weight_map.items())
+
+
+def _load_index(path: str, backend: str, lazy: bool) -> LazyStateDict:
+    """将分片保存的 checkpoint 合并为一个 state dict，shard 在第一次被访问时才打开。"""
+    weight_map = _read_index(path)
+    shards = {}
+
+    def getter(key: str) -> Any:
+        shard = weight_map[key]
+        if shard not in shards:
+            shards[shard] = load_state_dict(shard, backend, lazy)
+        return shards[shard][key]
+    return LazyStateDict(weight_map.keys(), getter)
+
+
+def load_state_dict(path: str, backend: str=None, lazy: bool=True) -> Any:
+    """
+    加载源 checkpoint。
+
+    Args:
+        path (str): checkpoint 路径，也可以是分片保存时生成的 `*.index.json`。
+        backend (str, optional): 'paddle'、'torch'、'safetensors' 或 'numpy'，默认根据后缀判断。
+        lazy (bool, optional): 为 True 时 torch 使用 `mmap=True` 加载，张量数据只在被访问时由操作系统按页读入；
+            paddle 以 ndarray 形式加载，不再构建 paddle.Tensor。safetensors 总是内存映射，npz 总是按需解压。
+
+    Returns:
+        Any: checkpoint 对象，嵌套结构与 `paddle.load` / `torch.load` 的结果一致。
+    """
+    backend = backend or detect_backend(path)
+    if path.endswith(_INDEX_SUFFIX):
+        return _load_index(path, backend, lazy)
+    if backend == 'safetensors':
+        return load_safetensors(path)
+    if backend == 'numpy':
+        return load_npz(path)
+    if backend == 'paddle':
+        paddle = import_backend('paddle')
+        if lazy:
+            return paddle.load(path, return_numpy=True)
+        return paddle.load(path)
+    if backend == 'torch':
+        torch = import_backend('torch')
+        if lazy:
+            try:
+                return torch.load(path, map_location='cpu', mmap=True)
+            except (RuntimeError, TypeError, ValueError, pickle.UnpicklingError):
+                # 旧版本 torch 或非 zip 格式的 checkpoint 不支持 mmap，退回普通加载
+                pass
+        return torch.load(path, map_location='cpu')
+    raise ValueError(f"not support backend: {backend}")
+
+
+# ---------------------------------------------------------------------------
+# 只读取元信息的 unpickler，不会导入 torch / paddle，也不会构建张量
+# ---------------------------------------------------------------------------
+_TORCH_STORAGE_DTYPES = {
+    'DoubleStorage': 'float64', 'FloatStorage': 'float32', 'HalfStorage': 'float16',
+    'BFloat16Storage': 'bfloat16', 'LongStorage': 'int64', 'IntStorage': 'int32',
+    'ShortStorage': 'int16', 'CharStorage': 'int8', 'ByteStorage': 'uint8',
+    'BoolStorage': 'bool', 'ComplexFloatStorage': 'complex64',
+    'ComplexDoubleStorage': 'complex128',
+}
+
+_NUMPY_DTYPES = {
+    'f2': 'float16', 'f4': 'float32', 'f8': 'float64', 'i1': 'int8', 'i2': 'int16',
+    'i4': 'int32', 'i8': 'int64', 'u1': 'uint8', 'u2': 'uint16', 'u4': 'uint32',
+    'u8': 'uint64', 'b1': 'bool', 'c8': 'complex64', 'c16': 'complex128',
+}
+
+
+class _Placeholder(object):
+    """无法识别的对象（如 argparse.Namespace、优化器状态中的类），只占位不还原。"""
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    def __setstate__(self, state) -> None:
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return _Placeholder()
+
+
+class _StorageType(object):
+    def __init__(self, name: str) -> None:
+        self.dtype = _TORCH_STORAGE_DTYPES.get(name, name)
+
+
+def _torch_rebuild_tensor(storage, storage_offset, size, *args, **kwargs) -> TensorMeta:
+    return TensorMeta(size, storage)
+
+
+def _torch_rebuild_parameter(data, *args, **kwargs) -> Any:
+    return data
+
+
+def _torch_rebuild_from_type(func, new_type, args, state) -> Any:
+    return func(*args)
+
+
+class _NumpyDtype(object):
+    def __init__(self, spec: str, *args) -> None:
+        spec = spec.lstrip('<>|=')
+        self.name = _NUMPY_DTYPES.get(spec, spec)
+
+    def __setstate__(self, state) -> None:
+        pass
+
+
+class _NumpyArray(object):
+    """只记录 shape / dtype 的 ndarray 替身，数据字节在 `__setstate__` 中被直接丢弃。"""
+    def __init__(self, *args) -> None:
+        self.shape = ()
+        self.dtype = None
+
+    def __setstate__(self, state) -> None:
+        if len(state) == 5:
+            state = state[1:]
+        shape, dtype = state[0], state[1]
+        self.shape = tuple(shape)
+        self.dtype = dtype.name if isinstance(dtype, _NumpyDtype) else str(dtype)
+
+
+def _numpy_reconstruct(*args) -> _NumpyArray:
+    return _NumpyArray()
+
+
+def _numpy_frombuffer(buf, dtype, shape, order) -> _NumpyArray:
+    array = _NumpyArray()
+    array.shape = tuple(shape)
+    array.dtype = dtype.name if isinstance(dtype, _NumpyDtype) else str(dtype)
+    return array
+
+
+class _MetaUnpickler(pickle.Unpickler):
+    """
+    将 torch / numpy 的重建函数替换为只记录 shape 和 dtype 的版本。
+    其余可调用对象只放行 _SAFE_CLASSES 中的容器和基础类型，eval、getattr、__import__ 等一律替换为占位对象，
+    读取来源不可信的 checkpoint 时不会执行其中的代码。
+    """
+    _SAFE_CLASSES = frozenset([
+        ('collections', 'OrderedDict'), ('collections', 'defaultdict'), ('collections', 'deque'),
+        ('builtins', 'set'), ('builtins', 'frozenset'), ('builtins', 'slice'), ('builtins', 'complex'),
+        ('builtins', 'range'), ('builtins', 'bytearray'), ('builtins', 'object'),
+        ('_codecs', 'encode'), ('copyreg', '_reconstructor'),
+    ])
+
+    def find_class(self, module: str, name: str) -> Any:
+        if module.startswith('torch'):
+            if name.endswith('Storage'):
+                return _StorageType(name)
+            if name in ('_rebuild_tensor_v2', '_rebuild_tensor'):
+                return _torch_rebuild_tensor
+            if name == '_rebuild_parameter':
+                return _torch_rebuild_parameter
+            if name == '_rebuild_from_type_v2':
+                return _torch_rebuild_from_type
+            return _Placeholder()
+        if module.startswith('numpy'):
+            if name == '_reconstruct':
+                return _numpy_reconstruct
+            if name == '_frombuffer':
+                return _numpy_frombuffer
+            if name == 'dtype':
+                return _NumpyDtype
+            if name == 'ndarray':
+                return _NumpyArray
+            return _Placeholder()
+        # protocol 2 以下的 pickle 中为 python2 的模块名
+        module = {'__builtin__': 'builtins', 'copy_reg': 'copyreg'}.get(module, module)
+        if (module, name) in self._SAFE_CLASSES:
+            return super().find_class(module, name)
+        return _Placeholder
+
+
+class _TorchMetaUnpickler(_MetaUnpickler):
+    def persistent_load(self, pid) -> Any:
+        # ('storage', storage_type, key, location, numel)
+        storage_type = pid[1]
+        return storage_type.dtype if isinstance(storage_type, _StorageType) else dtype_name(storage_type)
+
+
+def _to_meta(obj: Any) -> Any:
+    """将 unpickle 出的替身对象转换为 TensorMeta，保留外层嵌套字典结构。"""
+    if isinstance(obj, TensorMeta):
+        return obj
+    if isinstance(obj, _NumpyArray):
+        return TensorMeta(obj.shape, obj.dtype)
+    if isinstance(obj, tuple) and len(obj) == 2 and isinstance(obj[1], _NumpyArray):
+        # paddle.save 将 Tensor 保存为 (name, ndarray)
+        return _to_meta(obj[1])
+    if isinstance(obj, Mapping):
+        result = OrderedDict()
+        for key, value in obj.items():
+            if key == 'StructuredToParameterName@@':
+                continue
+            result[key] = _to_meta(value)
+        big_params = result.pop('UnpackBigParamInfor@@', None)
+        if isinstance(big_params, Mapping):
+            # 超过 4G 的参数被 paddle 切分为多个 slice 保存
+            for key, info in big_params.items():
+                slices = info['slices']
+                dtype = result[slices[0]].dtype if slices[0] in result else None
+                for name in slices:
+                    result.pop(name, None)
+                result[key] = TensorMeta(info['OriginShape'], dtype)
+        return result
+    if isinstance(obj, list):
+        return [_to_meta(value) for value in obj]
+    return obj
+
+
+def _read_torch_meta(path: str) -> Any:
+    with zipfile.ZipFile(path) as archive:
+        pkl_name = [name for name in archive.namelist() if name.endswith('data.pkl')][0]
+        with archive.open(pkl_name) as f:
+            return _TorchMetaUnpickler(f).load()
+
+
+def _read_paddle_meta(path: str) -> Any:
+    with open(path, 'rb') as f:
+        return _MetaUnpickler(f).load()
+
+
+def load_meta(path: str, backend: str=None) -> Any:
+    """
+    只读取 checkpoint 中的 key、shape 和 dtype，不加载张量数据，也不导入 torch / paddle。
+
+    Args:
+        path (str): checkpoint 路径，也可以是分片保存时生成的 `*.index.json`。
+        backend (str, optional): 'paddle'、'torch'、'safetensors' 或 'numpy'，默认根据后缀判断。
+
+    Returns:
+        Any: 与原 checkpoint 嵌套结构相同的字典，张量被替换为 TensorMeta。
+    """
+    backend = backend or detect_backend(path)
+    if path.endswith(_INDEX_SUFFIX):
+        result = OrderedDict()
+        for shard in OrderedDict.fromkeys(_read_index(path).values()):
+            result.update(load_meta(shard, backend))
+        return result
+    if backend == 'safetensors':
+        return OrderedDict((key, TensorMeta(shape, dtype)) for key, (shape, dtype) in read_safetensors_meta(path).items())
+    if backend == 'numpy':
+        return OrderedDict((key, TensorMeta(shape, dtype)) for key, (shape, dtype) in read_npz_meta(path).items())
+    if backend == 'torch':
+        if zipfile.is_zipfile(path):
+            return _to_meta(_read_torch_meta(path))
+        # 旧的非 zip 格式无法只读元信息，完整加载后再转换
+        return _state_to_meta(load_state_dict(path, backend, lazy=False))
+    if backend == 'paddle':
+        return _to_meta(_read_paddle_meta(path))
+    raise ValueError(f"not support backend: {backend}")
+
+
+def _state_to_meta(obj: Any) -> Any:
+    if isinstance(obj, Mapping):
+        return OrderedDict((key, _state_to_meta(value)) for key, value in obj.items())
+    if hasattr(obj, 'shape') and hasattr(obj, 'dtype'):
+        return TensorMeta(obj.shape, dtype_name(obj.dtype))
+    return obj
@@ -0,0 +1,254 @@
+"""
+源 checkpoint 与目标 checkpoint 的关键字自动匹配：
+按 shape 签名分组，组内结合参数顺序和 token 级编辑距离打分，再用二分图最优匹配确定映射。
+"""
+import re
+import json
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Mapping, Tuple
+
+from .loaders import dtype_name
+
+__all__ = ['KeyMatch', 'KeyMatcher', 'token_distance']
+
+
+def _token_cost(token_a: str, token_b: str) -> float:
+    """两个 token 的替换代价，有公共前缀（如 'enc' 与 'encoder'）时代价小于 1。"""
+    if token_a == token_b:
+        return 0.
+    common = 0
+    for char_a, char_b in zip(token_a, token_b):
+        if char_a != char_b:
+            break
+        common += 1
+    return 1. - 2. * common / (len(token_a) + len(token_b))
+
+
+def token_distance(source_key: str, target_key: str, sep: str='.') -> float:
+    """
+    以 '.' 分隔的 token 为单位计算编辑距离，并归一化到 [0, 1]。
+    """
+    a, b = source_key.split(sep), target_key.split(sep)
+    prev = [float(j) for j in range(len(b) + 1)]
+    for i, token_a in enumerate(a, 1):
+        cur = [float(i)] + [0.] * len(b)
+        for j, token_b in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + _token_cost(token_a, token_b))
+        prev = cur
+    return prev[-1] / max(len(a), len(b), 1)
+
+
+def _numbers(key: str) -> Tuple[str, ...]:
+    """关键字中的数字编号，如层号。"""
+    return tuple(re.findall(r'\d+', key))
+
+
+def _linear_assignment(cost: List[List[float]]) -> List[Tuple[int, int]]:
+    """
+    匈牙利算法求最小代价匹配，支持行数与列数不等，返回 (row, col) 列表。
+    """
+    transposed = len(cost) > len(cost[0])
+    if transposed:
+        cost = [list(col) for col in zip(*cost)]
+    n, m = len(cost), len(cost[0])
+    inf = float('inf')
+    u, v = [0.] * (n + 1), [0.] * (m + 1)
+    p, way = [0] * (m + 1), [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = p[j0], inf, 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j], way[j] = cur, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    pairs = [(p[j] - 1, j - 1) for j in range(1, m + 1) if p[j]]
+    if transposed:
+        pairs = [(j, i) for i, j in pairs]
+    return pairs
+
+
+class KeyMatch(object):
+    """一对匹配结果，confidence 越接近 1 越可信。"""
+    __slots__ = ('source', 'target', 'confidence', 'transposed')
+
+    def __init__(self, source: str, target: str, confidence: float, transposed: bool=False) -> None:
+        self.source = source
+        self.target = target
+        self.confidence = confidence
+        self.transposed = transposed
+
+    def __repr__(self) -> str:
+        flag = ', transposed' if self.transposed else ''
+        return f"KeyMatch({self.source} -> {self.target}, {self.confidence:.3f}{flag})"
+
+
+class KeyMatcher(object):
+    """
+    自动推断源关键字到目标关键字的映射。
+
+    Parameters
+    ----------
+        source: Mapping[str, Any] 源 state dict，值只需要有 shape / dtype 属性（张量或 TensorMeta）
+
+        target: Mapping[str, Any] 目标 state dict，同上
+
+        name_weight: float token 编辑距离在代价中的权重
+
+        order_weight: float 参数相对位置差在代价中的权重
+
+        max_group_size: int 同一 shape 签名的组内，关键字数超过该值时不再求最优匹配，按参数顺序依次配对
+
+        margin_scale: float 最优与次优候选的代价差达到该值时，认为匹配没有歧义
+
+        neighbours: int 按顺序配对的大组中，只与配对位置前后各 neighbours 个候选以及数字编号相同的候选比较区分度
+
+    Examples
+    --------
+>>>        matcher = KeyMatcher(wt.source_state_dict, wt.target_state_dict)
+>>>        matches = matcher.match()
+>>>        matcher.save(matches, 'rules.json', min_confidence=0.6)
+    """
+    def __init__(self,
+                 source: Mapping,
+                 target: Mapping,
+                 name_weight: float=0.6,
+                 order_weight: float=0.3,
+                 max_group_size: int=200,
+                 margin_scale: float=0.1,
+                 neighbours: int=8) -> None:
+        self.source = source
+        self.target = target
+        self.name_weight = name_weight
+        self.order_weight = order_weight
+        self.max_group_size = max_group_size
+        self.margin_scale = margin_scale
+        self.neighbours = neighbours
+
+    @staticmethod
+    def _signature(tensor: Any) -> Tuple[int, Tuple[int, ...]]:
+        # 只看维度集合，torch 与 paddle 之间转置过的 Linear 权重也能分到同一组
+        shape = tuple(int(dim) for dim in tensor.shape)
+        return len(shape), tuple(sorted(shape))
+
+    def _cost(self, source_key: str, target_key: str, source_pos: float, target_pos: float,
+              source_tensor: Any, target_tensor: Any) -> float:
+        cost = self.name_weight * token_distance(source_key, target_key)
+        cost += self.order_weight * abs(source_pos - target_pos)
+        if tuple(source_tensor.shape) != tuple(target_tensor.shape):
+            cost += 0.05
+        if dtype_name(getattr(source_tensor, 'dtype', '')) != dtype_name(getattr(target_tensor, 'dtype', '')):
+            cost += 0.05
+        return cost
+
+    def match(self) -> List[KeyMatch]:
+        """
+        返回按源关键字顺序排列的匹配结果；名字完全相同且 shape 兼容的关键字 confidence 为 1。
+        """
+        source_keys, target_keys = list(self.source.keys()), list(self.target.keys())
+        source_pos = dict((key, i / max(len(source_keys) - 1, 1)) for i, key in enumerate(source_keys))
+        target_pos = dict((key, i / max(len(target_keys) - 1, 1)) for i, key in enumerate(target_keys))
+
+        matches = {}
+        source_groups, target_groups = defaultdict(list), defaultdict(list)
+        for key in source_keys:
+            sig = self._signature(self.source[key])
+            if key in self.target and self._signature(self.target[key]) == sig:
+                matches[key] = KeyMatch(key, key, 1., self._transposed(key, key))
+            else:
+                source_groups[sig].append(key)
+        matched_targets = set(match.target for match in matches.values())
+        for key in target_keys:
+            if key not in matched_targets:
+                target_groups[self._signature(self.target[key])].append(key)
+
+        for sig, group in source_groups.items():
+            candidates = target_groups.get(sig)
+            if not candidates:
+                continue
+            by_order = len(group) * len(candidates) > self.max_group_size ** 2
+            if by_order:
+                pairs = list(zip(range(len(group)), range(len(candidates))))
+            else:
+                cost = [[self._cost(s, t, source_pos[s], target_pos[t], self.source[s], self.target[t])
+                         for t in candidates] for s in group]
+                pairs = _linear_assignment(cost)
+            if by_order:
+                numbered = defaultdict(list)
+                for t in candidates:
+                    numbered[_numbers(t)].append(t)
+            for i, j in pairs:
+                s, t = group[i], candidates[j]
+                others = candidates
+                if by_order:
+                    # 按顺序配对时没有比较过全部候选，区分度只在配对位置附近以及层号等数字编号相同的候选中计算，
+                    # 其中有代价更低的候选时区分度为 0，confidence 低于 0.5
+                    others = candidates[max(j - self.neighbours, 0): j + self.neighbours + 1] + \
+                        numbered.get(_numbers(s), [])[:self.neighbours]
+                matches[s] = KeyMatch(s, t, self._confidence(s, t, others, source_pos, target_pos),
+                                      self._transposed(s, t))
+        return [matches[key] for key in source_keys if key in matches]
+
+    def _confidence(self, source_key: str, target_key: str, candidates: List[str],
+                    source_pos: Dict[str, float], target_pos: Dict[str, float]) -> float:
+        """
+        可信度由两部分组成：匹配代价本身，以及与 candidates 中次优候选相比的区分度。
+        """
+        def cost(t):
+            return self._cost(source_key, t, source_pos[source_key], target_pos[t],
+                              self.source[source_key], self.target[t])
+        best = cost(target_key)
+        others = [cost(t) for t in candidates if t != target_key]
+        second = min(others) if others else None
+        distinct = 1. if second is None else min(1., max(0., second - best) / self.margin_scale)
+        return max(0., min(1., 0.5 * (1. - best) + 0.5 * distinct))
+
+    def _transposed(self, source_key: str, target_key: str) -> bool:
+        source_shape = tuple(self.source[source_key].shape)
+        target_shape = tuple(self.target[target_key].shape)
+        return source_shape != target_shape
+
+    @staticmethod
+    def to_mapping(matches: List[KeyMatch], min_confidence: float=0.) -> Dict[str, str]:
+        """返回 confidence 不低于 min_confidence 的 `源关键字 -> 目标关键字` 映射。"""
+        return OrderedDict((m.source, m.target) for m in matches if m.confidence >= min_confidence)
+
+    @classmethod
+    def to_rule_table(cls, matches: List[KeyMatch], min_confidence: float=0.) -> Dict[str, Any]:
+        """
+        生成可复用的规则表：overrides 为需要改名的关键字，confidence 记录每一对的可信度，
+        transposed 列出 shape 需要转置的目标关键字。
+        """
+        selected = [m for m in matches if m.confidence >= min_confidence]
+        return {
+            'overrides': OrderedDict((m.source, m.target) for m in selected if m.source != m.target),
+            'confidence': OrderedDict((m.source, round(m.confidence, 4)) for m in selected),
+            'transposed': [m.target for m in selected if m.transposed],
+        }
+
+    @classmethod
+    def save(cls, matches: List[KeyMatch], path: str, min_confidence: float=0.) -> None:
+        """将规则表保存为 json 文件。"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cls.to_rule_table(matches, min_confidence), f, indent=2, ensure_ascii=False)
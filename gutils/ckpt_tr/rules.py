@@ -0,0 +1,194 @@
+"""
+声明式的关键字改名规则：有序的 prefix / regex 改写规则加上显式 overrides，
+编译一次后批量作用于全部关键字，并可按 checkpoint 关键字集合的指纹缓存解析结果。
+"""
+import os
+import re
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Union
+
+__all__ = ['RuleTable', 'MappingCache', 'key_fingerprint']
+
+_RULE = '__rule__'
+
+# 正则中的编号反向引用 \1、命名反向引用 (?P=name) 以及条件分组 (?(1)...)
+_GROUP_REFERENCE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+
+
+def key_fingerprint(keys: Iterable[str]) -> str:
+    """checkpoint 关键字集合的指纹，与关键字顺序无关。"""
+    sha = hashlib.sha1()
+    for key in sorted(keys):
+        sha.update(key.encode('utf-8'))
+        sha.update(b'\n')
+    return sha.hexdigest()
+
+
+class RuleTable(object):
+    """
+    规则表，json 格式如下，overrides 优先，其次是最长匹配的 prefix 规则，最后依次应用全部 regex 规则：
+
+        {
+            "rules": [
+                {"type": "prefix", "pattern": "noise_estimator.outc.conv.conv", "replace": "noise_estimator.outc"},
+                {"type": "regex", "pattern": "layer(\\\\d+)", "replace": "layers.\\\\1"}
+            ],
+            "overrides": {"head.fc.weight": "head.weight"}
+        }
+
+    prefix 规则按 '.' 分隔的 token 对齐匹配，regex 规则使用 `re.sub` 语义。
+    `KeyMatcher.to_rule_table` 的输出可以直接作为规则表使用。
+
+    Parameters
+    ----------
+        rules: List[Dict[str, str]] 有序的改写规则
+
+        overrides: Dict[str, str] 源关键字到目标关键字的显式映射
+
+        sep: str prefix 规则的层级分隔符
+    """
+    def __init__(self,
+                 rules: List[Dict[str, str]]=None,
+                 overrides: Dict[str, str]=None,
+                 sep: str='.') -> None:
+        self.rules = list(rules or [])
+        self.overrides = OrderedDict(overrides or {})
+        self.sep = sep
+        self._compile()
+
+    def _compile(self) -> None:
+        self._prefix_trie = {}
+        self._regex_rules = []
+        for idx, rule in enumerate(self.rules):
+            rule_type = rule.get('type', 'regex')
+            if rule_type == 'prefix':
+                node = self._prefix_trie
+                for token in rule['pattern'].split(self.sep):
+                    node = node.setdefault(token, {})
+                # 同一个 prefix 定义多次时以第一条为准
+                node.setdefault(_RULE, (rule['pattern'], rule['replace']))
+            elif rule_type == 'regex':
+                self._regex_rules.append((re.compile(rule['pattern']), rule['replace']))
+            else:
+                raise ValueError(f"rule {idx}: not support rule type: {rule_type}")
+        self._regex_filter = None
+        # 合并后后面规则的分组编号会偏移，含反向引用或条件分组的规则不能合并，此时逐条执行
+        if self._regex_rules and not any(_GROUP_REFERENCE.search(pattern.pattern)
+                                         for pattern, _ in self._regex_rules):
+            try:
+                # 合并为一个正则，没有任何 regex 规则命中的关键字只需要一次匹配
+                self._regex_filter = re.compile('|'.join(f"(?:{pattern.pattern})"
+                                                         for pattern, _ in self._regex_rules))
+            except re.error:
+                self._regex_filter = None
+
+    def _apply_prefix(self, key: str) -> str:
+        node, matched, depth = self._prefix_trie, None, 0
+        tokens = key.split(self.sep)
+        for i, token in enumerate(tokens):
+            node = node.get(token)
+            if node is None:
+                break
+            if _RULE in node:
+                matched, depth = node[_RULE], i + 1
+        if matched is None:
+            return key
+        rest = self.sep.join(tokens[depth:])
+        replace = matched[1]
+        if not rest:
+            return replace
+        return replace + self.sep + rest if replace else rest
+
+    def apply(self, key: str) -> str:
+        """对单个关键字应用规则，没有规则命中时原样返回。"""
+        if key in self.overrides:
+            return self.overrides[key]
+        if self._prefix_trie:
+            key = self._apply_prefix(key)
+        if self._regex_rules and (self._regex_filter is None or self._regex_filter.search(key)):
+            for pattern, replace in self._regex_rules:
+                key = pattern.sub(replace, key)
+        return key
+
+    def resolve(self, keys: Iterable[str], cache_dir: str=None) -> Dict[str, str]:
+        """
+        对全部关键字批量应用规则，只返回被改名的关键字。
+
+        Args:
+            keys (Iterable[str]): 源关键字。
+            cache_dir (str, optional): 不为None时按 `关键字集合指纹 + 规则表指纹` 缓存解析结果，
+                同一结构的 checkpoint 再次转换时直接读取缓存，不再执行规则。
+
+        Returns:
+            Dict[str, str]: 源关键字到目标关键字的映射。
+        """
+        keys = list(keys)
+        cache = MappingCache(cache_dir) if cache_dir is not None else None
+        if cache is not None:
+            mapping = cache.get(self, keys)
+            if mapping is not None:
+                return mapping
+        mapping = OrderedDict()
+        for key in keys:
+            new_key = self.apply(key)
+            if new_key != key:
+                mapping[key] = new_key
+        if cache is not None:
+            cache.put(self, keys, mapping)
+        return mapping
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'rules': self.rules, 'overrides': self.overrides}
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha1(json.dumps(self.to_dict(), sort_keys=True).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'RuleTable':
+        return cls(config.get('rules'), config.get('overrides'))
+
+    @classmethod
+    def load(cls, path: str) -> 'RuleTable':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f, object_pairs_hook=OrderedDict))
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def create(cls, rules: Union[str, Dict[str, Any], 'RuleTable']) -> 'RuleTable':
+        """由规则表对象、规则字典或 json 文件路径构造规则表。"""
+        if isinstance(rules, RuleTable):
+            return rules
+        if isinstance(rules, dict):
+            return cls.from_dict(rules)
+        return cls.load(rules)
+
+
+class MappingCache(object):
+    """已解析的关键字映射缓存，文件名为 `关键字集合指纹-规则表指纹.json`。"""
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+
+    def _path(self, rule_table: RuleTable, keys: Iterable[str]) -> str:
+        return os.path.join(self.cache_dir, f"{key_fingerprint(keys)}-{rule_table.fingerprint[:16]}.json")
+
+    def get(self, rule_table: RuleTable, keys: Iterable[str]) -> Union[None, Dict[str, str]]:
+        path = self._path(rule_table, keys)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f, object_pairs_hook=OrderedDict)
+
+    def put(self, rule_table: RuleTable, keys: Iterable[str], mapping: Dict[str, str]) -> None:
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        path = self._path(rule_table, keys)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(mapping, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
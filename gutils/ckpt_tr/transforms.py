@@ -0,0 +1,243 @@
+"""
+声明式的权重布局转换：转置、维度重排、dtype 转换（含 bf16 / fp16）、reshape、qkv 切分与合并。
+按关键字模式挂载到 WeightTrans 上，同 shape 的小张量堆叠后成批转换，单个张量的结果直接写入一次分配的输出缓冲区。
+"""
+import re
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+from .formats import bfloat16_dtype, is_bfloat16
+
+__all__ = ['Transform', 'Transpose', 'Permute', 'ConvLayout', 'Cast', 'Reshape', 'Chunk',
+           'TransformChain', 'TransformTable', 'split_qkv', 'fuse_qkv',
+           'to_bfloat16', 'from_bfloat16']
+
+
+def to_bfloat16(array: np.ndarray, out: np.ndarray=None) -> np.ndarray:
+    """
+    将浮点数组按 round-to-nearest-even 转换为 bf16，numpy 没有 bf16 类型，结果以 uint16 保存原始位，
+    dtype 带有 bfloat16 标记，保存为 safetensors 时写为 BF16。
+    """
+    bits = np.ascontiguousarray(array, dtype=np.float32).view(np.uint32)
+    rounding = (bits >> 16) & 1
+    rounding += 0x7FFF
+    rounding += bits
+    if out is None:
+        out = np.empty(array.shape, dtype=bfloat16_dtype())
+    np.right_shift(rounding, 16, out=out, casting='unsafe')
+    return out
+
+
+def from_bfloat16(array: np.ndarray) -> np.ndarray:
+    """将以 uint16 保存的 bf16 位转换为 float32。"""
+    return (array.astype(np.uint32) << 16).view(np.float32)
+
+
+class Transform(object):
+    """布局转换的基类，`view` 尽量只返回视图，真正的拷贝统一在 TransformChain 中完成。"""
+    def view(self, array: np.ndarray, batched: bool=False) -> np.ndarray:
+        return array
+
+    def spec(self) -> tuple:
+        return (type(self).__name__,)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}{self.spec()[1:]}"
+
+
+class Transpose(Transform):
+    """交换最后两维，即 torch 与 paddle 之间 Linear 权重的转换，1 维张量保持不变。"""
+    def view(self, array: np.ndarray, batched: bool=False) -> np.ndarray:
+        if array.ndim - int(batched) < 2:
+            return array
+        return np.swapaxes(array, -1, -2)
+
+
+class Permute(Transform):
+    """按 axes 重排维度。"""
+    def __init__(self, axes: Sequence[int]) -> None:
+        self.axes = tuple(axes)
+
+    def view(self, array: np.ndarray, batched: bool=False) -> np.ndarray:
+        if batched:
+            return array.transpose((0,) + tuple(axis + 1 for axis in self.axes))
+        return array.transpose(self.axes)
+
+    def spec(self) -> tuple:
+        return ('Permute', self.axes)
+
+
+class ConvLayout(Permute):
+    """卷积权重的布局转换，如 ConvLayout('OIHW', 'HWIO')。"""
+    def __init__(self, src: str='OIHW', dst: str='HWIO') -> None:
+        if sorted(src) != sorted(dst):
+            raise ValueError(f"layout {src} can not be permuted to {dst}")
+        super().__init__([src.index(axis) for axis in dst])
+
+
+class Cast(Transform):
+    """
+    dtype 转换，dtype 支持 numpy 类型名以及 'bfloat16'；source 为 'bfloat16' 时表示输入是以 uint16 保存的 bf16，
+    输入带有 bfloat16 标记（从 safetensors / npz 读取的 bf16 张量）时不需要指定 source。
+    """
+    def __init__(self, dtype: str='float32', source: str=None) -> None:
+        self.dtype = dtype
+        self.source = source
+
+    def spec(self) -> tuple:
+        return ('Cast', self.dtype, self.source)
+
+
+class Reshape(Transform):
+    def __init__(self, shape: Sequence[int]) -> None:
+        self.shape = tuple(shape)
+
+    def view(self, array: np.ndarray, batched: bool=False) -> np.ndarray:
+        if batched:
+            return array.reshape((array.shape[0],) + self.shape)
+        return array.reshape(self.shape)
+
+    def spec(self) -> tuple:
+        return ('Reshape', self.shape)
+
+
+class Chunk(Transform):
+    """沿 axis 均分为 parts 份并取第 index 份，用于从合并的 qkv 中取出 q / k / v。"""
+    def __init__(self, index: int, parts: int=3, axis: int=0) -> None:
+        self.index = index
+        self.parts = parts
+        self.axis = axis
+
+    def view(self, array: np.ndarray, batched: bool=False) -> np.ndarray:
+        axis = self.axis + int(batched) if self.axis >= 0 else self.axis
+        size = array.shape[axis] // self.parts
+        index = [slice(None)] * array.ndim
+        index[axis] = slice(self.index * size, (self.index + 1) * size)
+        return array[tuple(index)]
+
+    def spec(self) -> tuple:
+        return ('Chunk', self.index, self.parts, self.axis)
+
+
+def split_qkv(array: np.ndarray, parts: int=3, axis: int=0) -> List[np.ndarray]:
+    """将合并的 qkv 权重切分为 parts 份（视图，不拷贝）。"""
+    return np.split(array, parts, axis=axis)
+
+
+def fuse_qkv(arrays: Sequence[np.ndarray], axis: int=0, dtype: str=None) -> np.ndarray:
+    """将 q / k / v 权重合并，直接写入一次分配的输出。"""
+    shape = list(arrays[0].shape)
+    shape[axis] = sum(array.shape[axis] for array in arrays)
+    out = np.empty(shape, dtype=dtype or arrays[0].dtype)
+    np.concatenate(arrays, axis=axis, out=out, casting='unsafe')
+    return out
+
+
+class TransformChain(object):
+    """
+    依次执行一组转换：布局转换只产生视图，最后一次性拷贝（并转换 dtype）到 C 连续的输出缓冲区，
+    避免 `.transpose().astype()` 先后产生两份拷贝且结果不连续的问题。
+    """
+    def __init__(self, transforms: Sequence[Transform]) -> None:
+        self.transforms = list(transforms)
+        casts = [t for t in self.transforms if isinstance(t, Cast)]
+        self.cast = casts[-1] if casts else None
+        self.layouts = [t for t in self.transforms if not isinstance(t, Cast)]
+
+    def spec(self) -> tuple:
+        return tuple(t.spec() for t in self.transforms)
+
+    def _view(self, array: np.ndarray, batched: bool) -> np.ndarray:
+        if self.cast is not None and (self.cast.source == 'bfloat16' or is_bfloat16(array.dtype)):
+            array = from_bfloat16(array)
+        for transform in self.layouts:
+            array = transform.view(array, batched)
+        return array
+
+    def _materialize(self, view: np.ndarray, out: np.ndarray=None) -> np.ndarray:
+        dtype = self.cast.dtype if self.cast is not None else view.dtype
+        if isinstance(dtype, str) and dtype == 'bfloat16':
+            return to_bfloat16(view, out)
+        if out is None:
+            out = np.empty(view.shape, dtype=dtype)
+        np.copyto(out, view, casting='unsafe')
+        return out
+
+    def __call__(self, array: np.ndarray, out: np.ndarray=None) -> np.ndarray:
+        return self._materialize(self._view(array, False), out)
+
+    def batch(self, arrays: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        对 shape 和 dtype 相同的一组小张量统一转换：输入堆叠到一次分配的缓冲区，整组只做一次布局转换和 dtype 转换，
+        再拆分为各自独立的结果，单个结果不会让整组的缓冲区一直被引用。
+        """
+        first = arrays[0]
+        stacked = np.empty((len(arrays), ) + first.shape, dtype=first.dtype)
+        np.stack(arrays, out=stacked)
+        out = self._materialize(self._view(stacked, True))
+        return [item.copy() for item in out]
+
+
+class TransformTable(object):
+    """
+    按关键字模式挂载转换，第一个 `re.search` 命中的模式生效，未命中的关键字保持原样。
+
+    Parameters
+    ----------
+        entries: List[Tuple[str, Sequence[Transform]]] 有序的 (关键字正则, 转换列表)
+
+        batch_bytes: int 单个张量不超过该字节数时参与堆叠批量转换
+
+    Examples
+    --------
+>>>        table = TransformTable([
+>>>            (r'embedding\\.weight$', [Cast('float32')]),
+>>>            (r'\\.weight$', [Transpose(), Cast('float32')]),
+>>>            (r'.*', [Cast('float32')]),
+>>>        ])
+>>>        wt.set_transforms(table)
+    """
+    def __init__(self,
+                 entries: Sequence[Tuple[str, Sequence[Transform]]],
+                 batch_bytes: int=1 << 20) -> None:
+        self.entries = [(re.compile(pattern), TransformChain(transforms)) for pattern, transforms in entries]
+        self.batch_bytes = batch_bytes
+        self._cache = {}
+
+    def chain(self, key: str) -> Union[None, TransformChain]:
+        if key not in self._cache:
+            self._cache[key] = next((chain for pattern, chain in self.entries if pattern.search(key)), None)
+        return self._cache[key]
+
+    def apply(self, key: str, array: np.ndarray, out: np.ndarray=None) -> np.ndarray:
+        chain = self.chain(key)
+        if chain is None:
+            return array
+        return chain(array, out)
+
+    def apply_batch(self, keys: Sequence[str], arrays: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        批量转换：使用同一转换链、shape 和 dtype 相同的小张量被分为一组，堆叠后整组只做一次转换。
+        """
+        results = [None] * len(keys)
+        groups = {}
+        for i, (key, array) in enumerate(zip(keys, arrays)):
+            chain = self.chain(key)
+            if chain is None:
+                results[i] = array
+            elif array.nbytes > self.batch_bytes:
+                results[i] = chain(array)
+            else:
+                groups.setdefault((id(chain), array.shape, array.dtype.str, is_bfloat16(array.dtype)), []).append(i)
+        for indices in groups.values():
+            chain = self.chain(keys[indices[0]])
+            if len(indices) == 1:
+                results[indices[0]] = chain(arrays[indices[0]])
+                continue
+            for i, result in zip(indices, chain.batch([arrays[i] for i in indices])):
+                results[i] = result
+        return results
+
+    def spec(self) -> tuple:
+        return tuple((pattern.pattern, chain.spec()) for pattern, chain in self.entries)
@@ -0,0 +1,158 @@
+"""
+checkpoint 写出层：整文件写出，或按大小切分为多个 shard 流式写出并生成 index json。
+"""
+import os
+import json
+from typing import Any, Callable, Dict, List, Union
+
+from .formats import save_npz, save_safetensors
+from .loaders import import_backend
+
+__all__ = ['EXTENSIONS', 'save_state_dict', 'parse_size', 'open_writer',
+           'StateDictWriter', 'ShardedWriter']
+
+EXTENSIONS = {'paddle': '.pdparams', 'torch': '.pth', 'safetensors': '.safetensors', 'numpy': '.npz'}
+
+_UNITS = {'B': 1, 'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30, 'TB': 1 << 40}
+
+
+def parse_size(size: Union[int, str]) -> int:
+    """将 '5GB'、'500MB' 之类的大小转换为字节数，整数直接返回。"""
+    if isinstance(size, int):
+        return size
+    size = size.strip().upper()
+    for unit in sorted(_UNITS, key=len, reverse=True):
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * _UNITS[unit])
+    return int(size)
+
+
+def save_state_dict(state_dict: Dict[str, Any], path: str, save_type: str) -> None:
+    """使用 save_type 对应的 backend 保存 state dict。"""
+    if save_type == 'safetensors':
+        save_safetensors(state_dict, path)
+    elif save_type == 'numpy':
+        save_npz(state_dict, path)
+    elif save_type == 'paddle':
+        import_backend('paddle').save(state_dict, path)
+    elif save_type == 'torch':
+        import_backend('torch').save(state_dict, path)
+    else:
+        raise ValueError(f"not support save type: {save_type}")
+
+
+class StateDictWriter(object):
+    """
+    收集全部转换后的参数，在 close 时一次性保存为单个文件；save_type 不受支持时 close 返回参数字典。
+    """
+    def __init__(self, save_dir: str, save_type: str) -> None:
+        self.save_dir = save_dir
+        self.save_type = save_type
+        self.state_dict = {}
+
+    def add(self, key: str, value: Any) -> None:
+        self.state_dict[key] = value
+
+    def close(self) -> Union[None, dict]:
+        if self.save_type not in EXTENSIONS:
+            print(f"not support save type: {self.save_type}, please recieve state_dict and save later ...")
+            return self.state_dict
+        save_dir = self.save_dir + EXTENSIONS[self.save_type]
+        save_state_dict(self.state_dict, save_dir, self.save_type)
+        print(f"=> saved at {save_dir} .")
+        self.state_dict = {}
+
+    def output_files(self) -> List[str]:
+        """保存的文件路径。"""
+        return [self.save_dir + EXTENSIONS[self.save_type]] if self.save_type in EXTENSIONS else []
+
+
+class ShardedWriter(object):
+    """
+    流式写出转换后的参数：当前 shard 达到 max_shard_size 后立即保存并释放，
+    最后写出 `<save_dir><ext>.index.json`，格式与 HuggingFace 的 `*.index.json` 相同。
+
+    Parameters
+    ----------
+        save_dir: str 保存路径，不包括后缀，shard 保存为 `<save_dir>-00001<ext>`
+
+        save_type: str 'paddle'、'torch'、'safetensors' 或 'numpy'
+
+        max_shard_size: Union[int, str] 单个 shard 的最大字节数，如 '5GB'
+
+        first_shard: int 第一个新 shard 的编号，续写时接在已有 shard 之后
+
+        on_flush: Callable[[str, Dict[str, int]], None] 每个 shard 保存完成后以 `(shard 文件名, key -> 字节数)` 调用
+    """
+    def __init__(self,
+                 save_dir: str,
+                 save_type: str,
+                 max_shard_size: Union[int, str],
+                 first_shard: int=1,
+                 on_flush: Callable[[str, Dict[str, int]], None]=None) -> None:
+        if save_type not in EXTENSIONS:
+            raise ValueError(f"not support save type: {save_type}")
+        self.save_dir = save_dir
+        self.save_type = save_type
+        self.ext = EXTENSIONS[save_type]
+        self.max_shard_size = parse_size(max_shard_size)
+        self.first_shard = first_shard
+        self.on_flush = on_flush
+        self.weight_map = {}
+        self.total_size = 0
+        self.shard_files = []
+        self._shard = {}
+        self._shard_size = 0
+
+    def add(self, key: str, value: Any) -> None:
+        nbytes = int(getattr(value, 'nbytes', 0))
+        if self._shard and self._shard_size + nbytes > self.max_shard_size:
+            self.flush()
+        self._shard[key] = value
+        self._shard_size += nbytes
+        self.total_size += nbytes
+
+    def keep(self, key: str, shard_name: str, nbytes: int) -> None:
+        """沿用已有 shard 中的张量，只写入 index，不重新保存。"""
+        self.weight_map[key] = shard_name
+        self.total_size += nbytes
+
+    def flush(self) -> None:
+        """保存当前 shard 并释放其中的张量。"""
+        if not self._shard:
+            return
+        shard_path = f"{self.save_dir}-{self.first_shard + len(self.shard_files):05d}{self.ext}"
+        save_state_dict(self._shard, shard_path, self.save_type)
+        shard_name = os.path.basename(shard_path)
+        for key in self._shard:
+            self.weight_map[key] = shard_name
+        self.shard_files.append(shard_path)
+        if self.on_flush is not None:
+            self.on_flush(shard_name, dict((key, int(getattr(value, 'nbytes', 0)))
+                                           for key, value in self._shard.items()))
+        print(f"=> saved shard at {shard_path} ({self._shard_size / (1 << 20):.2f} MB).")
+        self._shard = {}
+        self._shard_size = 0
+
+    def close(self) -> None:
+        self.flush()
+        index_path = self.save_dir + self.ext + '.index.json'
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump({'metadata': {'total_size': self.total_size},
+                       'weight_map': self.weight_map}, f, indent=2)
+        print(f"=> saved {len(self.shard_files)} shards, index at {index_path} .")
+
+    def output_files(self) -> List[str]:
+        """index 中引用的全部 shard（包括沿用的旧 shard）以及 index 本身。"""
+        base_dir = os.path.dirname(self.save_dir)
+        shards = [os.path.join(base_dir, name) for name in sorted(set(self.weight_map.values()))]
+        return shards + [self.save_dir + self.ext + '.index.json']
+
+
+def open_writer(save_dir: str,
+                save_type: str,
+                max_shard_size: Union[int, str]=None) -> Union[StateDictWriter, ShardedWriter]:
+    """max_shard_size 为 None 时整文件保存，否则流式分片保存。"""
+    if max_shard_size is None:
+        return StateDictWriter(save_dir, save_type)
+    return ShardedWriter(save_dir, save_type, max_shard_size)
@@ -2,6 +2,17 @@
 """
 本文件提供了命令行工具的入口逻辑。
 
+    python -m gutils convert manifest.json --concurrency 4 --memory-budget 32GB
+    python -m gutils convert --source a.pth --target b.pdparams --rules rules.json --save-dir out/a
+    python -m gutils inspect a.pth --target b.pdparams --level 2
+    python -m gutils backup /root/workdir /root/backups --workers 16
+    python -m gutils restore /root/backups /root/restored --name workdir
+    python -m gutils backup /root/workdir /root/store --store
+    python -m gutils store list /root/store
+    python -m gutils hello [name]
+
+第一个参数不是子命令时保持原来的行为，执行 demo.Hello。
+
 Authors: gauthierli(lwklxh@163.com)
 Date:    2023/09/27 11:12:47
 """
@@ -10,12 +21,178 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import argparse
+import json
+
 
 __all__ = [
     'main',
 ]
 
 
+def _build_parser():
+    """构建命令行解析器"""
+    parser = argparse.ArgumentParser(prog='gutils', description='tools for deeplearning developing')
+    subparsers = parser.add_subparsers(dest='command')
+
+    convert = subparsers.add_parser('convert', help='convert checkpoints listed in a manifest')
+    convert.add_argument('manifest', nargs='?', default=None, help='manifest json, see gutils.ckpt_tr.jobs.load_manifest')
+    convert.add_argument('--source', default=None, help='convert a single checkpoint instead of a manifest')
+    convert.add_argument('--target', default=None, help='target checkpoint used to align keys and shapes')
+    convert.add_argument('--save-dir', default=None, help='save path without suffix')
+    convert.add_argument('--output-dir', default=None, help='save directory for jobs without save_dir')
+    convert.add_argument('--rules', default=None, help='rule table json, see RuleTable')
+    convert.add_argument('--transforms', default=None, help='TransformTable as package.module:attr')
+    convert.add_argument('--auto-match', type=float, default=None, help='auto match keys with this min confidence')
+    convert.add_argument('--save-type', default=None, choices=['paddle', 'torch', 'safetensors', 'numpy'])
+    convert.add_argument('--max-shard-size', default=None, help="stream shards of this size, e.g. '5GB'")
+    convert.add_argument('--workers', type=int, default=None, help='tensor workers inside each job')
+    convert.add_argument('--resume', action='store_true', default=None,
+                         help='keep a journal and skip unchanged tensors, requires --max-shard-size')
+    convert.add_argument('--concurrency', type=int, default=1, help='jobs running at the same time')
+    convert.add_argument('--memory-budget', default=None, help="memory budget of all running jobs, e.g. '32GB'")
+    convert.add_argument('--cache-dir', default=None, help='cache directory of resolved rule mappings')
+    convert.add_argument('--skip-existing', action='store_true', help='skip jobs whose output already exists')
+    convert.add_argument('--report', default=None, help='save job results as json')
+    convert.add_argument('--store', default=None, help='snapshot outputs into this deduplicating chunk store')
+
+    inspect = subparsers.add_parser('inspect', help='print key and parameter analyse of checkpoints')
+    inspect.add_argument('paths', nargs='+', help='checkpoints to inspect')
+    inspect.add_argument('--target', default=None, help='compare with this checkpoint')
+    inspect.add_argument('--keys-prefix', nargs='*', default=None, help='keys of the state dict in the checkpoint')
+    inspect.add_argument('--target-keys-prefix', nargs='*', default=None)
+    inspect.add_argument('--level', type=int, default=1, help='prefix level of parameter statistics')
+    inspect.add_argument('--json', action='store_true', help='print summary as json')
+
+    backup = subparsers.add_parser('backup', help='incremental backup of a directory filtered by .packignore')
+    backup.add_argument('source', help='directory to back up')
+    backup.add_argument('dest_dir', help='directory of archives and the manifest')
+    backup.add_argument('--full', action='store_true', help='ignore the manifest and archive every file')
+    backup.add_argument('--packignore', default='.packignore', help='ignore file, relative to source')
+    backup.add_argument('--no-packignore', action='store_true', help='back up without an ignore file')
+    backup.add_argument('--exclude', nargs='*', default=None, help='extra path globs to exclude, relative to source')
+    backup.add_argument('--format', default='gz', choices=['gz', 'zst'])
+    backup.add_argument('--workers', type=int, default=None, help='compress threads, default to cpu count')
+    backup.add_argument('--level', type=int, default=None, help='compress level')
+    backup.add_argument('--store', action='store_true',
+                        help='dest_dir is a deduplicating chunk store, take a snapshot instead of an archive')
+    backup.add_argument('--json', action='store_true', help='print summary as json')
+
+    restore = subparsers.add_parser('restore', help='restore the latest backup chain')
+    restore.add_argument('dest_dir', help='directory of archives and the manifest')
+    restore.add_argument('target', help='directory to restore into')
+    restore.add_argument('--name', default=None, help='name of the backed up directory')
+    restore.add_argument('--until', default=None, help='restore up to this archive')
+
+    store = subparsers.add_parser('store', help='manage a deduplicating chunk store')
+    store.add_argument('action', choices=['list', 'restore', 'prune', 'gc', 'verify', 'stats'])
+    store.add_argument('root', help='store directory')
+    store.add_argument('snapshot', nargs='?', default=None, help='snapshot id to restore or verify, or name to prune')
+    store.add_argument('target', nargs='?', default=None, help='directory to restore into')
+    store.add_argument('--keep', type=int, default=7, help='snapshots to keep when pruning')
+
+    hello = subparsers.add_parser('hello', help='hello world')
+    hello.add_argument('name', nargs='?', default='World')
+    return parser
+
+
+def _convert(options):
+    """执行 convert 子命令"""
+    from .ckpt_tr.jobs import run_manifest
+    overrides = {
+        'target': options.target,
+        'save_dir': options.save_dir,
+        'output_dir': options.output_dir,
+        'rules': options.rules,
+        'transforms': options.transforms,
+        'auto_match': options.auto_match,
+        'save_type': options.save_type,
+        'max_shard_size': options.max_shard_size,
+        'workers': options.workers,
+        'resume': options.resume,
+        'store': options.store,
+    }
+    if options.manifest is not None:
+        manifest = options.manifest
+    elif options.source is not None:
+        manifest = {'jobs': [options.source]}
+    else:
+        raise SystemExit('gutils convert: a manifest or --source is required')
+    results = run_manifest(manifest, options.concurrency, options.memory_budget, options.cache_dir,
+                           options.skip_existing, options.report, **overrides)
+    return int(any(result['status'] == 'failed' for result in results))
+
+
+def _inspect(options):
+    """执行 inspect 子命令"""
+    from .ckpt_tr.inspector import CheckpointInspector, inspect_checkpoints
+    if options.json:
+        print(json.dumps(inspect_checkpoints(options.paths, options.keys_prefix, options.level), indent=2))
+        return 0
+    for path in options.paths:
+        print(CheckpointInspector(path, options.target, options.keys_prefix,
+                                  options.target_keys_prefix, options.level))
+    return 0
+
+
+def _backup(options):
+    """执行 backup 子命令"""
+    from .backup import BackupEngine, ChunkStore, load_packignore
+    packignore = None if options.no_packignore else options.packignore
+    try:
+        if options.store:
+            ignore = load_packignore(options.source, packignore, options.exclude, options.dest_dir)
+        else:
+            engine = BackupEngine(options.source, options.dest_dir, packignore, options.exclude,
+                                  options.format, options.workers, options.level)
+    except FileNotFoundError as e:
+        raise SystemExit(f"gutils backup: {e}")
+    if options.store:
+        kwargs = {} if options.level is None else {'level': options.level}
+        summary = ChunkStore(options.dest_dir, workers=options.workers, **kwargs).snapshot(options.source,
+                                                                                          ignore=ignore)
+    else:
+        summary = engine.run(options.full)
+    if options.json:
+        print(json.dumps(summary, indent=2))
+    return 0
+
+
+def _restore(options):
+    """执行 restore 子命令"""
+    from .backup import restore
+    restore(options.dest_dir, options.target, options.name, options.until)
+    return 0
+
+
+def _store(options):
+    """执行 store 子命令"""
+    from .backup import ChunkStore
+    store = ChunkStore(options.root)
+    if options.action == 'list':
+        for snapshot_id in store.snapshots(options.snapshot):
+            print(snapshot_id)
+    elif options.action == 'restore':
+        if options.snapshot is None or options.target is None:
+            raise SystemExit('gutils store restore: snapshot and target are required')
+        store.restore(options.snapshot, options.target)
+    elif options.action == 'prune':
+        if options.snapshot is None:
+            raise SystemExit('gutils store prune: snapshot name is required')
+        for snapshot_id in store.prune(options.snapshot, options.keep):
+            print(f"=> forget {snapshot_id}")
+        store.gc()
+    elif options.action == 'gc':
+        store.gc()
+    elif options.action == 'verify':
+        result = store.verify(options.snapshot)
+        if result['missing'] or result['corrupted']:
+            return 1
+    else:
+        print(json.dumps(store.stats(), indent=2))
+    return 0
+
+
 def main(args=None):
     """主程序入口"""
     from . import demo
@@ -24,6 +201,20 @@ def main(args=None):
         import sys
         args = sys.argv[1:]
 
-    hello = demo.Hello()
-    return hello.run(*args)
+    parser = _build_parser()
+    if not args or args[0] not in ('convert', 'inspect', 'backup', 'restore', 'store', 'hello', '-h', '--help'):
+        hello = demo.Hello()
+        return hello.run(*args)
 
+    options = parser.parse_args(args)
+    if options.command == 'convert':
+        return _convert(options)
+    if options.command == 'inspect':
+        return _inspect(options)
+    if options.command == 'backup':
+        return _backup(options)
+    if options.command == 'restore':
+        return _restore(options)
+    if options.command == 'store':
+        return _store(options)
+    return demo.Hello().run(options.name)
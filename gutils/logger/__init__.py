@@ -1,3 +1,3 @@
-from .logging import get_logger
+from .logging import get_logger, shutdown_logger
 
-__all__ = ['get_logger']
\ No newline at end of file
+__all__ = ['get_logger', 'shutdown_logger']
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+异步日志和日志轮转用到的 handler，由 get_logger 在需要时导入。
+"""
+import logging
+import logging.handlers
+import queue
+from logging.handlers import RotatingFileHandler
+from queue import SimpleQueue
+
+__all__ = ['BatchFileHandler', 'BatchRotatingFileHandler', 'BatchStreamHandler', 'BatchQueueListener',
+           'QueueHandler', 'RotatingFileHandler', 'SimpleQueue']
+
+
+class BatchFlushMixin(object):
+    """StreamHandler 每写一条日志都会调用 flush，这里改为每 flush_every 条才真正 flush 一次。"""
+    flush_every = 1
+    _pending = 0
+
+    def flush(self) -> None:
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.force_flush()
+
+    def force_flush(self) -> None:
+        self._pending = 0
+        super().flush()
+
+    def close(self) -> None:
+        self.force_flush()
+        super().close()
+
+
+class BatchFileHandler(BatchFlushMixin, logging.FileHandler):
+    pass
+
+
+class BatchRotatingFileHandler(BatchFlushMixin, RotatingFileHandler):
+    pass
+
+
+class BatchStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    只在调用线程中合并 msg 和 args（args 可能在之后被修改），不拷贝 record，也不在调用线程中格式化，
+    完整的格式化由后台线程中的 handler 完成。
+    """
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class BatchQueueListener(logging.handlers.QueueListener):
+    """队列为空时先 flush 全部 handler 再阻塞等待，空闲时日志不会滞留在缓冲区中。"""
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            if not block:
+                raise
+        for handler in self.handlers:
+            if isinstance(handler, BatchFlushMixin):
+                handler.force_flush()
+        return self.queue.get()
@@ -1,36 +1,117 @@
 """
 logger
+
+同步模式下文件和终端 handler 直接挂在 logger 上，每条日志都在调用线程中写盘并 flush；
+异步模式下 logger 上只有一个 QueueHandler，调用线程只负责入队，格式化、写文件、日志轮转和终端输出都在后台线程中完成，
+后台线程每 flush_every 条日志或队列为空时才 flush 一次。
 """
+import atexit
 import logging
+import threading
+
+__all__ = ['get_logger', 'shutdown_logger']
+
+_lock = threading.Lock()
+# name -> (QueueListener，同步模式下为 None；logger 上由 get_logger 添加的 handler；写文件和终端的 handler；配置参数)
+_configured = {}
+
 
-def get_logger(name=""):
+def _formatter() -> logging.Formatter:
+    return logging.Formatter(fmt="%(asctime)-s  "
+                                 "%(levelname)-s  "
+                                 "%(name)-s  "
+                                 "%(filename)-s  "
+                                 "%(funcName)-s  "
+                                 "Line: %(lineno)-s  "
+                                 "Msg: %(message)s  ",
+                             datefmt="%Y-%m-%d %H:%M:%S")
+
+
+def get_logger(name="", async_mode=False, filename=None, max_bytes=0, backup_count=0, flush_every=64):
     """
-    获取日志记录器。
+    获取日志记录器，同一个 name 只在第一次调用时添加 handler，之后的调用直接返回已配置的 logger，
+    参数与第一次不同时给出警告，新的参数不会生效。
+    日志文件在配置时总是清空，是否轮转都一样。
     Parameters
     ----------
     name (str): 日志记录器的名称，默认为""。
+    async_mode (bool): 是否使用 QueueHandler/QueueListener 在后台线程中写日志，默认为False。
+    filename (str): 日志文件，默认为 f"{name}.log"。
+    max_bytes (int): 日志文件超过该大小时轮转，默认为0，即不轮转。
+    backup_count (int): 轮转时保留的旧日志文件数量。
+    flush_every (int): 异步模式下每多少条日志 flush 一次，队列为空时总会 flush。
     Returns
     -------
         logging.Logger: 日志记录器。
     """
     logger = logging.getLogger(name=name)
-    logger.setLevel(level=logging.DEBUG)
-    # handler
-    f_hdlr = logging.FileHandler(filename=f"{name}.log", mode="w" )
-    f_hdlr.setLevel(level=logging.DEBUG)
-    c_hdlr = logging.StreamHandler()
-    c_hdlr.setLevel(level=logging.INFO)
-    # formatter
-    fmt = logging.Formatter(fmt="%(asctime)-s  "
-                                "%(levelname)-s  "
-                                "%(name)-s  "
-                                "%(filename)-s  "
-                                "%(funcName)-s  "
-                                "Line: %(lineno)-s  "
-                                "Msg: %(message)s  ",
-                            datefmt="%Y-%m-%d %H:%M:%S")
-    f_hdlr.setFormatter(fmt)
-    c_hdlr.setFormatter(fmt)
-    logger.addHandler(hdlr=f_hdlr)
-    logger.addHandler(hdlr=c_hdlr)
-    return logger
\ No newline at end of file
+    filename = f"{name}.log" if filename is None else filename
+    options = {'async_mode': async_mode, 'filename': filename, 'max_bytes': max_bytes,
+               'backup_count': backup_count, 'flush_every': flush_every}
+    with _lock:
+        if name in _configured:
+            configured = _configured[name][3]
+            if configured != options:
+                import warnings
+                changed = dict((key, value) for key, value in options.items() if configured[key] != value)
+                warnings.warn(f"logger {name!r} is already configured with {configured}, ignore {changed}; "
+                              f"call shutdown_logger({name!r}) first to reconfigure it")
+            return logger
+        logger.setLevel(level=logging.DEBUG)
+        # 轮转和异步模式用到的 logging.handlers 导入较慢，只在需要时导入
+        if async_mode or max_bytes > 0:
+            from . import handlers
+        # handler
+        if max_bytes > 0:
+            # RotatingFileHandler 总是以追加方式打开文件，先清空，与不轮转时的 mode="w" 一致
+            open(filename, "w").close()
+            f_cls = handlers.BatchRotatingFileHandler if async_mode else handlers.RotatingFileHandler
+            f_hdlr = f_cls(filename=filename, mode="w", maxBytes=max_bytes, backupCount=backup_count)
+        else:
+            f_cls = handlers.BatchFileHandler if async_mode else logging.FileHandler
+            f_hdlr = f_cls(filename=filename, mode="w")
+        f_hdlr.setLevel(level=logging.DEBUG)
+        c_hdlr = handlers.BatchStreamHandler() if async_mode else logging.StreamHandler()
+        c_hdlr.setLevel(level=logging.INFO)
+        # formatter
+        fmt = _formatter()
+        f_hdlr.setFormatter(fmt)
+        c_hdlr.setFormatter(fmt)
+
+        if not async_mode:
+            logger.addHandler(hdlr=f_hdlr)
+            logger.addHandler(hdlr=c_hdlr)
+            _configured[name] = (None, (f_hdlr, c_hdlr), (f_hdlr, c_hdlr), options)
+            return logger
+
+        f_hdlr.flush_every = c_hdlr.flush_every = max(int(flush_every), 1)
+        log_queue = handlers.SimpleQueue()
+        listener = handlers.BatchQueueListener(log_queue, f_hdlr, c_hdlr, respect_handler_level=True)
+        listener.start()
+        q_hdlr = handlers.QueueHandler(log_queue)
+        logger.addHandler(hdlr=q_hdlr)
+        _configured[name] = (listener, (q_hdlr,), (f_hdlr, c_hdlr), options)
+        return logger
+
+
+def shutdown_logger(name=None):
+    """
+    等待后台线程写完队列中的日志，关闭并移除 get_logger 添加的 handler。
+    Parameters
+    ----------
+    name (str): 日志记录器的名称，默认为None，即全部由 get_logger 配置的日志记录器。
+    """
+    with _lock:
+        names = list(_configured) if name is None else [name] if name in _configured else []
+        for key in names:
+            listener, attached, outputs, _ = _configured.pop(key)
+            logger = logging.getLogger(name=key)
+            for handler in attached:
+                logger.removeHandler(handler)
+            if listener is not None:
+                listener.stop()
+            for handler in outputs:
+                handler.close()
+
+
+atexit.register(shutdown_logger)
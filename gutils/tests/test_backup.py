@@ -0,0 +1,161 @@
+import io
+import os
+import json
+import tarfile
+import tempfile
+import unittest
+import warnings
+from unittest import mock
+
+from gutils.backup import BackupEngine, PackIgnore, restore
+
+
+def _tree(root):
+    """目录树的内容：相对路径 -> 文件内容 / ('link', 目标) / 'dir'。"""
+    result = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames + filenames:
+            path = os.path.join(dirpath, name)
+            rel_path = os.path.relpath(path, root)
+            if os.path.islink(path):
+                result[rel_path] = ('link', os.readlink(path))
+            elif os.path.isdir(path):
+                result[rel_path] = 'dir'
+            else:
+                with open(path, 'rb') as f:
+                    result[rel_path] = f.read()
+    return result
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class BackupTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.workdir.name, 'project')
+        self.dest = os.path.join(self.workdir.name, 'backups')
+        _write(os.path.join(self.source, 'main.py'), b'print(1)\n')
+        _write(os.path.join(self.source, 'pkg', 'module.py'), b'x = 1\n' * 1000)
+        _write(os.path.join(self.source, 'logs', 'train.log'), b'ignored')
+        _write(os.path.join(self.source, 'model.pth'), b'ignored')
+        os.symlink('/etc/hostname', os.path.join(self.source, 'absolute_link'))
+        os.symlink('../../outside', os.path.join(self.source, 'pkg', 'outside_link'))
+        os.makedirs(os.path.join(self.source, 'empty'))
+        _write(os.path.join(self.source, '.packignore'), b'logs/\n*.pth\n')
+        warnings.simplefilter('ignore')
+
+    def tearDown(self):
+        warnings.resetwarnings()
+        self.workdir.cleanup()
+
+    def expected(self):
+        tree = _tree(self.source)
+        return dict((key, value) for key, value in tree.items()
+                    if not key.startswith('logs') and not key.endswith('.pth'))
+
+    def restored(self, **kwargs):
+        target = tempfile.mkdtemp(dir=self.workdir.name)
+        restore(self.dest, target, **kwargs)
+        return _tree(os.path.join(target, 'project'))
+
+    def test_packignore(self):
+        ignore = PackIgnore(['logs/', '*.pth', '# comment', ''], excludes=['pkg/skip*'])
+        self.assertTrue(ignore.ignore_dir('logs', 'a/logs'))
+        self.assertTrue(ignore.ignore_file('model.pth', 'a/model.pth'))
+        self.assertTrue(ignore.ignore_file('skip.py', 'pkg/skip.py'))
+        self.assertFalse(ignore.ignore_file('main.py', 'main.py'))
+        with self.assertRaises(FileNotFoundError):
+            BackupEngine(self.source, self.dest, packignore='missing')
+
+    def test_full_incremental_restore(self):
+        for format in ('gz', 'zst'):
+            with self.subTest(format=format):
+                dest = os.path.join(self.workdir.name, f"backups-{format}")
+                engine = BackupEngine(self.source, dest, format=format)
+                summary = engine.run()
+                self.assertEqual(summary['type'], 'full')
+                self.assertEqual(summary['files'], 5)
+                target = tempfile.mkdtemp(dir=self.workdir.name)
+                restore(dest, target)
+                self.assertEqual(_tree(os.path.join(target, 'project')), self.expected())
+
+    def test_incremental_changes(self):
+        engine = BackupEngine(self.source, self.dest)
+        engine.run()
+        self.assertIsNone(engine.run()['archive'])
+
+        # touch 但内容不变的文件不再归档
+        os.utime(os.path.join(self.source, 'main.py'), ns=(1, 1))
+        self.assertIsNone(engine.run()['archive'])
+
+        _write(os.path.join(self.source, 'pkg', 'module.py'), b'y = 2\n')
+        _write(os.path.join(self.source, 'new', 'file.txt'), b'new')
+        os.makedirs(os.path.join(self.source, 'new_empty', 'nested'))
+        os.remove(os.path.join(self.source, 'main.py'))
+        summary = engine.run()
+        self.assertEqual(summary['type'], 'incremental')
+        self.assertEqual((summary['files'], summary['removed']), (2, 1))
+        self.assertEqual(self.restored(), self.expected())
+
+        os.rmdir(os.path.join(self.source, 'empty'))
+        os.rename(os.path.join(self.source, 'new'), os.path.join(self.source, 'renamed'))
+        engine.run()
+        self.assertEqual(self.restored(), self.expected())
+
+        with open(engine.manifest_path, 'r', encoding='utf-8') as f:
+            archives = json.load(f)['archives']
+        first = self.restored(until=archives[0]['name'])
+        self.assertIn('main.py', first)
+        self.assertNotIn('new_empty', first)
+
+        engine.run(full=True)
+        self.assertEqual(self.restored(), self.expected())
+
+    def test_file_shrinking_while_archived(self):
+        engine = BackupEngine(self.source, self.dest)
+        engine.run()
+        path = os.path.join(self.source, 'pkg', 'module.py')
+        _write(path, b'z = 3\n' * 2000)
+        _write(os.path.join(self.source, 'main.py'), b'print(2)\n')
+
+        def shrink_on_open(file, *args, **kwargs):
+            if file == path:
+                os.truncate(path, 10)
+            return open(file, *args, **kwargs)
+
+        with mock.patch('gutils.backup.engine.open', shrink_on_open, create=True):
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                summary = engine.run()
+        self.assertTrue(any('module.py' in str(w.message) for w in caught))
+        self.assertEqual(summary['files'], 1)
+        # 恢复时跳过变化中的文件，保留上一次的版本
+        restored = self.restored()
+        self.assertEqual(restored['pkg/module.py'], b'x = 1\n' * 1000)
+        self.assertEqual(restored['main.py'], b'print(2)\n')
+        # 下一次备份重新归档
+        self.assertEqual(engine.run()['files'], 1)
+        self.assertEqual(self.restored(), self.expected())
+
+    def test_restore_rejects_path_traversal(self):
+        os.makedirs(self.dest)
+        archive = 'project-20240101-000000-full.tar.gz'
+        with tarfile.open(os.path.join(self.dest, archive), 'w:gz') as tar:
+            info = tarfile.TarInfo('project/../../evil')
+            info.size = 4
+            tar.addfile(info, io.BytesIO(b'evil'))
+        with open(os.path.join(self.dest, 'project.manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'files': {}, 'dirs': [],
+                       'archives': [{'name': archive, 'type': 'full', 'files': 1, 'removed': []}]}, f)
+        target = os.path.join(self.workdir.name, 'a', 'b')
+        with self.assertRaises(ValueError):
+            restore(self.dest, target)
+        self.assertFalse(os.path.exists(os.path.join(self.workdir.name, 'evil')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import math
+import tempfile
+import unittest
+
+from gutils.benchmarks.import_time import measure_import
+from gutils.benchmarks.suite import DEFAULT_CONFIG, compare, format_report, prepare, run_case
+from gutils.benchmarks.synthetic import checkpoint_layout, make_video, synthetic_meta, synthetic_state_dict
+
+
+class SyntheticDataTest(unittest.TestCase):
+    def test_checkpoint_layout(self):
+        layout = checkpoint_layout(8, 64)
+        self.assertEqual(layout[0], ('model.layers.0.attn.qkv.weight', (8, 8)))
+        self.assertEqual(layout[4], ('model.layers.0.norm1.weight', (8, )))
+        self.assertEqual(layout[6][0], 'model.layers.1.attn.qkv.weight')
+        meta = synthetic_meta(8, 32, prefix='backbone', transpose=True)
+        self.assertEqual(meta['backbone.layers.0.attn.qkv.weight'].shape, (6, 5))
+
+    def test_state_dict_is_deterministic(self):
+        a, b = synthetic_state_dict(6, 16, seed=1), synthetic_state_dict(6, 16, seed=1)
+        self.assertEqual(list(a), list(b))
+        self.assertTrue(all((a[key] == b[key]).all() for key in a))
+
+    def test_video_boxes(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            video = make_video(f"{workdir}/video.avi", num_frames=20, size=(160, 120), patch_size=24, margin=8)
+        boxes = video['boxes']
+        self.assertEqual(boxes.shape, (20, 4))
+        self.assertEqual(video['box'], boxes[0].tolist())
+        self.assertTrue(((boxes[:, :2] >= 8) & (boxes[:, 2:] <= (160 - 8, 120 - 8))).all())
+        with self.assertRaises(ValueError):
+            make_video(f"{workdir}/video.avi", size=(40, 40), patch_size=24, margin=16)
+
+
+class CompareTest(unittest.TestCase):
+    def test_compare(self):
+        baseline = {'results': {'conversion.numpy': {'seconds': 2., 'gb_per_s': 1., 'peak_rss_mb': 100.},
+                                'tracker.direct': {'center_error_px': 0.}}}
+        results = {'conversion.numpy': {'seconds': 2.5, 'gb_per_s': 1.5, 'load_s': 1.},
+                   'tracker.direct': {'center_error_px': 0.5}}
+        rows = dict(((row['case'], row['metric']), row) for row in compare(baseline, results, tolerance=0.1))
+        self.assertAlmostEqual(rows['conversion.numpy', 'seconds']['change'], -0.25)
+        self.assertTrue(rows['conversion.numpy', 'seconds']['regression'])
+        self.assertAlmostEqual(rows['conversion.numpy', 'gb_per_s']['change'], 0.5)
+        self.assertFalse(rows['conversion.numpy', 'gb_per_s']['regression'])
+        self.assertIsNone(rows['conversion.numpy', 'load_s']['baseline'])
+        self.assertIsNone(rows['conversion.numpy', 'peak_rss_mb']['current'])
+        self.assertEqual(rows['tracker.direct', 'center_error_px']['change'], -math.inf)
+        report = format_report(list(rows.values()))
+        self.assertIn('REGRESSION', report)
+        self.assertIn('+50.0%', report)
+
+
+class RunCaseTest(unittest.TestCase):
+    def test_analysis_and_conversion(self):
+        config = dict(DEFAULT_CONFIG, backends=['numpy'], analysis_keys=60, analysis_numel=16,
+                      conversion_keys=12, conversion_numel=256, repeat=1)
+        with tempfile.TemporaryDirectory() as workdir:
+            prepare(workdir, ['analysis', 'conversion'], config)
+            analysis = run_case('analysis', 'numpy', workdir, config)
+            conversion = run_case('conversion', 'numpy', workdir, config)
+        self.assertEqual(sorted(analysis), ['load_s', 'match_s', 'report_s'])
+        self.assertGreater(conversion['gb_per_s'], 0.)
+
+    def test_import_stays_light(self):
+        result = measure_import('gutils', repeat=1)
+        self.assertEqual(result['loaded'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
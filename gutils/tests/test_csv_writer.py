@@ -0,0 +1,105 @@
+import os
+import csv
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+import gutils
+from gutils.utils.csv_writer import CSVWriter, close_csv_writers, get_csv_writer
+
+
+def _read(path):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+class CSVWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, 'result.csv')
+
+    def tearDown(self):
+        close_csv_writers()
+        self.workdir.cleanup()
+
+    def test_flush_rows(self):
+        with CSVWriter(self.path, header=('a', 'b'), flush_rows=3, flush_interval=1e9) as writer:
+            writer.writerow((1, 2))
+            writer.writerow((3, 4))
+            self.assertEqual(_read(self.path), [])
+            writer.writerow((5, 6))
+            self.assertEqual(_read(self.path), [['a', 'b'], ['1', '2'], ['3', '4'], ['5', '6']])
+            writer.writerow((7, 8))
+        self.assertTrue(writer.closed)
+        self.assertEqual(_read(self.path)[-1], ['7', '8'])
+
+    def test_flush_interval(self):
+        with CSVWriter(self.path, flush_rows=100, flush_interval=0.) as writer:
+            writer.writerow((1, ))
+            self.assertEqual(_read(self.path), [['1']])
+
+    def test_header_only_for_empty_file(self):
+        for _ in range(2):
+            with CSVWriter(self.path, header=('a', )) as writer:
+                writer.writerow((1, ))
+        self.assertEqual(_read(self.path), [['a'], ['1'], ['1']])
+        with CSVWriter(self.path, header=('b', ), mode='w') as writer:
+            writer.writerow((2, ))
+        self.assertEqual(_read(self.path), [['b'], ['2']])
+        with self.assertRaises(ValueError):
+            CSVWriter(self.path, mode='r')
+
+    def test_writerows_array(self):
+        rows = np.arange(6, dtype=np.int32).reshape(3, 2)
+        with CSVWriter(self.path) as writer:
+            writer.writerows(rows)
+            writer.writerows([(6, 7)])
+            with self.assertRaises(ValueError):
+                writer.writerows(np.arange(3))
+        self.assertEqual(_read(self.path), [['0', '1'], ['2', '3'], ['4', '5'], ['6', '7']])
+
+    def test_threads(self):
+        with CSVWriter(self.path, flush_rows=7) as writer:
+            def work(index):
+                for i in range(200):
+                    writer.writerow((index, i))
+
+            threads = [threading.Thread(target=work, args=(index, )) for index in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        rows = _read(self.path)
+        self.assertEqual(len(rows), 800)
+        self.assertEqual(sorted(map(tuple, rows)), sorted((str(t), str(i)) for t in range(4) for i in range(200)))
+
+    def test_shared_writer(self):
+        writer = get_csv_writer(self.path)
+        self.assertIs(get_csv_writer(self.path), writer)
+        close_csv_writers()
+        self.assertTrue(writer.closed)
+        self.assertIsNot(get_csv_writer(self.path), writer)
+
+    def test_compat_wrapper_writes_every_row(self):
+        # 同一路径已被以批量写盘的参数打开
+        get_csv_writer(self.path, flush_rows=1000, flush_interval=1e9)
+        for i in range(3):
+            gutils.csvwriter(self.path, [i, 'x'])
+            self.assertEqual(_read(self.path)[-1], [str(i), 'x'])
+
+    def test_compat_wrapper_keeps_no_file_open(self):
+        other = os.path.join(self.workdir.name, 'other.csv')
+        gutils.csvwriter(other, ['a', 1])
+        # 删除或轮转之后的写入进入新文件
+        os.remove(other)
+        gutils.csvwriter(other, ['b', 2])
+        self.assertEqual(_read(other), [['b', '2']])
+        fd_dir = '/proc/self/fd'
+        if os.path.isdir(fd_dir):
+            opened = set(os.path.realpath(os.path.join(fd_dir, fd)) for fd in os.listdir(fd_dir))
+            self.assertNotIn(os.path.realpath(other), opened)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import time
+import tempfile
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+
+from gutils.ckpt_tr import TransformTable, Transpose, WeightTrans
+from gutils.ckpt_tr.engine import ConversionEngine
+from gutils.ckpt_tr.formats import load_npz, save_npz
+from gutils.ckpt_tr.loaders import TensorMeta
+
+
+def _square(x, delay):
+    time.sleep(delay)
+    if x < 0:
+        raise ValueError(x)
+    return x * x
+
+
+class ConversionEngineTest(unittest.TestCase):
+    def test_results_keep_submission_order(self):
+        # 前面的任务更慢，结果仍然按提交顺序返回
+        items = [(i, 0.02 * (5 - i)) for i in range(6)]
+        for workers in (1, 3):
+            results = list(ConversionEngine(workers).map(_square, items))
+            self.assertEqual([item for item, _, _ in results], items)
+            self.assertEqual([result for _, result, _ in results], [i * i for i in range(6)])
+
+    def test_errors_are_returned(self):
+        results = list(ConversionEngine(2).map(_square, [(1, 0.), (-1, 0.), (2, 0.)]))
+        self.assertEqual([result for _, result, _ in results], [1, None, 4])
+        self.assertIsInstance(results[1][2], ValueError)
+
+    def test_inflight_bytes_limit(self):
+        inflight, peak = [0], [0]
+
+        def produce():
+            for i in range(8):
+                inflight[0] += 1
+                peak[0] = max(peak[0], inflight[0])
+                yield (i, 0.01)
+
+        for _ in ConversionEngine(4, max_inflight_bytes=20).map(_square, produce(), nbytes=lambda item: 10):
+            inflight[0] -= 1
+        self.assertLessEqual(peak[0], 3)
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            ConversionEngine(2, executor='gpu')
+
+
+class ParallelConversionTest(unittest.TestCase):
+    def test_parallel_matches_sequential(self):
+        rng = np.random.default_rng(0)
+        source = OrderedDict((f"layers.{i}.weight", rng.standard_normal((4, 6)).astype(np.float32))
+                             for i in range(10))
+        source['head.bias'] = rng.standard_normal(6).astype(np.float32)
+        target = OrderedDict((key, TensorMeta(value.shape[::-1], 'float32')) for key, value in source.items())
+        with tempfile.TemporaryDirectory() as workdir:
+            source_path = os.path.join(workdir, 'source.npz')
+            save_npz(source, source_path)
+            outputs = []
+            for workers, batch_size in ((1, 1), (3, 1), (3, 4)):
+                wt = WeightTrans(source_path, target, verbose=False)
+                wt.set_transforms(TransformTable([(r'\.weight$', [Transpose()])]))
+                save_dir = os.path.join(workdir, f"out-{workers}-{batch_size}")
+                wt.source2target(save_dir, 'numpy', workers=workers, batch_size=batch_size)
+                state_dict = load_npz(save_dir + '.npz')
+                outputs.append(dict((key, np.array(state_dict[key])) for key in state_dict))
+        for output in outputs:
+            self.assertEqual(list(output), list(source))
+            for key, value in source.items():
+                np.testing.assert_array_equal(output[key], value.T)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from gutils.ckpt_tr.formats import (bfloat16_dtype, is_bfloat16, load_npz, load_safetensors, read_npz_meta,
+                                    read_safetensors_meta, save_npz, save_safetensors)
+from gutils.ckpt_tr.transforms import Cast, TransformChain, from_bfloat16, to_bfloat16
+
+
+class FormatRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.values = rng.standard_normal((4, 6)).astype(np.float32)
+        self.state = {
+            'bf16': to_bfloat16(self.values),
+            'f16': self.values.astype(np.float16),
+            'f32': self.values,
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _check(self, loaded, meta):
+        self.assertEqual(list(loaded), ['bf16', 'f16', 'f32'])
+        self.assertEqual([meta[key][1] for key in loaded], ['bfloat16', 'float16', 'float32'])
+        self.assertTrue(is_bfloat16(loaded['bf16'].dtype))
+        self.assertEqual(loaded['f16'].dtype, np.float16)
+        self.assertEqual(loaded['f32'].dtype, np.float32)
+        for key, value in self.state.items():
+            np.testing.assert_array_equal(loaded[key], value)
+        np.testing.assert_allclose(from_bfloat16(loaded['bf16']), self.values, rtol=1e-2)
+
+    def _header_codes(self, path):
+        with open(path, 'rb') as f:
+            size = struct.unpack('<Q', f.read(8))[0]
+            header = json.loads(f.read(size))
+        return dict((key, value['dtype']) for key, value in header.items() if key != '__metadata__')
+
+    def test_safetensors_round_trip(self):
+        path = os.path.join(self.root, 'model.safetensors')
+        save_safetensors(self.state, path)
+        self.assertEqual(self._header_codes(path), {'bf16': 'BF16', 'f16': 'F16', 'f32': 'F32'})
+        self._check(load_safetensors(path), read_safetensors_meta(path))
+
+        again = os.path.join(self.root, 'again.safetensors')
+        save_safetensors(dict(load_safetensors(path)), again)
+        self.assertEqual(self._header_codes(again)['bf16'], 'BF16')
+        self._check(load_safetensors(again), read_safetensors_meta(again))
+
+    def test_npz_round_trip(self):
+        path = os.path.join(self.root, 'model.npz')
+        save_npz(self.state, path)
+        self._check(load_npz(path), read_npz_meta(path))
+
+        again = os.path.join(self.root, 'again.npz')
+        save_npz(dict(load_npz(path)), again)
+        self._check(load_npz(again), read_npz_meta(again))
+
+    def test_cast_output_is_written_as_bf16(self):
+        result = TransformChain([Cast('bfloat16')])(self.values)
+        self.assertEqual(result.dtype, bfloat16_dtype())
+        self.assertTrue(is_bfloat16(result.dtype))
+        path = os.path.join(self.root, 'cast.safetensors')
+        save_safetensors({'w': result}, path)
+        self.assertEqual(self._header_codes(path), {'w': 'BF16'})
+        np.testing.assert_array_equal(load_safetensors(path)['w'], self.state['bf16'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import sys
+import importlib
+import subprocess
+import unittest
+
+from gutils.benchmarks.import_time import HEAVY_MODULES, measure_import
+
+_PACKAGES = ('gutils', 'gutils.ckpt_tr', 'gutils.algorithms')
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_import_does_not_load_frameworks(self):
+        for module in _PACKAGES:
+            result = measure_import(module, repeat=1)
+            self.assertEqual(result['loaded'], [], module)
+            self.assertEqual(len(result['times_ms']), 1)
+
+    def test_lazy_attributes_resolve_and_are_cached(self):
+        for name in _PACKAGES:
+            module = importlib.import_module(name)
+            for attr in module.__all__:
+                value = getattr(module, attr)
+                self.assertIs(vars(module)[attr], value, f"{name}.{attr}")
+                self.assertIn(attr, dir(module))
+            with self.assertRaises(AttributeError):
+                getattr(module, 'not_a_member')
+
+    def test_first_access_imports_the_submodule(self):
+        code = ("import sys, gutils.ckpt_tr as m\n"
+                "assert 'gutils.ckpt_tr.transforms' not in sys.modules\n"
+                "m.Transpose\n"
+                "assert 'gutils.ckpt_tr.transforms' in sys.modules and 'numpy' in sys.modules\n"
+                "assert 'gutils.ckpt_tr.ckpt_transfer' not in sys.modules\n"
+                "import gutils\n"
+                "assert gutils.WeightTrans is m.WeightTrans\n"
+                "assert not [name for name in {heavy!r} if name in sys.modules and name != 'numpy']\n"
+                ).format(heavy=HEAVY_MODULES)
+        subprocess.run([sys.executable, '-c', code], check=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import pickle
+import tempfile
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+
+from gutils.ckpt_tr import CheckpointInspector, inspect_checkpoints
+from gutils.ckpt_tr.formats import save_npz, save_safetensors
+from gutils.ckpt_tr.loaders import TensorMeta, load_meta
+from gutils.ckpt_tr.writers import ShardedWriter
+
+
+class _Payload(object):
+    """unpickle 时执行代码的对象，meta 读取不能执行它。"""
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return exec, (f"open({self.path!r}, 'w').close()", )
+
+
+class _ImportPayload(_Payload):
+    def __reduce__(self):
+        return __import__, ('os', )
+
+
+def _state_dict():
+    return OrderedDict([('backbone.conv.weight', np.zeros((8, 3, 3, 3), dtype=np.float32)),
+                        ('backbone.bn.weight', np.zeros(8, dtype=np.float16)),
+                        ('head.fc.weight', np.zeros((10, 8), dtype=np.float32))])
+
+
+class LoadMetaTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.workdir.name, name)
+
+    def check(self, meta, state_dict=None):
+        state_dict = state_dict or _state_dict()
+        self.assertEqual(list(meta), list(state_dict))
+        for key, value in state_dict.items():
+            self.assertIsInstance(meta[key], TensorMeta)
+            self.assertEqual(meta[key].shape, value.shape)
+            self.assertEqual(meta[key].dtype, value.dtype.name)
+
+    def test_npz_and_safetensors(self):
+        save_npz(_state_dict(), self.path('model.npz'))
+        self.check(load_meta(self.path('model.npz')))
+        save_safetensors(_state_dict(), self.path('model.safetensors'))
+        self.check(load_meta(self.path('model.safetensors')))
+
+    def test_sharded_index(self):
+        writer = ShardedWriter(self.path('model'), 'safetensors', 1024)
+        for key, value in _state_dict().items():
+            writer.add(key, value)
+        writer.close()
+        self.assertGreater(len(writer.shard_files), 1)
+        self.check(load_meta(self.path('model.safetensors.index.json')))
+
+    def test_pickled_numpy_state_dict(self):
+        for protocol in (2, pickle.HIGHEST_PROTOCOL):
+            state = {'model': _state_dict(), 'epoch': 3, 'names': {'a', 'b'}}
+            with open(self.path('model.pdparams'), 'wb') as f:
+                pickle.dump(state, f, protocol=protocol)
+            meta = load_meta(self.path('model.pdparams'))
+            self.check(meta['model'])
+            self.assertEqual(meta['epoch'], 3)
+            self.assertEqual(meta['names'], {'a', 'b'})
+
+    def test_untrusted_pickle_is_not_executed(self):
+        marker = self.path('executed')
+        state = OrderedDict([('weight', np.zeros(4, dtype=np.float32)), ('payload', _Payload(marker)),
+                             ('module', _ImportPayload(marker))])
+        for protocol in (2, pickle.HIGHEST_PROTOCOL):
+            with open(self.path('model.pdparams'), 'wb') as f:
+                pickle.dump(state, f, protocol=protocol)
+            meta = load_meta(self.path('model.pdparams'))
+            self.assertFalse(os.path.exists(marker))
+            self.assertEqual(meta['weight'].shape, (4, ))
+            self.assertNotIsInstance(meta['payload'], (TensorMeta, type(None)))
+            self.assertNotEqual(getattr(meta['module'], '__name__', None), 'os')
+
+
+class CheckpointInspectorTest(unittest.TestCase):
+    def test_summary(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            source, target = os.path.join(workdir, 'source.npz'), os.path.join(workdir, 'target.safetensors')
+            save_npz(_state_dict(), source)
+            state_dict = _state_dict()
+            state_dict.pop('head.fc.weight')
+            save_safetensors(state_dict, target)
+            inspector = CheckpointInspector(source, target)
+            summary = inspector.summary()
+            self.assertEqual(summary['num_keys'], 3)
+            self.assertEqual(summary['numel'], 216 + 8 + 80)
+            self.assertEqual(summary['nbytes'], (216 + 80) * 4 + 8 * 2)
+            self.assertEqual(summary['prefixes']['backbone'], {'num_keys': 2, 'numel': 224, 'nbytes': 880})
+            self.assertIn('PARAMETER ANALYSE', str(inspector))
+            self.assertEqual(list(inspect_checkpoints([source, target])), [source, target])
+
+
+if __name__ == '__main__':
+    unittest.main()
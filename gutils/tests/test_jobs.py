@@ -0,0 +1,143 @@
+import os
+import io
+import json
+import tempfile
+import threading
+import unittest
+from collections import OrderedDict
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from gutils import cmdline
+from gutils.ckpt_tr.formats import load_npz, save_npz
+from gutils.ckpt_tr.jobs import ConversionJob, JobQueue, MemoryBudget, load_manifest
+
+
+class MemoryBudgetTest(unittest.TestCase):
+    def test_unlimited(self):
+        budget = MemoryBudget()
+        self.assertEqual(budget.acquire(1 << 40), 0)
+        budget.release(0)
+        self.assertEqual(budget.used, 0)
+
+    def test_waits_until_released(self):
+        budget = MemoryBudget('1KB')
+        self.assertEqual(budget.acquire(600), 600)
+        acquired = threading.Event()
+
+        def worker():
+            budget.acquire(600)
+            acquired.set()
+        thread = threading.Thread(target=worker)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        budget.release(600)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual(budget.used, 600)
+
+    def test_oversized_request_runs_alone(self):
+        budget = MemoryBudget(1000)
+        self.assertEqual(budget.acquire(5000), 1000)
+        budget.release(1000)
+        self.assertEqual(budget.used, 0)
+
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.root = self.workdir.name
+        rng = np.random.default_rng(0)
+        state = OrderedDict((f"module.layers.{i}.weight", rng.standard_normal((3, 4)).astype(np.float32))
+                            for i in range(3))
+        self.sources = []
+        os.makedirs(os.path.join(self.root, 'snapshots'))
+        for step in (1, 2):
+            path = os.path.join(self.root, 'snapshots', f"step{step}.npz")
+            save_npz(OrderedDict((key, value * step) for key, value in state.items()), path)
+            self.sources.append(path)
+        self.state = state
+        save_npz(OrderedDict((key[len('module.'):], value) for key, value in state.items()),
+                 os.path.join(self.root, 'target.npz'))
+        with open(os.path.join(self.root, 'rules.json'), 'w', encoding='utf-8') as f:
+            json.dump({'rules': [{'type': 'prefix', 'pattern': 'module', 'replace': ''}]}, f)
+        self.manifest = os.path.join(self.root, 'manifest.json')
+        self._write_manifest({'defaults': {'target': 'target.npz', 'rules': 'rules.json', 'save_type': 'numpy',
+                                           'output_dir': 'converted'},
+                              'jobs': [{'source': 'snapshots/*.npz'}]})
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def _write_manifest(self, manifest):
+        with open(self.manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+    def _output(self, name):
+        return os.path.join(self.root, 'converted', name + '.npz')
+
+    def test_load_manifest(self):
+        jobs = load_manifest(self.manifest, {'max_shard_size': '1MB', 'workers': None})
+        self.assertEqual([job.source for job in jobs], self.sources)
+        self.assertEqual([job.save_dir for job in jobs],
+                         [os.path.join(self.root, 'converted', name) for name in ('step1', 'step2')])
+        for job in jobs:
+            self.assertEqual(job.target, os.path.join(self.root, 'target.npz'))
+            self.assertEqual((job.save_type, job.max_shard_size, job.workers), ('numpy', '1MB', 1))
+            self.assertTrue(job.output_path.endswith('.npz.index.json'))
+        self.assertEqual(jobs[0].estimate_memory(), min(2 * os.path.getsize(self.sources[0]), 1 << 20))
+        self.assertEqual(ConversionJob('a.npz', 'b.npz', 'out', memory='2KB').estimate_memory(), 2048)
+
+    def test_invalid_manifests(self):
+        for manifest in ({'jobs': [{'source': 'snapshots/step1.npz', 'save_dir': 'out'}]},
+                         {'jobs': [{'source': 'snapshots/step1.npz', 'target': 'target.npz'}]},
+                         {'jobs': [{'source': 'missing/*.npz', 'target': 'target.npz', 'output_dir': 'out'}]},
+                         {'jobs': [{'source': 'step1.npz', 'target': 'target.npz', 'save_dir': 'out', 'speed': 1}]}):
+            with self.assertRaises(ValueError):
+                load_manifest(dict(manifest))
+
+    def test_job_queue_shares_target_meta(self):
+        queue = JobQueue(load_manifest(self.manifest), concurrency=2, memory_budget='1GB')
+        with redirect_stdout(io.StringIO()):
+            results = queue.run()
+        self.assertEqual([result['status'] for result in results], ['done', 'done'])
+        self.assertEqual([result['unresolved_keys'] for result in results], [[], []])
+        self.assertEqual((queue.targets.misses, queue.targets.hits), (1, 1))
+        self.assertEqual(queue.budget.used, 0)
+        for step, name in ((1, 'step1'), (2, 'step2')):
+            state_dict = load_npz(self._output(name))
+            for key, value in self.state.items():
+                np.testing.assert_array_equal(state_dict[key[len('module.'):]], value * step)
+
+        queue = JobQueue(load_manifest(self.manifest), skip_existing=True)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual([result['status'] for result in queue.run()], ['skipped', 'skipped'])
+
+    def test_cli_convert(self):
+        report = os.path.join(self.root, 'report.json')
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(cmdline.main(['convert', self.manifest, '--report', report, '--concurrency', '2']), 0)
+        with open(report, 'r', encoding='utf-8') as f:
+            self.assertEqual([result['status'] for result in json.load(f)], ['done', 'done'])
+        self.assertTrue(os.path.exists(self._output('step2')))
+
+        save_dir = os.path.join(self.root, 'single')
+        with redirect_stdout(io.StringIO()):
+            status = cmdline.main(['convert', '--source', self.sources[0], '--target',
+                                   os.path.join(self.root, 'target.npz'), '--save-dir', save_dir,
+                                   '--rules', os.path.join(self.root, 'rules.json'), '--max-shard-size', '64B'])
+        self.assertEqual(status, 0)
+        self.assertTrue(os.path.exists(save_dir + '.npz.index.json'))
+
+        # 失败的任务不会中断队列，退出码为 1
+        with redirect_stdout(io.StringIO()):
+            status = cmdline.main(['convert', '--source', os.path.join(self.root, 'rules.json'), '--target',
+                                   os.path.join(self.root, 'target.npz'), '--save-dir', save_dir])
+        self.assertEqual(status, 1)
+        with self.assertRaises(SystemExit):
+            cmdline.main(['convert'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import json
+import tempfile
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+
+from gutils.ckpt_tr import WeightTrans
+from gutils.ckpt_tr.formats import load_npz, save_npz
+from gutils.ckpt_tr.journal import ConversionJournal, tensor_hash
+from gutils.ckpt_tr.loaders import TensorMeta
+from gutils.ckpt_tr.writers import ShardedWriter, parse_size
+
+
+class CountingTrans(WeightTrans):
+    converted = []
+
+    def transfer_weight(self, key, source_weight):
+        CountingTrans.converted.append(key)
+        return source_weight * 2
+
+
+def _load_sharded(save_dir):
+    with open(save_dir + '.npz.index.json', 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    result = {}
+    for key, shard in index['weight_map'].items():
+        result[key] = np.array(load_npz(os.path.join(os.path.dirname(save_dir), shard))[key])
+    return index, result
+
+
+class ShardedWriterTest(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size('5GB'), 5 << 30)
+        self.assertEqual(parse_size('1.5kb'), 1536)
+        self.assertEqual(parse_size(100), 100)
+
+    def test_shards_and_index(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            save_dir = os.path.join(workdir, 'model')
+            flushed = []
+            writer = ShardedWriter(save_dir, 'numpy', 100, on_flush=lambda shard, sizes: flushed.append(sizes))
+            for i in range(5):
+                writer.add(f"w{i}", np.full(10, i, dtype=np.float32))
+            writer.close()
+            index, state_dict = _load_sharded(save_dir)
+            self.assertEqual(index['metadata']['total_size'], 200)
+            self.assertEqual(sorted(set(index['weight_map'].values())),
+                             ['model-00001.npz', 'model-00002.npz', 'model-00003.npz'])
+            self.assertEqual([list(sizes) for sizes in flushed], [['w0', 'w1'], ['w2', 'w3'], ['w4']])
+            for i in range(5):
+                np.testing.assert_array_equal(state_dict[f"w{i}"], i)
+            self.assertEqual(len(writer.output_files()), 4)
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.workdir.name, 'source.npz')
+        self.save_dir = os.path.join(self.workdir.name, 'out', 'model')
+        os.makedirs(os.path.dirname(self.save_dir))
+        rng = np.random.default_rng(0)
+        self.source = OrderedDict((f"layers.{i}.weight", rng.standard_normal(16).astype(np.float32))
+                                  for i in range(8))
+        self.target = OrderedDict((key, TensorMeta(value.shape, 'float32')) for key, value in self.source.items())
+        CountingTrans.converted = []
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def convert(self, **kwargs):
+        save_npz(self.source, self.source_path)
+        CountingTrans.converted = []
+        wt = CountingTrans(self.source_path, self.target, verbose=False)
+        wt.source2target(self.save_dir, 'numpy', max_shard_size=128, resume=True, **kwargs)
+        return list(CountingTrans.converted)
+
+    def check_output(self):
+        _, state_dict = _load_sharded(self.save_dir)
+        self.assertEqual(sorted(state_dict), sorted(self.source))
+        for key, value in self.source.items():
+            np.testing.assert_array_equal(state_dict[key], value * 2)
+
+    def test_resume_requires_shards(self):
+        save_npz(self.source, self.source_path)
+        wt = CountingTrans(self.source_path, self.target, verbose=False)
+        with self.assertRaises(ValueError):
+            wt.source2target(self.save_dir, 'numpy', resume=True)
+
+    def test_unchanged_tensors_are_reused(self):
+        self.assertEqual(len(self.convert()), 8)
+        self.check_output()
+        self.assertEqual(self.convert(), [])
+        self.check_output()
+
+        self.source['layers.5.weight'] = self.source['layers.5.weight'] + 1
+        self.assertEqual(self.convert(), ['layers.5.weight'])
+        self.check_output()
+        # 被替换的张量所在的旧 shard 仍然被其他张量引用，不再被引用的 shard 已删除
+        index, _ = _load_sharded(self.save_dir)
+        shards = sorted(name for name in os.listdir(os.path.dirname(self.save_dir)) if name.startswith('model-'))
+        self.assertEqual(shards, sorted(set(index['weight_map'].values())))
+
+    def test_version_invalidates_records(self):
+        self.convert()
+        self.assertEqual(len(self.convert(version='2')), 8)
+        self.check_output()
+
+    def test_interrupted_journal(self):
+        self.convert()
+        journal_path = self.save_dir + '.npz.journal.jsonl'
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        # 中断时只写完了前两个 shard 的记录，最后一行写到一半
+        kept = [line for line in lines if '"model-00001.npz"' in line or '"model-00002.npz"' in line]
+        with open(journal_path, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+            f.write(lines[-1][:10])
+        converted = self.convert()
+        self.assertEqual(len(converted), 8 - len(kept))
+        self.check_output()
+
+
+class ConversionJournalTest(unittest.TestCase):
+    def test_lookup(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            save_dir = os.path.join(workdir, 'model')
+            digest = tensor_hash(np.arange(4))
+            journal = ConversionJournal(save_dir, '.npz', 'v1')
+            journal.record_shard('model-00001.npz', [('a', 'src.a', digest, 32)])
+            journal.close()
+            self.assertIsNone(journal.lookup('a', 'src.a', digest))
+            open(os.path.join(workdir, 'model-00001.npz'), 'wb').close()
+            reopened = ConversionJournal(save_dir, '.npz', 'v1')
+            self.assertEqual(reopened.lookup('a', 'src.a', digest)['nbytes'], 32)
+            self.assertIsNone(reopened.lookup('a', 'src.b', digest))
+            self.assertIsNone(reopened.lookup('a', 'src.a', tensor_hash(np.arange(5))))
+            self.assertIsNone(ConversionJournal(save_dir, '.npz', 'v2').lookup('a', 'src.a', digest))
+            self.assertEqual(reopened.next_shard_index(), 2)
+        # 哈希包含 dtype 和 shape
+        self.assertNotEqual(tensor_hash(np.zeros(4, np.float32)), tensor_hash(np.zeros(2, np.float64)))
+        self.assertNotEqual(tensor_hash(np.zeros((2, 2))), tensor_hash(np.zeros(4)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from gutils.ckpt_tr.key_index import KeyIndex
+
+
+class KeyIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.keys = ['backbone.layer1.conv.weight', 'backbone.layer1.bn.weight', 'backbone.layer2.conv.weight',
+                     'head.fc.weight', 'head.fc.bias', 'step']
+        sizes = dict((key, (10, 40)) for key in self.keys)
+        self.index = KeyIndex(self.keys, sizes=sizes)
+
+    def test_membership_and_order(self):
+        self.assertEqual(list(self.index), self.keys)
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual(self.index[3], 'head.fc.weight')
+        self.assertIn('head.fc.bias', self.index)
+        self.assertNotIn('head.fc', self.index)
+
+    def test_prefix_counts(self):
+        self.assertEqual(self.index.prefix_counts(1), {'backbone': 3, 'head': 2, 'step': 1})
+        self.assertEqual(self.index.prefix_counts(2),
+                         {'backbone.layer1': 2, 'backbone.layer2': 1, 'head.fc': 2, 'step': 1})
+
+    def test_prefix_stats(self):
+        stats = self.index.prefix_stats(1)
+        self.assertEqual(list(stats), ['backbone', 'head', 'step'])
+        self.assertEqual(stats['backbone'], (3, 30, 120))
+        self.assertEqual((self.index.numel, self.index.nbytes), (60, 240))
+
+    def test_keys_with_prefix(self):
+        self.assertEqual(list(self.index.keys_with_prefix('backbone.layer1')),
+                         ['backbone.layer1.conv.weight', 'backbone.layer1.bn.weight'])
+        # 前缀按 token 匹配，'back' 不是 'backbone' 的前缀
+        self.assertEqual(list(self.index.keys_with_prefix('back')), [])
+
+    def test_difference_and_group_missing(self):
+        other = KeyIndex(['backbone.layer1.conv.weight', 'head.fc.weight'])
+        self.assertEqual(self.index.difference(other),
+                         ['backbone.layer1.bn.weight', 'backbone.layer2.conv.weight', 'head.fc.bias', 'step'])
+        groups, missing = self.index.group_missing(other, ['backbone', 'head', 'neck'], show_number=1)
+        self.assertEqual(missing, 4)
+        self.assertEqual(groups, {'backbone': ['backbone.layer1.bn.weight'], 'head': ['head.fc.bias']})
+
+
+if __name__ == '__main__':
+    unittest.main()
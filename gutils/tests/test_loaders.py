@@ -0,0 +1,187 @@
+import io
+import os
+import sys
+import types
+import pickle
+import zipfile
+import tempfile
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+
+from gutils.ckpt_tr.formats import LazyStateDict, save_npz, save_safetensors
+from gutils.ckpt_tr.loaders import TensorMeta, detect_backend, load_meta, load_state_dict
+
+
+class _Remove(object):
+    """unpickle 时会删除 path 的对象。"""
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return os.remove, (self.path, )
+
+
+def _fake_torch_modules():
+    """不依赖 torch 构造 torch.save 的 pickle：重建函数和 storage 类型以 torch 的模块名序列化。"""
+    torch = types.ModuleType('torch')
+    utils = types.ModuleType('torch._utils')
+
+    def _rebuild_tensor_v2(*args):
+        pass
+
+    def _rebuild_parameter(*args):
+        pass
+
+    class FloatStorage(object):
+        pass
+
+    class HalfStorage(object):
+        pass
+
+    for module, obj in ((utils, _rebuild_tensor_v2), (utils, _rebuild_parameter),
+                        (torch, FloatStorage), (torch, HalfStorage)):
+        obj.__module__ = module.__name__
+        obj.__qualname__ = obj.__name__
+        setattr(module, obj.__name__, obj)
+    torch._utils = utils
+    return {'torch': torch, 'torch._utils': utils}
+
+
+class _Tensor(object):
+    def __init__(self, storage, shape, parameter=False):
+        self.storage, self.shape, self.parameter = storage, shape, parameter
+
+    def __reduce__(self):
+        utils = sys.modules['torch._utils']
+        stride = tuple(int(np.prod(self.shape[i + 1:])) for i in range(len(self.shape)))
+        if self.parameter:
+            return utils._rebuild_parameter, (_Tensor(self.storage, self.shape), False, OrderedDict())
+        return utils._rebuild_tensor_v2, (self.storage, 0, self.shape, stride, False, OrderedDict())
+
+
+class _StorageRef(object):
+    def __init__(self, storage_type, key, numel):
+        self.pid = ('storage', storage_type, key, 'cpu', numel)
+
+
+class _TorchPickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        return obj.pid if isinstance(obj, _StorageRef) else None
+
+
+class LazyLoadingTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.state = OrderedDict([('conv.weight', rng.standard_normal((8, 3, 3, 3)).astype(np.float32)),
+                                  ('conv.bias', rng.standard_normal(8).astype(np.float16)),
+                                  ('step', np.array(3, dtype=np.int64))])
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.workdir.name, name)
+
+    def test_lazy_state_dict_reads_on_access(self):
+        accessed = []
+
+        def getter(key):
+            accessed.append(key)
+            return self.state[key]
+        state_dict = LazyStateDict(self.state.keys(), getter)
+        self.assertEqual(list(state_dict), list(self.state))
+        self.assertIn('conv.bias', state_dict)
+        self.assertEqual(len(state_dict), 3)
+        self.assertEqual(accessed, [])
+        self.assertIs(state_dict['conv.bias'], self.state['conv.bias'])
+        self.assertEqual(accessed, ['conv.bias'])
+        with self.assertRaises(KeyError):
+            state_dict['missing']
+
+    def test_safetensors_values_are_memory_mapped(self):
+        path = self._path('model.safetensors')
+        save_safetensors(self.state, path)
+        self.assertEqual(detect_backend(path), 'safetensors')
+        state_dict = load_state_dict(path)
+        self.assertIsInstance(state_dict, LazyStateDict)
+        for key, value in self.state.items():
+            loaded = state_dict[key]
+            np.testing.assert_array_equal(loaded, value)
+            self.assertEqual(loaded.dtype, value.dtype)
+            self.assertFalse(loaded.flags.writeable)
+            base = loaded
+            while base.base is not None and not isinstance(base, np.memmap):
+                base = base.base
+            self.assertIsInstance(base, np.memmap, key)
+
+    def test_npz_and_meta(self):
+        path = self._path('model.npz')
+        save_npz(self.state, path)
+        state_dict = load_state_dict(path)
+        self.assertEqual(list(state_dict), list(self.state))
+        for key, value in self.state.items():
+            np.testing.assert_array_equal(state_dict[key], value)
+        meta = load_meta(path)
+        self.assertEqual([(m.shape, m.dtype) for m in meta.values()],
+                         [((8, 3, 3, 3), 'float32'), ((8, ), 'float16'), ((), 'int64')])
+        self.assertEqual(meta['conv.weight'].nbytes, 8 * 27 * 4)
+
+    def test_paddle_meta_without_paddle(self):
+        state = OrderedDict([('conv.weight', self.state['conv.weight']),
+                             ('conv.bias', ('conv2d_0.b_0', self.state['conv.bias'])),
+                             ('StructuredToParameterName@@', {'conv.weight': 'conv2d_0.w_0'}),
+                             ('epoch', 3)])
+        path = self._path('model.pdparams')
+        for protocol in (2, 4, 5):
+            with open(path, 'wb') as f:
+                pickle.dump(state, f, protocol=protocol)
+            meta = load_meta(path)
+            self.assertEqual(list(meta), ['conv.weight', 'conv.bias', 'epoch'], protocol)
+            self.assertEqual((meta['conv.weight'].shape, meta['conv.weight'].dtype), ((8, 3, 3, 3), 'float32'))
+            self.assertEqual((meta['conv.bias'].shape, meta['conv.bias'].dtype), ((8, ), 'float16'))
+            self.assertEqual(meta['epoch'], 3)
+
+    def test_meta_unpickler_does_not_run_code(self):
+        marker = self._path('marker')
+        open(marker, 'w').close()
+        path = self._path('evil.pdparams')
+        with open(path, 'wb') as f:
+            pickle.dump({'weight': np.zeros(2, dtype=np.float32), 'payload': _Remove(marker)}, f, protocol=2)
+        meta = load_meta(path)
+        self.assertTrue(os.path.exists(marker))
+        self.assertEqual(meta['weight'].shape, (2, ))
+        self.assertNotIsInstance(meta['payload'], (TensorMeta, int, str))
+
+    def test_torch_meta_without_torch(self):
+        modules = _fake_torch_modules()
+        torch = modules['torch']
+        state = OrderedDict([('fc.weight', _Tensor(_StorageRef(torch.FloatStorage, '0', 12), (3, 4), True)),
+                             ('fc.bias', _Tensor(_StorageRef(torch.HalfStorage, '1', 3), (3, )))])
+        saved = dict((name, sys.modules.get(name)) for name in modules)
+        sys.modules.update(modules)
+        try:
+            buffer = io.BytesIO()
+            _TorchPickler(buffer, protocol=2).dump(state)
+        finally:
+            for name, module in saved.items():
+                if module is None:
+                    sys.modules.pop(name)
+                else:
+                    sys.modules[name] = module
+        path = self._path('model.pth')
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('archive/data.pkl', buffer.getvalue())
+            archive.writestr('archive/data/0', b'\0' * 48)
+            archive.writestr('archive/data/1', b'\0' * 6)
+        self.assertNotIn('torch', sys.modules)
+        meta = load_meta(path)
+        self.assertNotIn('torch', sys.modules)
+        self.assertEqual([(key, m.shape, m.dtype) for key, m in meta.items()],
+                         [('fc.weight', (3, 4), 'float32'), ('fc.bias', (3, ), 'float16')])
+
+
+if __name__ == '__main__':
+    unittest.main()
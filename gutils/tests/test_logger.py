@@ -0,0 +1,84 @@
+import os
+import tempfile
+import threading
+import unittest
+import warnings
+
+from gutils.logger import get_logger, shutdown_logger
+
+
+def _lines(path):
+    with open(path, 'r') as f:
+        return [line.split('Msg: ')[1].rstrip() for line in f if 'Msg: ' in line]
+
+
+class LoggerTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, 'test.log')
+
+    def tearDown(self):
+        shutdown_logger()
+        self.workdir.cleanup()
+
+    def test_async_logger_writes_every_record_in_order(self):
+        logger = get_logger('gutils.test.async', async_mode=True, filename=self.path, flush_every=8)
+        self.assertEqual([type(h).__name__ for h in logger.handlers], ['QueueHandler'])
+
+        def work(worker):
+            for i in range(200):
+                logger.debug("worker %d message %d", worker, i)
+
+        threads = [threading.Thread(target=work, args=(worker, )) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        shutdown_logger('gutils.test.async')
+        self.assertEqual(logger.handlers, [])
+        lines = _lines(self.path)
+        self.assertEqual(len(lines), 800)
+        for worker in range(4):
+            own = [line for line in lines if line.startswith(f"worker {worker} ")]
+            self.assertEqual(own, [f"worker {worker} message {i}" for i in range(200)])
+
+    def test_args_are_merged_when_logged(self):
+        logger = get_logger('gutils.test.args', async_mode=True, filename=self.path)
+        values = [1, 2]
+        logger.debug("values %s", values)
+        values.append(3)
+        shutdown_logger('gutils.test.args')
+        self.assertEqual(_lines(self.path), ["values [1, 2]"])
+
+    def test_file_is_truncated_with_and_without_rotation(self):
+        for options in ({}, {'max_bytes': 1 << 20, 'backup_count': 1},
+                        {'async_mode': True}, {'async_mode': True, 'max_bytes': 1 << 20}):
+            for i in range(2):
+                logger = get_logger('gutils.test.mode', filename=self.path, **options)
+                logger.debug("run %d", i)
+                shutdown_logger('gutils.test.mode')
+            self.assertEqual(_lines(self.path), ["run 1"], options)
+
+    def test_rotation(self):
+        logger = get_logger('gutils.test.rotate', filename=self.path, max_bytes=2048, backup_count=2)
+        for i in range(100):
+            logger.debug("message %d", i)
+        shutdown_logger('gutils.test.rotate')
+        self.assertTrue(os.path.exists(self.path + '.1'))
+        self.assertLessEqual(os.path.getsize(self.path), 2048)
+        self.assertEqual(_lines(self.path)[-1], "message 99")
+
+    def test_cached_logger_warns_on_different_options(self):
+        logger = get_logger('gutils.test.cached', filename=self.path)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertIs(get_logger('gutils.test.cached', filename=self.path), logger)
+            self.assertEqual(caught, [])
+            self.assertIs(get_logger('gutils.test.cached', async_mode=True, filename=self.path), logger)
+        self.assertEqual(len(caught), 1)
+        self.assertIn('async_mode', str(caught[0].message))
+        self.assertEqual(len(logger.handlers), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import json
+import random
+import tempfile
+import unittest
+from collections import OrderedDict
+
+from gutils.ckpt_tr.loaders import TensorMeta
+from gutils.ckpt_tr.matcher import KeyMatcher, token_distance
+
+
+def _meta(layout):
+    return OrderedDict((key, TensorMeta(shape, 'float32')) for key, shape in layout)
+
+
+class TokenDistanceTest(unittest.TestCase):
+    def test_distance(self):
+        self.assertEqual(token_distance('a.b.c', 'a.b.c'), 0.)
+        self.assertAlmostEqual(token_distance('a.b.c', 'a.x.c'), 1. / 3)
+        # 公共前缀的 token 代价小于 1
+        self.assertLess(token_distance('enc.weight', 'encoder.weight'), token_distance('dec.weight', 'encoder.weight'))
+
+
+class KeyMatcherTest(unittest.TestCase):
+    def test_renamed_and_transposed_keys(self):
+        source = _meta([('encoder.layers.0.fc.weight', (8, 16)), ('encoder.layers.0.fc.bias', (16, )),
+                        ('encoder.layers.0.norm.weight', (16, )), ('head.weight', (16, 4))])
+        target = _meta([('backbone.blocks.0.fc.weight', (16, 8)), ('backbone.blocks.0.fc.bias', (16, )),
+                        ('backbone.blocks.0.norm.weight', (16, )), ('head.weight', (16, 4))])
+        matches = dict((m.source, m) for m in KeyMatcher(source, target).match())
+        self.assertEqual(matches['head.weight'].confidence, 1.)
+        self.assertEqual(matches['encoder.layers.0.fc.weight'].target, 'backbone.blocks.0.fc.weight')
+        self.assertTrue(matches['encoder.layers.0.fc.weight'].transposed)
+        self.assertEqual(matches['encoder.layers.0.fc.bias'].target, 'backbone.blocks.0.fc.bias')
+        self.assertEqual(matches['encoder.layers.0.norm.weight'].target, 'backbone.blocks.0.norm.weight')
+
+    def test_rule_table(self):
+        source = _meta([('old.weight', (3, 4)), ('same.bias', (4, ))])
+        target = _meta([('new.weight', (3, 4)), ('same.bias', (4, ))])
+        matches = KeyMatcher(source, target).match()
+        table = KeyMatcher.to_rule_table(matches)
+        self.assertEqual(table['overrides'], {'old.weight': 'new.weight'})
+        self.assertEqual(table['transposed'], [])
+        self.assertEqual(KeyMatcher.to_mapping(matches, min_confidence=1.), {'same.bias': 'same.bias'})
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'rules.json')
+            KeyMatcher.save(matches, path)
+            with open(path, 'r', encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['overrides'], table['overrides'])
+
+    def test_order_only_pairing_is_not_fully_confident(self):
+        # 同一 shape 的大组按顺序配对，目标顺序被打乱时配错的结果不能得到满分
+        num = 60
+        source = _meta([(f"src.layers.{i}.weight", (4, 4)) for i in range(num)])
+        order = list(range(num))
+        random.Random(0).shuffle(order)
+        target = _meta([(f"dst.layers.{i}.weight", (4, 4)) for i in order])
+        matches = KeyMatcher(source, target, max_group_size=10).match()
+        wrong = [m for m in matches if m.source.split('.')[2] != m.target.split('.')[2]]
+        self.assertTrue(wrong)
+        for m in wrong:
+            self.assertLess(m.confidence, 1.)
+        self.assertLess(sum(m.confidence >= 0.5 for m in wrong), len(wrong) / 2)
+
+    def test_order_only_pairing_keeps_confidence_for_aligned_keys(self):
+        num = 60
+        source = _meta([(f"src.layers.{i}.weight", (4, 4)) for i in range(num)])
+        target = _meta([(f"dst.layers.{i}.weight", (4, 4)) for i in range(num)])
+        matches = KeyMatcher(source, target, max_group_size=10).match()
+        self.assertTrue(all(m.source.split('.')[2] == m.target.split('.')[2] for m in matches))
+        self.assertTrue(all(m.confidence >= 0.5 for m in matches))
+
+
+if __name__ == '__main__':
+    unittest.main()
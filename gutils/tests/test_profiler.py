@@ -0,0 +1,135 @@
+import io
+import os
+import csv
+import json
+import tempfile
+import threading
+import unittest
+import tracemalloc
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from gutils.utils import Profiler, Timer, get_profiler, print_run_time
+
+
+class ProfilerTest(unittest.TestCase):
+    def test_stats_and_percentiles(self):
+        profiler = Profiler(max_samples=1000)
+        for ms in range(1, 101):
+            profiler.record('step', ms * 1000000)
+        profiler.record('other.io', 5000000, peak_mem=2048)
+        stats = profiler.stats()
+        step = stats['step']
+        self.assertEqual(step['count'], 100)
+        self.assertAlmostEqual(step['total_ms'], 5050.)
+        self.assertAlmostEqual(step['mean_ms'], 50.5)
+        self.assertEqual((step['p50_ms'], step['p95_ms'], step['p99_ms'], step['max_ms']), (50., 95., 99., 100.))
+        self.assertIsNone(step['peak_mem_kb'])
+        self.assertEqual(stats['other.io']['peak_mem_kb'], 2.)
+        self.assertEqual(list(profiler.stats('other')), ['other.io'])
+        self.assertEqual(profiler.report().splitlines()[1].split()[0], 'step')
+        profiler.reset('other')
+        self.assertEqual(list(profiler.stats()), ['step'])
+
+    def test_samples_are_bounded(self):
+        profiler = Profiler(max_samples=10)
+        for ms in range(1, 101):
+            profiler.record('step', ms * 1000000)
+        step = profiler.stats()['step']
+        # 次数、总耗时和最大值是精确的，百分位只按最近 10 次计算
+        self.assertEqual((step['count'], step['max_ms']), (100, 100.))
+        self.assertEqual(step['p50_ms'], 95.)
+
+    def test_export(self):
+        profiler = Profiler()
+        profiler.record('step', 1500000)
+        with tempfile.TemporaryDirectory() as workdir:
+            profiler.export(os.path.join(workdir, 'profile.json'))
+            with open(os.path.join(workdir, 'profile.json'), 'r', encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['step']['total_ms'], 1.5)
+            profiler.export(os.path.join(workdir, 'profile.csv'))
+            with open(os.path.join(workdir, 'profile.csv'), 'r', newline='', encoding='utf-8') as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(rows[0][:3], ['name', 'count', 'total_ms'])
+            self.assertEqual(rows[1][:2], ['step', '1'])
+            with self.assertRaises(ValueError):
+                profiler.export(os.path.join(workdir, 'profile.txt'))
+
+
+class TimerTest(unittest.TestCase):
+    def test_context_manager_and_decorator(self):
+        profiler = Profiler()
+        with Timer('block', profiler) as timer:
+            sum(range(1000))
+        self.assertGreater(timer.elapsed_ns, 0)
+
+        @Timer(profiler=profiler)
+        def work(n):
+            return n * 2
+
+        threads = [threading.Thread(target=lambda: [work(i) for i in range(50)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = profiler.stats()
+        self.assertEqual(stats['block']['count'], 1)
+        self.assertEqual(stats[work.__qualname__]['count'], 200)
+        self.assertEqual(work(3), 6)
+        with self.assertRaises(ValueError):
+            with Timer(profiler=profiler):
+                pass
+
+    def test_sampling_disabled_and_errors(self):
+        profiler = Profiler()
+
+        @Timer('sampled', profiler, sample_rate=0.25)
+        def step():
+            pass
+        for _ in range(20):
+            step()
+        self.assertEqual(profiler.stats()['sampled']['count'], 5)
+
+        @Timer('failing', profiler)
+        def fail():
+            raise RuntimeError('boom')
+        with self.assertRaises(RuntimeError):
+            fail()
+        self.assertEqual(profiler.stats()['failing']['count'], 1)
+
+        profiler.enabled = False
+        with Timer('disabled', profiler):
+            pass
+        self.assertNotIn('disabled', profiler.stats())
+        with self.assertRaises(ValueError):
+            Timer('bad', profiler, sample_rate=0)
+
+    def test_track_memory(self):
+        profiler = Profiler()
+        tracing = tracemalloc.is_tracing()
+        try:
+            with Timer('alloc', profiler, track_memory=True):
+                data = bytearray(1 << 20)
+            del data
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        self.assertGreaterEqual(profiler.stats()['alloc']['peak_mem_kb'], 1024)
+
+    def test_print_run_time_records_to_shared_profiler(self):
+        @print_run_time
+        def convert(array, scale=1):
+            return array * scale
+
+        get_profiler().reset(convert.__qualname__)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            convert(np.zeros((1000, 1000), dtype=np.float32), scale=2)
+        self.assertIn('ndarray(shape=(1000, 1000), dtype=float32)', output.getvalue())
+        self.assertLess(len(output.getvalue()), 300)
+        self.assertEqual(get_profiler().stats(convert.__qualname__)[convert.__qualname__]['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+
+from gutils.ckpt_tr import WeightTrans
+from gutils.ckpt_tr.formats import load_npz, save_npz
+from gutils.ckpt_tr.loaders import TensorMeta
+from gutils.ckpt_tr.rules import RuleTable, key_fingerprint
+
+
+class RuleTableTest(unittest.TestCase):
+    def test_overrides_prefix_and_regex(self):
+        table = RuleTable(rules=[{'type': 'prefix', 'pattern': 'model.encoder', 'replace': 'backbone'},
+                                 {'type': 'prefix', 'pattern': 'model.encoder.stem', 'replace': 'stem'},
+                                 {'type': 'prefix', 'pattern': 'module', 'replace': ''},
+                                 {'type': 'regex', 'pattern': r'layer(\d+)', 'replace': r'layers.\1'}],
+                          overrides={'model.head.fc.weight': 'head.weight'})
+        self.assertEqual(table.apply('model.head.fc.weight'), 'head.weight')
+        self.assertEqual(table.apply('model.encoder.layer3.conv.weight'), 'backbone.layers.3.conv.weight')
+        # 最长匹配的 prefix 规则生效
+        self.assertEqual(table.apply('model.encoder.stem.conv.weight'), 'stem.conv.weight')
+        self.assertEqual(table.apply('module.fc.bias'), 'fc.bias')
+        # prefix 按 token 对齐，'model.encoders' 不会被 'model.encoder' 命中
+        self.assertEqual(table.apply('model.encoders.x'), 'model.encoders.x')
+
+    def test_unknown_rule_type(self):
+        with self.assertRaises(ValueError):
+            RuleTable(rules=[{'type': 'glob', 'pattern': '*', 'replace': ''}])
+
+    def test_regex_rules_with_group_references(self):
+        # 合并为一个正则时后面规则的分组编号会偏移，反向引用必须仍然按单条规则的语义生效
+        rules = [{'type': 'regex', 'pattern': r'^(blk)\.(\d+)', 'replace': r'blocks.\2'},
+                 {'type': 'regex', 'pattern': r'(\w+)\.\1$', 'replace': r'\1'},
+                 {'type': 'regex', 'pattern': r'(?P<name>norm)_(?P=name)', 'replace': r'\g<name>'}]
+        table = RuleTable(rules=rules)
+        self.assertEqual(table.apply('blk.3.weight.weight'), 'blocks.3.weight')
+        self.assertEqual(table.apply('blk.1.norm_norm.bias'), 'blocks.1.norm.bias')
+        self.assertEqual(table.apply('head.fc.bias'), 'head.fc.bias')
+        # 只有含反向引用的规则能命中的关键字
+        self.assertEqual(table.apply('head.weight.weight'), 'head.weight')
+        self.assertEqual(table.apply('ln.norm_norm'), 'ln.norm')
+        # 与逐条 re.sub 的结果一致
+        plain = RuleTable(rules=rules[:1])
+        self.assertEqual(plain.apply('blk.3.weight.weight'), 'blocks.3.weight.weight')
+
+    def test_resolve_and_cache(self):
+        table = RuleTable(rules=[{'type': 'regex', 'pattern': r'^enc\.', 'replace': 'encoder.'}])
+        keys = ['enc.a', 'enc.b', 'head.c']
+        with tempfile.TemporaryDirectory() as cache_dir:
+            mapping = table.resolve(keys, cache_dir=cache_dir)
+            self.assertEqual(mapping, {'enc.a': 'encoder.a', 'enc.b': 'encoder.b'})
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            # 第二次直接读取缓存
+            table._regex_rules = []
+            self.assertEqual(table.resolve(keys, cache_dir=cache_dir), mapping)
+
+    def test_save_load_and_fingerprint(self):
+        table = RuleTable(rules=[{'type': 'prefix', 'pattern': 'a', 'replace': 'b'}], overrides={'x': 'y'})
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'rules.json')
+            table.save(path)
+            loaded = RuleTable.create(path)
+        self.assertEqual(loaded.fingerprint, table.fingerprint)
+        self.assertEqual(loaded.apply('a.w'), 'b.w')
+        self.assertIs(RuleTable.create(table), table)
+        self.assertEqual(key_fingerprint(['a', 'b']), key_fingerprint(['b', 'a']))
+
+
+class WeightTransRulesTest(unittest.TestCase):
+    def test_overrides_take_precedence_over_same_name_keys(self):
+        rng = np.random.default_rng(0)
+        source = OrderedDict((key, rng.standard_normal(3).astype(np.float32))
+                             for key in ('q.weight', 'k.weight', 'head.bias'))
+        target = OrderedDict((key, TensorMeta((3, ), 'float32')) for key in source)
+        with tempfile.TemporaryDirectory() as workdir:
+            source_path = os.path.join(workdir, 'source.npz')
+            save_npz(source, source_path)
+            wt = WeightTrans(source_path, target, verbose=False)
+            # 两个key在目标中都存在同名项，override 仍然要生效
+            mapping = wt.set_rules({'overrides': {'q.weight': 'k.weight', 'k.weight': 'q.weight'}})
+            self.assertEqual(mapping, {'q.weight': 'k.weight', 'k.weight': 'q.weight'})
+            save_dir = os.path.join(workdir, 'out')
+            wt.source2target(save_dir, 'numpy')
+            state_dict = load_npz(save_dir + '.npz')
+            np.testing.assert_array_equal(state_dict['k.weight'], source['q.weight'])
+            np.testing.assert_array_equal(state_dict['q.weight'], source['k.weight'])
+            np.testing.assert_array_equal(state_dict['head.bias'], source['head.bias'])
+
+
+if __name__ == '__main__':
+    unittest.main()
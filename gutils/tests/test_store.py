@@ -0,0 +1,190 @@
+import io
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+
+from gutils.backup import ChunkStore, PackIgnore
+
+
+def _random_bytes(size, seed):
+    import numpy as np
+    return np.random.default_rng(seed).integers(0, 256, size, dtype=np.uint8).tobytes()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class ChunkStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.workdir.name, 'store')
+        self.source = os.path.join(self.workdir.name, 'project')
+        self.store = ChunkStore(self.root, avg_chunk=4096, workers=2)
+        self.data = _random_bytes(200000, 0)
+        _write(os.path.join(self.source, 'model.bin'), self.data)
+        _write(os.path.join(self.source, 'src', 'main.py'), b'print(1)\n')
+        _write(os.path.join(self.source, 'logs', 'train.log'), b'ignored')
+        os.makedirs(os.path.join(self.source, 'empty'))
+        os.symlink('/etc/hostname', os.path.join(self.source, 'link'))
+        self.ignore = PackIgnore(['logs/'])
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_chunking_is_content_defined(self):
+        chunks = list(self.store.iter_chunks(io.BytesIO(self.data), block_size=10000))
+        self.assertEqual(b''.join(chunks), self.data)
+        config = self.store.config
+        self.assertTrue(all(config['min_chunk'] <= len(chunk) <= config['max_chunk'] for chunk in chunks[:-1]))
+        # 在开头插入数据只影响前面的块，之后的切点重新对齐
+        shifted = list(self.store.iter_chunks(io.BytesIO(b'inserted' + self.data)))
+        self.assertGreater(len(set(chunks) & set(shifted)), len(chunks) - 3)
+
+    def test_put_and_get_chunk(self):
+        digest, written = self.store.put_chunk(b'hello' * 100)
+        self.assertGreater(written, 0)
+        self.assertEqual(self.store.put_chunk(b'hello' * 100), (digest, 0))
+        self.assertEqual(self.store.get_chunk(digest), b'hello' * 100)
+        self.assertEqual(ChunkStore(self.root).config, self.store.config)
+
+    def test_snapshot_restore_round_trip(self):
+        first = self.store.snapshot(self.source, ignore=self.ignore)
+        self.assertEqual((first['files'], first['bytes']), (2, len(self.data) + 9))
+        root = self.store.restore(first['id'], os.path.join(self.workdir.name, 'restored'))
+        self.assertEqual(_read(os.path.join(root, 'model.bin')), self.data)
+        self.assertEqual(_read(os.path.join(root, 'src', 'main.py')), b'print(1)\n')
+        self.assertEqual(os.readlink(os.path.join(root, 'link')), '/etc/hostname')
+        self.assertTrue(os.path.isdir(os.path.join(root, 'empty')))
+        self.assertFalse(os.path.exists(os.path.join(root, 'logs')))
+
+        # 未变化的文件沿用块列表，修改中间的一小段只写入附近的块
+        unchanged = self.store.snapshot(self.source, ignore=self.ignore)
+        self.assertEqual((unchanged['reused_files'], unchanged['written_bytes']), (2, 0))
+        data = bytearray(self.data)
+        data[100000: 100010] = b'0123456789'
+        _write(os.path.join(self.source, 'model.bin'), bytes(data))
+        changed = self.store.snapshot(self.source, ignore=self.ignore)
+        self.assertLess(changed['written_bytes'], len(self.data) / 4)
+        self.assertEqual(self.store.snapshots('project'), [first['id'], unchanged['id'], changed['id']])
+        root = self.store.restore(changed['id'], os.path.join(self.workdir.name, 'restored2'))
+        self.assertEqual(_read(os.path.join(root, 'model.bin')), bytes(data))
+
+    def test_restore_twice_over_read_only_files(self):
+        os.chmod(os.path.join(self.source, 'src', 'main.py'), 0o444)
+        os.chmod(os.path.join(self.source, 'src'), 0o555)
+        try:
+            snapshot_id = self.store.snapshot(self.source, ignore=self.ignore)['id']
+            target = os.path.join(self.workdir.name, 'restored')
+            for _ in range(2):
+                root = self.store.restore(snapshot_id, target)
+                path = os.path.join(root, 'src', 'main.py')
+                self.assertEqual(_read(path), b'print(1)\n')
+                self.assertEqual(os.stat(path).st_mode & 0o777, 0o444)
+                self.assertEqual(os.stat(os.path.dirname(path)).st_mode & 0o777, 0o555)
+        finally:
+            for directory in (self.source, os.path.join(self.workdir.name, 'restored', 'project')):
+                if os.path.isdir(os.path.join(directory, 'src')):
+                    os.chmod(os.path.join(directory, 'src'), 0o755)
+
+    def test_restore_rejects_paths_outside_of_target(self):
+        snapshot_id = self.store.snapshot(self.source, ignore=self.ignore)['id']
+        path = self.store._snapshot_path(snapshot_id)
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        target = os.path.join(self.workdir.name, 'restored')
+        escaped = os.path.join(self.workdir.name, 'escaped.py')
+        cases = [('files', '../../escaped.py', manifest['files']['src/main.py']),
+                 ('files', escaped, manifest['files']['src/main.py']),
+                 ('dirs', '../outside', 0o755)]
+        for section, rel_path, value in cases:
+            crafted = json.loads(json.dumps(manifest))
+            crafted[section][rel_path] = value
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(crafted, f)
+            with self.assertRaises(ValueError):
+                self.store.restore(snapshot_id, target)
+        self.assertFalse(os.path.exists(escaped))
+        self.assertFalse(os.path.exists(os.path.join(self.workdir.name, 'outside')))
+
+        # 链接按原样恢复，之后的文件不能经过链接写到目录之外
+        for links, files in (({'out': self.workdir.name}, {}),
+                             ({}, {'out/escaped.py': manifest['files']['src/main.py']})):
+            crafted = json.loads(json.dumps(manifest))
+            crafted['links'], crafted['files'] = links, files
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(crafted, f)
+            if files:
+                with self.assertRaises(ValueError):
+                    self.store.restore(snapshot_id, target)
+            else:
+                self.store.restore(snapshot_id, target)
+        self.assertFalse(os.path.exists(escaped))
+
+    def test_snapshot_of_selected_files(self):
+        summary = self.store.snapshot(self.source, name='ckpt', files=['model.bin'])
+        manifest = self.store.load_snapshot(summary['id'])
+        self.assertEqual(list(manifest['files']), ['model.bin'])
+        self.assertEqual(manifest['name'], 'ckpt')
+
+    def test_prune_gc_and_verify(self):
+        first = self.store.snapshot(self.source, ignore=self.ignore)
+        _write(os.path.join(self.source, 'model.bin'), _random_bytes(50000, 1))
+        second = self.store.snapshot(self.source, ignore=self.ignore)
+        self.assertEqual(self.store.verify(), {'missing': [], 'corrupted': []})
+        before = self.store.stats()
+        self.assertEqual(before['snapshots'], 2)
+
+        self.assertEqual(self.store.prune('project', keep=1), [first['id']])
+        result = self.store.gc()
+        self.assertGreater(result['removed_chunks'], 0)
+        self.assertEqual(self.store.stats()['chunks'], before['chunks'] - result['removed_chunks'])
+        self.assertEqual(self.store.verify(second['id']), {'missing': [], 'corrupted': []})
+        root = self.store.restore(second['id'], os.path.join(self.workdir.name, 'restored'))
+        self.assertEqual(_read(os.path.join(root, 'model.bin')), _read(os.path.join(self.source, 'model.bin')))
+
+        # 删除和损坏数据块后 verify 能够发现
+        digests = self.store.load_snapshot(second['id'])['files']['model.bin']['chunks']
+        os.remove(self.store._chunk_path(digests[0]))
+        with open(self.store._chunk_path(digests[1]), 'wb') as f:
+            f.write(b'Rbroken')
+        result = self.store.verify()
+        self.assertEqual(result, {'missing': [digests[0]], 'corrupted': [digests[1]]})
+
+    def test_gc_keeps_temporary_and_new_chunks(self):
+        self.store.snapshot(self.source, ignore=self.ignore)
+        directory = os.path.join(self.store.chunk_dir, 'ff')
+        os.makedirs(directory, exist_ok=True)
+        old, tmp, new = (os.path.join(directory, name) for name in ('ff00', 'ff01.1.2.tmp', 'ff02'))
+        for path in (old, tmp, new):
+            _write(path, b'Rdata')
+        os.utime(old, (0, 0))
+        os.utime(tmp, (0, 0))
+        # 写入时间晚于 gc 开始时间的块可能属于进行中的快照
+        os.utime(new, (time.time() + 60, time.time() + 60))
+        self.assertEqual(self.store.gc()['removed_chunks'], 1)
+        self.assertEqual(sorted(os.listdir(directory)), ['ff01.1.2.tmp', 'ff02'])
+
+    @unittest.skipIf(os.name != 'posix', 'file locks need fcntl')
+    def test_gc_waits_for_running_snapshot(self):
+        done = threading.Event()
+        with self.store._lock():
+            thread = threading.Thread(target=lambda: (self.store.gc(), done.set()))
+            thread.start()
+            self.assertFalse(done.wait(0.3))
+        self.assertTrue(done.wait(10))
+        thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from gutils.algorithms.template_match import (MATCH_METHODS, PARITY_METHODS, check_parity, match_template,
+                                              pyramid_levels)
+from gutils.algorithms.tracking import MultiTemplateTracker
+
+
+def _scene(seed=0, size=(240, 320), box=(150, 90, 64, 48)):
+    rng = np.random.default_rng(seed)
+    image = cv2.GaussianBlur(rng.integers(0, 256, size, dtype=np.uint8), (0, 0), 2)
+    x, y, w, h = box
+    return image, image[y: y + h, x: x + w].copy(), (x, y)
+
+
+class TemplateMatchTest(unittest.TestCase):
+    def test_methods(self):
+        self.assertEqual(MATCH_METHODS, ('direct', 'pyramid', 'fft'))
+        self.assertEqual(PARITY_METHODS, MATCH_METHODS)
+        with self.assertRaises(ValueError):
+            match_template(*_scene()[:2], method='sparse')
+
+    def test_pyramid_levels(self):
+        self.assertEqual(pyramid_levels((16, 16)), 0)
+        self.assertEqual(pyramid_levels((48, 64)), 1)
+        self.assertEqual(pyramid_levels((256, 256)), 4)
+        self.assertEqual(pyramid_levels((256, 256), max_levels=2), 2)
+
+    def test_every_method_finds_the_template(self):
+        image, template, loc = _scene()
+        for method in PARITY_METHODS:
+            score, found = match_template(image, template, method)
+            self.assertEqual(found, loc, method)
+            self.assertAlmostEqual(score, 1., places=3, msg=method)
+
+    def test_check_parity(self):
+        for seed in range(3):
+            image, template, loc = _scene(seed, box=(40 + 60 * seed, 30 + 40 * seed, 72, 56))
+            report = check_parity(image, template, methods=('pyramid', 'fft'), repeat=1)
+            self.assertEqual(list(report), ['direct', 'pyramid', 'fft'])
+            self.assertEqual((report['direct']['x'], report['direct']['y']), loc)
+            for method, item in report.items():
+                self.assertEqual(item['loc_error'], 0, method)
+                self.assertLess(item['score_error'], 1e-3, method)
+                self.assertGreaterEqual(item['ms'], 0.)
+
+    def test_large_template_parity_and_timing(self):
+        for box in ((60, 40, 256, 192), (20, 30, 400, 300)):
+            image, template, loc = _scene(box[0], size=(480, 640), box=box)
+            report = check_parity(image, template, methods=('pyramid', 'fft'), repeat=2)
+            self.assertEqual((report['direct']['x'], report['direct']['y']), loc)
+            for method, item in report.items():
+                self.assertEqual(item['loc_error'], 0, method)
+                self.assertLess(item['score_error'], 1e-3, method)
+                self.assertGreater(item['ms'], 0., method)
+
+    def test_tracker_with_fft(self):
+        image, template, (x, y) = _scene(box=(120, 80, 96, 72))
+        frame = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        tracker = MultiTemplateTracker(match_method='fft')
+        tracker.init(frame, [(x, y, x + 96, y + 72)])
+        shifted = np.roll(frame, (5, -7), axis=(0, 1))
+        boxes, scores = tracker.update(shifted)
+        np.testing.assert_array_equal(boxes[0], (x - 7, y + 5, x + 89, y + 77))
+        self.assertGreater(scores[0], 0.99)
+        with self.assertRaises(ValueError):
+            MultiTemplateTracker(match_method='sparse')
+
+if __name__ == '__main__':
+    unittest.main()
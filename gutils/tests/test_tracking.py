@@ -0,0 +1,208 @@
+import os
+import csv
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from gutils.algorithms.tracking import (RESULT_COLUMNS, UPDATE_REASONS, MultiTemplateTracker, TemplateTracker,
+                                       template_similarity, track_video, track_videos)
+from gutils.benchmarks.synthetic import make_video
+
+
+def _texture(shape, seed):
+    rng = np.random.default_rng(seed)
+    return cv2.GaussianBlur(rng.integers(0, 256, shape, dtype=np.uint8), (0, 0), 1.5)
+
+
+class _Scene(object):
+    """纹理背景上粘贴若干纹理图像块，逐帧生成 BGR 帧。"""
+    def __init__(self, size=(240, 320), patches=((32, 40), ), seed=0):
+        self.background = _texture(size + (3, ), seed)
+        self.patches = [_texture((h, w, 3), seed + 1 + i) for i, (h, w) in enumerate(patches)]
+
+    def frame(self, positions):
+        frame = self.background.copy()
+        for patch, (x, y) in zip(self.patches, positions):
+            h, w = patch.shape[:2]
+            frame[y: y + h, x: x + w] = patch
+        return frame
+
+    def boxes(self, positions):
+        return [(x, y, x + patch.shape[1], y + patch.shape[0]) for patch, (x, y) in zip(self.patches, positions)]
+
+
+class SearchWindowTest(unittest.TestCase):
+    def test_window_follows_the_predicted_position(self):
+        scene = _Scene()
+        tracker = TemplateTracker(search_radius=20)
+        tracker.init(scene.frame([(100, 80)]), scene.boxes([(100, 80)])[0])
+        self.assertIsNone(tracker._search_window(0))
+        tracker.update(scene.frame([(100, 80)]))
+        tracker.update(scene.frame([(106, 83)]))
+        self.assertEqual(tracker.velocity, (6, 3))
+        # 预测位置 (112, 86)，窗口为目标框向四周扩展 search_radius
+        self.assertEqual(tracker._search_window(0), (92, 66, 92 + 40 + 40, 66 + 32 + 40))
+        # 靠近画面边缘时窗口平移到画面内，大小不变
+        tracker.boxes[0] = (2, 1, 42, 33)
+        tracker.velocities[0] = (-5, -5)
+        self.assertEqual(tracker._search_window(0), (0, 0, 80, 72))
+        tracker.search_radius = 0
+        self.assertIsNone(tracker._search_window(0))
+
+    def test_constant_motion_stays_in_the_window(self):
+        scene = _Scene()
+        tracker = TemplateTracker(search_radius=16)
+        tracker.init(scene.frame([(60, 50)]), scene.boxes([(60, 50)])[0])
+        for step in range(12):
+            position = (60 + 5 * step, 50 + 3 * step)
+            top_left, bottom_right, score = tracker.update(scene.frame([position]))
+            self.assertEqual(top_left, position)
+            self.assertEqual(bottom_right, (position[0] + 40, position[1] + 32))
+            self.assertGreater(score, 0.99)
+        self.assertEqual(tracker.full_searches, 0)
+
+    def test_falls_back_to_full_search(self):
+        scene = _Scene()
+        # 纹理上 TM_CCORR_NORMED 的得分普遍较高，提高阈值使窗口内的错误匹配触发全图搜索
+        tracker = TemplateTracker(search_radius=12, research_threshold=0.999)
+        tracker.init(scene.frame([(60, 50)]), scene.boxes([(60, 50)])[0])
+        for step in range(3):
+            tracker.update(scene.frame([(60 + 8 * step, 50)]))
+        # 跳出搜索窗口，但位移小于 10 倍 max_distance，不会被当作误匹配回退
+        top_left, _, score = tracker.update(scene.frame([(76 + 60, 50 + 20)]))
+        self.assertEqual(top_left, (136, 70))
+        self.assertGreater(score, 0.99)
+        self.assertEqual(tracker.full_searches, 1)
+
+    def test_buffers_are_reused(self):
+        scene = _Scene()
+        tracker = MultiTemplateTracker(search_radius=16)
+        tracker.init(scene.frame([(60, 50)]), scene.boxes([(60, 50)]))
+        gray_frame = tracker._gray_frame
+        for step in range(4):
+            boxes, scores = tracker.update(scene.frame([(60 + 2 * step, 50)]))
+            self.assertIs(tracker._gray_frame, gray_frame)
+        # 第一帧全图搜索，之后搜索窗口的大小固定，direct 匹配的得分缓冲区每种大小只分配一次
+        self.assertEqual(list(tracker._results), [(240 - 32 + 1, 320 - 40 + 1), (33, 33)])
+        # 返回的结果是拷贝，修改不会影响跟踪状态
+        boxes[:] = 0
+        scores[:] = 0
+        np.testing.assert_array_equal(tracker.boxes, [(66, 50, 106, 82)])
+        self.assertGreater(tracker.scores[0], 0.99)
+
+class MultiTargetTest(unittest.TestCase):
+    def _positions(self, step):
+        return [(20 + 4 * step, 30 + 2 * step), (200 - 3 * step, 40 + 3 * step), (120, 180 - 2 * step)]
+
+    def test_targets_are_tracked_independently(self):
+        scene = _Scene(patches=((32, 40), (24, 24), (40, 56)))
+        first = scene.frame(self._positions(0))
+        tracker = MultiTemplateTracker(search_radius=16)
+        tracker.init(first, scene.boxes(self._positions(0)))
+        singles = [TemplateTracker(search_radius=16) for _ in range(3)]
+        for single, box in zip(singles, scene.boxes(self._positions(0))):
+            single.init(first, box)
+        self.assertEqual(len(tracker), 3)
+        for step in range(10):
+            frame = scene.frame(self._positions(step))
+            boxes, scores = tracker.update(frame)
+            self.assertEqual((boxes.shape, scores.shape), ((3, 4), (3, )))
+            np.testing.assert_array_equal(boxes, scene.boxes(self._positions(step)))
+            for i, single in enumerate(singles):
+                top_left, bottom_right, score = single.update(frame)
+                self.assertEqual(top_left + bottom_right, tuple(boxes[i]))
+                self.assertAlmostEqual(score, float(scores[i]), places=5)
+        np.testing.assert_array_equal(tracker.velocities, [(4, 2), (-3, 3), (0, -2)])
+        self.assertEqual(len(tracker.update_stats()['per_target']), 3)
+
+    def test_track_video_with_several_boxes(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            video = os.path.join(workdir, 'video.avi')
+            truth = make_video(video, num_frames=12, size=(320, 240), patch_size=40, seed=1)
+            boxes = [truth['box'], (200, 150, 260, 200)]
+            result = track_video(video, boxes, output=os.path.join(workdir, 'video.csv'))
+            self.assertEqual(result.shape, (24, len(RESULT_COLUMNS)))
+            np.testing.assert_array_equal(result[:, 0], np.repeat(np.arange(12), 2))
+            np.testing.assert_array_equal(result[:, 1], np.tile([0, 1], 12))
+            self.assertLessEqual(np.abs(result[0::2, 2:6] - truth['boxes']).max(), 1)
+            with open(os.path.join(workdir, 'video.csv'), 'r', newline='') as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(tuple(rows[0]), RESULT_COLUMNS)
+            np.testing.assert_allclose(np.array(rows[1:], dtype=np.float64), result, rtol=1e-6)
+
+            single = os.path.join(workdir, 'single.npy')
+            summaries = track_videos([{'video': video, 'boxes': boxes},
+                                      {'video': video, 'boxes': truth['box'], 'output': single}],
+                                     output_dir=os.path.join(workdir, 'tracks'), output_format='npy', processes=2)
+            self.assertEqual([summary['frames'] for summary in summaries], [12, 12])
+            self.assertEqual(summaries[0]['output'], os.path.join(workdir, 'tracks', 'video.npy'))
+            np.testing.assert_array_equal(np.load(summaries[0]['output']), result)
+            np.testing.assert_array_equal(np.load(single), result[0::2])
+
+class TemplateUpdateTest(unittest.TestCase):
+    def test_template_similarity(self):
+        template = _texture((48, 64), 0)
+        self.assertAlmostEqual(template_similarity(template, template), 1., places=4)
+        self.assertAlmostEqual(template_similarity(template, 255 - template), -1., places=3)
+        # 亮度和对比度变化不影响相似度，与模板大小无关
+        brighter = cv2.convertScaleAbs(template, alpha=0.5, beta=60)
+        self.assertGreater(template_similarity(template, brighter), 0.99)
+        large = cv2.resize(template, (256, 192))
+        self.assertGreater(template_similarity(template, large), 0.95)
+        self.assertLess(abs(template_similarity(template, _texture((48, 64), 1))), 0.5)
+
+    def _brighter_scene(self, update_rate, gate_threshold=0.7):
+        scene = _Scene()
+        tracker = TemplateTracker(update_rate=update_rate, gate_threshold=gate_threshold, replace_threshold=0.9)
+        tracker.init(scene.frame([(100, 80)]), scene.boxes([(100, 80)])[0])
+        original = tracker.gray_template.copy()
+        # 第一次移动只记录 max_distance，之后的帧才会更新模板
+        tracker.update(scene.frame([(100, 80)]))
+        tracker.update(scene.frame([(102, 81)]))
+        scene.patches[0] = cv2.convertScaleAbs(scene.patches[0], alpha=0.8, beta=30)
+        frame = scene.frame([(104, 82)])
+        tracker.update(frame)
+        patch = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)[82: 82 + 32, 104: 104 + 40]
+        return tracker, original, patch, frame[82: 82 + 32, 104: 104 + 40]
+
+    def test_ema_update(self):
+        tracker, original, patch, color_patch = self._brighter_scene(0.3)
+        expected = 0.7 * original.astype(np.float32) + 0.3 * patch.astype(np.float32)
+        self.assertLessEqual(np.abs(tracker.gray_template - expected).max(), 1)
+        self.assertEqual(tracker.gray_template.dtype, np.uint8)
+        # 彩色模板只用于显示，保存最近一次用于更新的图像块
+        np.testing.assert_array_equal(tracker.template, color_patch)
+        self.assertEqual(tracker.template_updates['updated'], 1)
+
+    def test_full_replacement(self):
+        tracker, _, patch, color_patch = self._brighter_scene(1.)
+        np.testing.assert_array_equal(tracker.gray_template, patch)
+        np.testing.assert_array_equal(tracker.template, color_patch)
+
+    def test_gate_keeps_the_template(self):
+        tracker, original, _, _ = self._brighter_scene(0.3, gate_threshold=1.01)
+        np.testing.assert_array_equal(tracker.gray_template, original)
+        updates = tracker.template_updates
+        self.assertEqual((updates['updated'], updates['gate']), (0, 1))
+        stats = tracker.update_stats()
+        self.assertEqual(stats['frames'], 3)
+        self.assertEqual(list(stats['totals']), list(UPDATE_REASONS))
+        self.assertEqual(stats['per_target'], [updates])
+
+    def test_motion_and_low_score_are_counted(self):
+        scene = _Scene()
+        tracker = TemplateTracker(search_radius=0, replace_threshold=1.01)
+        tracker.init(scene.frame([(100, 80)]), scene.boxes([(100, 80)])[0])
+        tracker.update(scene.frame([(100, 80)]))
+        tracker.update(scene.frame([(102, 80)]))
+        tracker.update(scene.frame([(104, 80)]))
+        # 位移超过 10 倍 max_distance 时回退到上一帧的位置
+        top_left, _, _ = tracker.update(scene.frame([(160, 120)]))
+        self.assertEqual(top_left, (104, 80))
+        updates = tracker.template_updates
+        self.assertEqual((updates['low_score'], updates['motion'], updates['updated']), (1, 1, 0))
+
+if __name__ == '__main__':
+    unittest.main()
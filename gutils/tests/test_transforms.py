@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+from gutils.ckpt_tr.transforms import (Cast, Chunk, ConvLayout, Permute, Reshape, TransformChain,
+                                       TransformTable, Transpose, from_bfloat16, fuse_qkv, split_qkv, to_bfloat16)
+
+
+class _Recording(Transpose):
+    def __init__(self):
+        self.calls = []
+
+    def view(self, array, batched=False):
+        self.calls.append((array.shape, batched))
+        return super().view(array, batched)
+
+
+class TransformChainTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_transpose_and_cast(self):
+        array = self.rng.standard_normal((3, 5)).astype(np.float32)
+        result = TransformChain([Transpose(), Cast('float16')])(array)
+        self.assertEqual(result.dtype, np.float16)
+        self.assertTrue(result.flags['C_CONTIGUOUS'])
+        np.testing.assert_array_equal(result, array.T.astype(np.float16))
+
+    def test_conv_layout_reshape_chunk(self):
+        array = self.rng.standard_normal((4, 2, 3, 3)).astype(np.float32)
+        np.testing.assert_array_equal(TransformChain([ConvLayout('OIHW', 'HWIO')])(array),
+                                      array.transpose(2, 3, 1, 0))
+        np.testing.assert_array_equal(TransformChain([Reshape((4, 18))])(array), array.reshape(4, 18))
+        qkv = self.rng.standard_normal((6, 4)).astype(np.float32)
+        np.testing.assert_array_equal(TransformChain([Chunk(1)])(qkv), qkv[2:4])
+        self.assertEqual(len(split_qkv(qkv)), 3)
+        np.testing.assert_array_equal(fuse_qkv(split_qkv(qkv)), qkv)
+
+    def test_bfloat16_round_trip(self):
+        array = np.array([1., -2.5, 3.140625, 65504.], dtype=np.float32)
+        bits = TransformChain([Cast('bfloat16')])(array)
+        self.assertEqual(bits.dtype, np.uint16)
+        np.testing.assert_array_equal(bits, to_bfloat16(array))
+        np.testing.assert_allclose(from_bfloat16(bits), array, rtol=1e-2)
+        back = TransformChain([Cast('float32', source='bfloat16')])(bits)
+        np.testing.assert_array_equal(back, from_bfloat16(bits))
+
+    def test_batch_matches_per_tensor(self):
+        arrays = [self.rng.standard_normal((4, 6)).astype(np.float32) for _ in range(5)]
+        for transforms in ([Transpose(), Cast('float16')], [Transpose(), Cast('bfloat16')], [Chunk(0, 2)],
+                           [Permute((1, 0))], [Reshape((6, 4))], [Chunk(1, 3, axis=-1), Cast('float64')]):
+            chain = TransformChain(transforms)
+            results = chain.batch(arrays)
+            self.assertEqual(len(results), len(arrays))
+            for array, result in zip(arrays, results):
+                np.testing.assert_array_equal(result, chain(array))
+            # 每个结果拥有独立的内存，不会让整组的缓冲区一直被引用
+            for i, result in enumerate(results):
+                self.assertTrue(result.flags['C_CONTIGUOUS'])
+                self.assertFalse(any(np.shares_memory(result, other) for other in results[i + 1:]))
+                self.assertFalse(any(np.shares_memory(result, array) for array in arrays))
+
+    def test_batch_transforms_the_stack_once(self):
+        arrays = [self.rng.standard_normal((4, 6)).astype(np.float32) for _ in range(8)]
+        recording = _Recording()
+        TransformChain([recording, Cast('float16')]).batch(arrays)
+        self.assertEqual(recording.calls, [((8, 4, 6), True)])
+
+
+class TransformTableTest(unittest.TestCase):
+    def test_apply_batch(self):
+        rng = np.random.default_rng(1)
+        table = TransformTable([(r'\.weight$', [Transpose()]), (r'\.bias$', [Cast('float16')])], batch_bytes=64)
+        keys = ['a.weight', 'b.weight', 'big.weight', 'a.bias', 'step']
+        arrays = [rng.standard_normal((2, 3)).astype(np.float32), rng.standard_normal((2, 3)).astype(np.float32),
+                  rng.standard_normal((8, 8)).astype(np.float32), rng.standard_normal(3).astype(np.float32),
+                  np.array(7)]
+        results = table.apply_batch(keys, arrays)
+        for key, array, result in zip(keys, arrays, results):
+            np.testing.assert_array_equal(result, table.apply(key, array))
+        self.assertIs(results[-1], arrays[-1])
+        self.assertIsNone(table.chain('step'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import json
+import tempfile
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+
+from gutils.ckpt_tr import WeightTrans
+from gutils.ckpt_tr.formats import read_safetensors_meta, save_npz
+from gutils.ckpt_tr.loaders import TensorMeta, load_meta, load_state_dict
+from gutils.ckpt_tr.writers import ShardedWriter, StateDictWriter, open_writer
+
+
+class WriterTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.save_dir = os.path.join(self.workdir.name, 'model')
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_open_writer(self):
+        self.assertIsInstance(open_writer(self.save_dir, 'numpy'), StateDictWriter)
+        writer = open_writer(self.save_dir, 'safetensors', '1KB')
+        self.assertIsInstance(writer, ShardedWriter)
+        self.assertEqual(writer.max_shard_size, 1024)
+        with self.assertRaises(ValueError):
+            ShardedWriter(self.save_dir, 'onnx', 1024)
+
+    def test_unsupported_type_returns_state_dict(self):
+        writer = StateDictWriter(self.save_dir, 'onnx')
+        writer.add('w', np.zeros(2))
+        self.assertEqual(list(writer.close()), ['w'])
+        self.assertEqual(writer.output_files(), [])
+
+    def test_oversized_tensor_gets_its_own_shard(self):
+        writer = ShardedWriter(self.save_dir, 'safetensors', 100)
+        for key, numel in (('a', 10), ('b', 40), ('c', 5), ('d', 5)):
+            writer.add(key, np.ones(numel, dtype=np.float32))
+        writer.close()
+        shards = [os.path.basename(path) for path in writer.shard_files]
+        self.assertEqual(shards, ['model-00001.safetensors', 'model-00002.safetensors', 'model-00003.safetensors'])
+        self.assertEqual(writer.weight_map, {'a': shards[0], 'b': shards[1], 'c': shards[2], 'd': shards[2]})
+        self.assertEqual(writer.total_size, 240)
+        for path in writer.shard_files:
+            self.assertTrue(os.path.exists(path))
+
+    def test_weight_trans_streams_shards(self):
+        rng = np.random.default_rng(0)
+        source = OrderedDict((f"blocks.{i}.weight", rng.standard_normal((16, 16)).astype(np.float32))
+                             for i in range(6))
+        target = OrderedDict((key, TensorMeta((16, 16), 'float32')) for key in source)
+        source_path = os.path.join(self.workdir.name, 'source.npz')
+        save_npz(source, source_path)
+        wt = WeightTrans(source_path, target, verbose=False)
+        wt.source2target(self.save_dir, 'safetensors', max_shard_size='2KB')
+
+        index_path = self.save_dir + '.safetensors.index.json'
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.assertEqual(index['metadata']['total_size'], 6 * 1024)
+        self.assertEqual(list(index['weight_map']), list(source))
+        shards = sorted(set(index['weight_map'].values()))
+        self.assertEqual(len(shards), 3)
+        for shard in shards:
+            self.assertEqual(len(read_safetensors_meta(os.path.join(self.workdir.name, shard))), 2)
+
+        # index 可以直接作为源权重或目标权重使用
+        state_dict = load_state_dict(index_path)
+        self.assertEqual(list(state_dict), list(source))
+        for key, value in source.items():
+            np.testing.assert_array_equal(state_dict[key], value)
+        meta = load_meta(index_path)
+        self.assertEqual(set(meta), set(source))
+        self.assertEqual(meta['blocks.0.weight'].shape, (16, 16))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,3 @@
-from .decorators import print_run_time
\ No newline at end of file
+from .decorators import print_run_time
+from .csv_writer import CSVWriter, close_csv_writers, get_csv_writer
+from .profiler import Profiler, Timer, get_profiler
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+带缓冲的 CSV 写入：文件保持打开，行先写入内存缓冲区，缓冲的行数达到 flush_rows 或距上次写盘超过 flush_interval 秒时
+一次性写入并 flush。`get_csv_writer` 按路径复用同一个 CSVWriter，进程退出时全部关闭。
+"""
+import os
+import csv
+import time
+import atexit
+import threading
+from typing import Any, Dict, Iterable, Sequence
+
+__all__ = ['CSVWriter', 'get_csv_writer', 'close_csv_writers']
+
+
+class CSVWriter(object):
+    """
+    Parameters
+    ----------
+        path: str csv 文件路径
+
+        header: Sequence[str] 表头，只在文件为空时写入
+
+        mode: str 'a' 追加或 'w' 覆盖
+
+        flush_rows: int 缓冲的行数达到该值时写盘
+
+        flush_interval: float 写入时距上次写盘超过该秒数也会写盘，没有新的写入时不会自动写盘，需要 flush 或 close
+
+    Examples
+    --------
+>>>        with CSVWriter("result.csv", header=("frame", "x", "y")) as writer:
+>>>            for frame in frames:
+>>>                writer.writerow((frame, x, y))
+>>>            writer.writerows(np.array(boxes))
+
+    写入是线程安全的。
+    """
+    def __init__(self,
+                 path: str,
+                 header: Sequence[str]=None,
+                 mode: str='a',
+                 flush_rows: int=1024,
+                 flush_interval: float=1.,
+                 encoding: str='utf-8') -> None:
+        if mode not in ('a', 'w'):
+            raise ValueError(f"not support mode: {mode}, use 'a' or 'w'")
+        self.path = path
+        self.flush_rows = max(int(flush_rows), 1)
+        self.flush_interval = flush_interval
+        self._file = open(path, mode, newline='', encoding=encoding)
+        self._writer = csv.writer(self._file)
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        if header is not None and self._file.tell() == 0:
+            self._writer.writerow(header)
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def writerow(self, row: Sequence[Any]) -> None:
+        with self._lock:
+            self._buffer.append(row)
+            self._maybe_flush()
+
+    def writerows(self, rows: Iterable[Sequence[Any]]) -> None:
+        """
+        写入多行，二维 np.ndarray 通过 `tolist` 一次转换为 python 标量，输出与逐行 writerow 相同。
+        """
+        if hasattr(rows, 'ndim'):
+            if rows.ndim != 2:
+                raise ValueError(f"writerows expects a 2-D array, got shape {rows.shape}")
+            rows = rows.tolist()
+        with self._lock:
+            self._buffer.extend(rows)
+            self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if len(self._buffer) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self._buffer.clear()
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            self._file.close()
+
+    def __enter__(self) -> 'CSVWriter':
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+
+
+_writers: Dict[str, CSVWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_csv_writer(path: str, **kwargs) -> CSVWriter:
+    """
+    返回 path 对应的共享 CSVWriter（追加模式），同一路径只打开一次，kwargs 只在第一次打开时生效。
+    """
+    key = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None or writer.closed:
+            writer = _writers[key] = CSVWriter(path, mode='a', **kwargs)
+        return writer
+
+
+def close_csv_writers() -> None:
+    """写盘并关闭全部由 get_csv_writer 打开的文件，之后再次写入同一路径时会重新打开。"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close_csv_writers)
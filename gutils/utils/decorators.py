@@ -1,11 +1,37 @@
 import time 
+import reprlib
+import functools
+
+from .profiler import get_profiler
+
+
+class _ArgRepr(reprlib.Repr):
+    """截断参数的 repr，张量只显示 shape 和 dtype，不格式化数据本身。"""
+    def __init__(self) -> None:
+        super().__init__()
+        self.maxstring = 60
+        self.maxother = 60
+        self.maxlevel = 3
+
+    def _repr_tensor(self, x, level):
+        return f"{type(x).__name__}(shape={tuple(x.shape)}, dtype={x.dtype})"
+
+    repr_ndarray = repr_Tensor = _repr_tensor
+
+
+_arg_repr = _ArgRepr()
+
 
 def print_run_time(func):  
+    name = func.__qualname__
+
+    @functools.wraps(func)
     def wrapper(*args, **kw):  
-        local_time = time.time()  
+        start = time.perf_counter_ns()
         result = func(*args, **kw) 
-        print(f"""Current Function: [{func.__name__}(args={args}, kwargs={kw})]
-    run time is {time.time() - local_time:.2f}""")
+        elapsed = time.perf_counter_ns() - start
+        get_profiler().record(name, elapsed)
+        print(f"""Current Function: [{func.__name__}(args={_arg_repr.repr(args)}, kwargs={_arg_repr.repr(kw)})]
+    run time is {elapsed / 1e9:.2f}""")
         return result
     return wrapper
-
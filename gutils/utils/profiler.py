@@ -0,0 +1,224 @@
+"""
+计时与统计：`Timer` 可以作为装饰器或上下文管理器，用 `time.perf_counter_ns` 计时并记录到 `Profiler`，
+`Profiler` 按名称汇总调用次数、总耗时、均值、p50/p95/p99、最大值以及可选的 tracemalloc 内存峰值，
+可以打印报告或导出为 json/csv。默认记录到进程内共享的 `get_profiler()`。
+
+>>> with Timer('convert'):
+>>>     ...
+>>> @Timer(sample_rate=0.1)
+>>> def step(...):
+>>>     ...
+>>> print(get_profiler().report())
+>>> get_profiler().export('profile.json')
+"""
+import time
+import functools
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+__all__ = ['Timer', 'Profiler', 'get_profiler']
+
+STAT_COLUMNS = ('name', 'count', 'total_ms', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'peak_mem_kb')
+
+
+class _Stat(object):
+    __slots__ = ('count', 'total', 'max', 'peak_mem', 'samples')
+
+    def __init__(self, max_samples: int) -> None:
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.peak_mem = None
+        # 百分位只按最近 max_samples 次计算，长时间运行时内存占用有上限
+        self.samples = deque(maxlen=max_samples)
+
+
+def _percentile(ordered: List[int], q: float) -> int:
+    """最近秩法百分位，ordered 已排序且非空。"""
+    index = max(int(-(-q * len(ordered) // 100)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Profiler(object):
+    """
+    Parameters
+    ----------
+        max_samples: int 每个名称保留用于计算百分位的最近耗时个数，次数、总耗时和最大值总是精确的
+
+        enabled: bool 为 False 时 Timer 不再计时，也不记录
+    """
+    def __init__(self, max_samples: int=100000, enabled: bool=True) -> None:
+        self.max_samples = max_samples
+        self.enabled = enabled
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, elapsed_ns: int, peak_mem: Optional[int]=None) -> None:
+        """记录一次耗时（纳秒），peak_mem 为这次调用期间 tracemalloc 的内存峰值增量（字节）。"""
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = _Stat(self.max_samples)
+            stat.count += 1
+            stat.total += elapsed_ns
+            if elapsed_ns > stat.max:
+                stat.max = elapsed_ns
+            if peak_mem is not None and (stat.peak_mem is None or peak_mem > stat.peak_mem):
+                stat.peak_mem = peak_mem
+            stat.samples.append(elapsed_ns)
+
+    def stats(self, prefix: str=None) -> Dict[str, Dict[str, Any]]:
+        """
+        按名称汇总的统计，耗时单位为毫秒。
+
+        Args:
+            prefix (str, optional): 只返回以 prefix 开头的名称。
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 名称 -> count、total_ms、mean_ms、p50_ms、p95_ms、p99_ms、max_ms、peak_mem_kb。
+        """
+        with self._lock:
+            items = [(name, stat.count, stat.total, stat.max, stat.peak_mem, sorted(stat.samples))
+                     for name, stat in self._stats.items() if prefix is None or name.startswith(prefix)]
+        result = {}
+        for name, count, total, max_ns, peak_mem, ordered in items:
+            result[name] = {
+                'count': count,
+                'total_ms': total / 1e6,
+                'mean_ms': total / count / 1e6,
+                'p50_ms': _percentile(ordered, 50) / 1e6,
+                'p95_ms': _percentile(ordered, 95) / 1e6,
+                'p99_ms': _percentile(ordered, 99) / 1e6,
+                'max_ms': max_ns / 1e6,
+                'peak_mem_kb': None if peak_mem is None else peak_mem / 1024.,
+            }
+        return result
+
+    def report(self, prefix: str=None) -> str:
+        """按总耗时从高到低排列的统计表。"""
+        stats = sorted(self.stats(prefix).items(), key=lambda item: item[1]['total_ms'], reverse=True)
+        width = max([len(name) for name, _ in stats] + [4])
+        lines = [f"{'name':<{width}}  {'count':>8}  {'total_ms':>10}  {'mean_ms':>9}  {'p50_ms':>9}  "
+                 f"{'p95_ms':>9}  {'p99_ms':>9}  {'max_ms':>9}  {'peak_mem_kb':>11}"]
+        for name, s in stats:
+            peak = '-' if s['peak_mem_kb'] is None else f"{s['peak_mem_kb']:.1f}"
+            lines.append(f"{name:<{width}}  {s['count']:>8d}  {s['total_ms']:>10.2f}  {s['mean_ms']:>9.3f}  "
+                         f"{s['p50_ms']:>9.3f}  {s['p95_ms']:>9.3f}  {s['p99_ms']:>9.3f}  {s['max_ms']:>9.3f}  "
+                         f"{peak:>11}")
+        return '\n'.join(lines)
+
+    def export(self, path: str, prefix: str=None) -> None:
+        """按后缀保存为 .json 或 .csv。"""
+        stats = self.stats(prefix)
+        if path.endswith('.json'):
+            import json
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, indent=2)
+        elif path.endswith('.csv'):
+            import csv
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(STAT_COLUMNS)
+                for name, s in stats.items():
+                    writer.writerow([name] + [s[column] for column in STAT_COLUMNS[1:]])
+        else:
+            raise ValueError(f"not support export format: {path}, use .json or .csv")
+
+    def reset(self, prefix: str=None) -> None:
+        with self._lock:
+            for name in [name for name in self._stats if prefix is None or name.startswith(prefix)]:
+                del self._stats[name]
+
+
+_PROFILER = Profiler()
+
+
+def get_profiler() -> Profiler:
+    """进程内共享的 Profiler，Timer 未指定 profiler 时记录到这里。"""
+    return _PROFILER
+
+
+class Timer(object):
+    """
+    Parameters
+    ----------
+        name: str 统计名称，作为装饰器时默认为函数的 `__qualname__`
+
+        profiler: Profiler 记录到的 Profiler，默认为 get_profiler()
+
+        sample_rate: float 采样比例，如 0.1 表示每 10 次调用只计时 1 次，用于调用非常频繁的函数
+
+        track_memory: bool 是否用 tracemalloc 记录每次调用期间的内存峰值增量，未启动 tracemalloc 时自动启动。
+            tracemalloc 本身会显著拖慢内存分配，嵌套使用时内层会重置外层的峰值
+
+    Examples
+    --------
+>>>        with Timer('tracker.update'):
+>>>            tracker.update(frame)
+>>>        @Timer('convert', track_memory=True)
+>>>        def convert(...):
+>>>            ...
+
+    同一个 Timer 对象作为上下文管理器时不能在多个线程中同时使用，作为装饰器时是线程安全的。
+    """
+    def __init__(self,
+                 name: str=None,
+                 profiler: Profiler=None,
+                 sample_rate: float=1.,
+                 track_memory: bool=False) -> None:
+        if not 0 < sample_rate <= 1:
+            raise ValueError(f"sample_rate should be in (0, 1], got {sample_rate}")
+        self.name = name
+        self.profiler = profiler if profiler is not None else _PROFILER
+        self.every = max(int(round(1. / sample_rate)), 1)
+        self.track_memory = track_memory
+        self.elapsed_ns = None
+        self._calls = 0
+        self._tokens = []
+
+    def _start(self):
+        self._calls += 1
+        if not self.profiler.enabled or (self._calls - 1) % self.every:
+            return None
+        memory = None
+        if self.track_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        return time.perf_counter_ns(), memory
+
+    def _stop(self, name: str, token) -> None:
+        if token is None:
+            return
+        start, memory = token
+        self.elapsed_ns = time.perf_counter_ns() - start
+        peak_mem = None
+        if memory is not None:
+            import tracemalloc
+            peak_mem = max(tracemalloc.get_traced_memory()[1] - memory, 0)
+        self.profiler.record(name, self.elapsed_ns, peak_mem)
+
+    def __enter__(self) -> 'Timer':
+        if self.name is None:
+            raise ValueError("Timer used as a context manager requires a name")
+        self._tokens.append(self._start())
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self._stop(self.name, self._tokens.pop())
+        return False
+
+    def __call__(self, func: Callable) -> Callable:
+        name = self.name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = self._start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._stop(name, token)
+        return wrapper
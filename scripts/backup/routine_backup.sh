@@ -1,18 +1,19 @@
 #!/bin/bash
 backup_dir="/root/workdir"
 log_file="/root/routine_backup.log"
-physical_save_place="/root/routine_backup.tar.gz"
+# 本地保存 manifest 和待上传的归档，manifest 需要保留，下次备份只打包变化的文件
+physical_save_place="/root/routine_backup"
 bpfs_place="/path/to/bpfs"
 
-# 备份到本地空间中
+# 备份到本地空间中，第一次为全量备份，之后为增量备份
 echo "[$(date +"%Y-%m-%d %H:%M:%S")] backup at $physical_save_place" >> $log_file
-bash /root/workdir/backup.sh $backup_dir $physical_save_place >> $log_file;
+gutils backup $backup_dir $physical_save_place >> $log_file || exit 1
 
-# 备份到bpfs上
+# 备份到bpfs上，manifest 一并上传，恢复时使用 gutils restore
 source ~/.bpfs_env
-cp $physical_save_place $bpfs_place >> $log_file
+for archive in $physical_save_place/*.tar.*; do
+    [ -e "$archive" ] || continue
+    cp $archive $bpfs_place >> $log_file && rm $archive
+done
+cp $physical_save_place/*.manifest.json $bpfs_place >> $log_file
 echo "[$(date +"%Y-%m-%d %H:%M:%S")] backup succeed!" >> $log_file
-
-# 清除物理空间
-rm $physical_save_place
-echo "[$(date +"%Y-%m-%d %H:%M:%S")] clean physical place!" >> $log_file